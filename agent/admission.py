@@ -0,0 +1,152 @@
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+
+# Admission control configuration (rates in tokens per second)
+ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', '1') == '1'
+ADMISSION_SESSION_RATE = float(os.environ.get('ADMISSION_SESSION_RATE', 1.0))
+ADMISSION_SESSION_BURST = float(os.environ.get('ADMISSION_SESSION_BURST', 12))
+ADMISSION_IP_RATE = float(os.environ.get('ADMISSION_IP_RATE', 4.0))
+ADMISSION_IP_BURST = float(os.environ.get('ADMISSION_IP_BURST', 40))
+# Turns without an established session (no cookie yet, or a script dropping
+# it) have no session bucket of their own; they share a slower one per IP
+ADMISSION_NEW_SESSION_RATE = float(os.environ.get('ADMISSION_NEW_SESSION_RATE', 0.5))
+ADMISSION_NEW_SESSION_BURST = float(os.environ.get('ADMISSION_NEW_SESSION_BURST', 12))
+# Turns that reach the LLM cost more than scripted check-in steps and shortcuts
+ADMISSION_LLM_COST = float(os.environ.get('ADMISSION_LLM_COST', 3))
+ADMISSION_BASIC_COST = float(os.environ.get('ADMISSION_BASIC_COST', 1))
+ADMISSION_MAX_KEYS = int(os.environ.get('ADMISSION_MAX_KEYS', 50000))
+# Number of reverse proxies in front of the agent that append to
+# X-Forwarded-For. Clients are keyed by the address the outermost of them saw
+# (that many entries from the right). The default of 0 ignores the header, as
+# the app binds 0.0.0.0 and a client reaching it directly could otherwise pick
+# its own per-IP bucket. Set ADMISSION_TRUST_PROXY=1 behind a single
+# nginx/load balancer, or else every guest shares the proxy's bucket.
+ADMISSION_TRUST_PROXY = int(os.environ.get('ADMISSION_TRUST_PROXY', 0))
+
+SCOPE_SESSION = 'session'
+SCOPE_IP = 'ip'
+SCOPE_NEW_SESSION = 'new_session'
+
+COST_LLM = 'llm'
+COST_BASIC = 'basic'
+
+
+def forwarded_client(forwarded_for, remote_addr, hops=ADMISSION_TRUST_PROXY):
+    """Client address from an X-Forwarded-For value and the peer address, trusting `hops` proxies"""
+    addresses = [a.strip() for a in (forwarded_for or '').split(',') if a.strip()]
+    if hops <= 0 or not addresses:
+        return remote_addr
+    # Entries left of what our proxies added are client-supplied and not trusted
+    return addresses[-min(hops, len(addresses))]
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by client.
+
+    Each key's bucket holds up to burst tokens and refills at rate tokens per
+    second; a request takes its cost or is refused. Buckets are refilled
+    lazily when touched, so there is no timer thread. Only the max_keys most
+    recently seen keys are kept; an evicted key starts again with a full
+    bucket, which is what an idle client would have anyway.
+    """
+
+    def __init__(self, rate, burst, max_keys=ADMISSION_MAX_KEYS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    def _level(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def wait_time(self, key, cost, now):
+        """Seconds until key can afford cost (0 if it can now); caller holds the lock"""
+        missing = min(cost, self.burst) - self._level(key, now)
+        return max(0.0, missing / self.rate) if self.rate > 0 else (0.0 if missing <= 0 else math.inf)
+
+    def take(self, key, cost, now):
+        """Take cost from key's bucket (caller checked wait_time and holds the lock)"""
+        self._buckets[key] = (self._level(key, now) - min(cost, self.burst), now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class ChatAdmission:
+    """
+    Admission control for guest chat turns, in front of the LLM and Supabase.
+
+    A turn must fit both its session's bucket and its client IP's bucket:
+    the session bucket keeps one guest from hogging shared capacity, the IP
+    bucket catches many sessions from one address. A turn without a session
+    key (a new session, or a script that drops the cookie on every request)
+    is charged to a slower per-IP new-session bucket instead, so skipping the
+    cookie never skips a limit. Tokens are only taken when both allow the turn, so a refused turn costs
+    nothing. Refused turns get a retry hint of when they would be admitted.
+    """
+
+    def __init__(self, enabled=ADMISSION_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._limiters = {
+            SCOPE_SESSION: TokenBucketLimiter(ADMISSION_SESSION_RATE, ADMISSION_SESSION_BURST),
+            SCOPE_IP: TokenBucketLimiter(ADMISSION_IP_RATE, ADMISSION_IP_BURST),
+            SCOPE_NEW_SESSION: TokenBucketLimiter(ADMISSION_NEW_SESSION_RATE, ADMISSION_NEW_SESSION_BURST),
+        }
+        self.costs = {COST_LLM: ADMISSION_LLM_COST, COST_BASIC: ADMISSION_BASIC_COST}
+        self.admitted = {COST_LLM: 0, COST_BASIC: 0}
+        self.rejected = {SCOPE_SESSION: 0, SCOPE_IP: 0, SCOPE_NEW_SESSION: 0}
+
+    def admit(self, session_key, ip, kind=COST_LLM):
+        """
+        Returns:
+            tuple: (admitted, retry_after_seconds, limiting scope or None)
+        """
+        if not self.enabled:
+            return True, 0.0, None
+        cost = self.costs[kind]
+        keys = {SCOPE_SESSION: session_key, SCOPE_IP: ip}
+        if not session_key:
+            keys[SCOPE_NEW_SESSION] = ip
+        now = time.monotonic()
+        with self._lock:
+            waits = {
+                scope: self._limiters[scope].wait_time(key, cost, now)
+                for scope, key in keys.items() if key
+            }
+            scope = max(waits, key=waits.get) if waits else None
+            if scope is not None and waits[scope] > 0:
+                self.rejected[scope] += 1
+                return False, waits[scope], scope
+            for scope, key in keys.items():
+                if key:
+                    self._limiters[scope].take(key, cost, now)
+            self.admitted[kind] += 1
+        return True, 0.0, None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'trusted_proxy_hops': ADMISSION_TRUST_PROXY,
+                'costs': dict(self.costs),
+                'admitted': dict(self.admitted),
+                'rejected': dict(self.rejected),
+                'tracked_sessions': len(self._limiters[SCOPE_SESSION]),
+                'tracked_ips': len(self._limiters[SCOPE_IP]),
+                'session_bucket': {'rate': ADMISSION_SESSION_RATE, 'burst': ADMISSION_SESSION_BURST},
+                'ip_bucket': {'rate': ADMISSION_IP_RATE, 'burst': ADMISSION_IP_BURST},
+                'new_session_bucket': {'rate': ADMISSION_NEW_SESSION_RATE, 'burst': ADMISSION_NEW_SESSION_BURST}
+            }
+
+
+# Process-wide admission control for /chat
+chat_admission = ChatAdmission()
@@ -1,133 +1,150 @@
-from flask import Flask, render_template, request, jsonify, session
-from flask_session import Session
+from flask import Flask, render_template, request, jsonify, session, Response, g
 import requests
 import os
+import sys
+import math
+import gc
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
 
-from llm_handler import llm_classify_intent, llm_answer_faq, summarize_request
-from housekeeping_notification import send_housekeeping_notification
+# Helpers shared by the agent and the PMS (e.g. the profiler) live in ../shared
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'shared'))
+
+from llm_handler import (
+    llm_classify_intent, llm_answer_faq, llm_fused_turn, start_warm_up, hotel_info_lines,
+    ollama_breaker, ollama_latency, task_latency, TASK_ROUTES
+)
+from llm_scheduler import llm_scheduler, PRIORITY_CHECK_IN, PRIORITY_HOUSEKEEPING
+from llm_hedge import llm_hedge, turn_deadline
+from faq_cache import faq_cache
+from session_store import configure_sessions
+from arrivals_mirror import arrivals_mirror, ARRIVALS_MIRROR_ENABLED
+from admission import chat_admission, forwarded_client, COST_LLM, COST_BASIC
+from tracing import start_trace, finish_trace, span, traced, trace_recorder
+from profiler import profiler, ProfilerBusy
+from local_access import is_local_request
+from event_log import get_logger, logging_stats
+from circuit_breaker import CLOSED
+from chat_services import (
+    supabase_client, supabase_writer, guest_cache, housekeeping_jobs, MAX_SESSION_TICKETS,
+    log_interaction, update_interaction_status, update_guest_on_checkin
+)
+from housekeeping_board import housekeeping_board
+from housekeeping_dispatch import housekeeping_dispatcher
+from housekeeping_notification import email_dispatcher
+from chat_common import (
+    PMS_API_URL, get_hotel_info, hotel_info_loaded, find_todays_booking, build_check_in_result,
+    BOOKING_NOT_FOUND, BOOKING_UPDATE_FAILED, PMS_UNAVAILABLE, PMS_CONNECTION_ERROR,
+    PMS_TIMEOUT, PMS_UNEXPECTED_ERROR, already_checked_in_reply, check_in_success_reply,
+    check_in_failed_reply, housekeeping_accepted_reply, housekeeping_merged_reply,
+    HELP_CHECKED_IN_REPLY, HELP_REPLY, RATE_LIMITED_REPLY
+)
 
 # Load environment variables
 load_dotenv()
 
-# Supabase connection
-from supabase import create_client, Client
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+log = get_logger('app')
+
+# Freeze objects created at import so pre-forked workers keep sharing their pages
+GC_FREEZE = os.environ.get('GC_FREEZE', '1') == '1'
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'super-secret-key-for-nexrova'
-app.config['SESSION_TYPE'] = 'filesystem'
-Session(app)
-
-PMS_API_URL = "http://127.0.0.1:5000/api"
-KEY_BOX_MAP = {
-    '101': 'A1', '102': 'A2', '103': 'A3', '104': 'A4',
-    '105': 'B1', '106': 'B2', '107': 'B3', '108': 'B4',
-}
-
-HOTEL_INFO_PATH = os.path.join(os.path.dirname(__file__), 'hotel_info.txt')
-try:
-    with open(HOTEL_INFO_PATH, 'r', encoding='utf-8') as f:
-        HOTEL_INFO = f.read()
-except FileNotFoundError:
-    HOTEL_INFO = "Hotel information not available."
-    print(f"Warning: {HOTEL_INFO_PATH} not found")
+# Read-only assets built before workers fork
+hotel_info_lines(get_hotel_info())
 
+# In-memory sessions by default; SESSION_BACKEND=redis shares them between workers
+session_store = configure_sessions(app)
 
 # --- Supabase helper functions ---
-def get_or_create_guest(phone_number):
-    if not phone_number or not phone_number.isdigit():
-        raise ValueError("Invalid or missing phone number for guest record.")
-    result = supabase.table('Guest').select('*').eq('phone_number', phone_number).execute()
-    if result.data:
-        return result.data[0]['guest_id'], False
-    insert_result = supabase.table('Guest').insert({'phone_number': int(phone_number)}).execute()
-    return insert_result.data[0]['guest_id'], True
-
-def log_interaction(guest_id, intent_type, user_query, status="initiated"):
-    timestamp = datetime.now().isoformat()
-    interaction = supabase.table('Interactions').insert({
-        'guest_id': guest_id,
-        'timestamp': timestamp,
-        'intent_type': intent_type,
-        'user_query': user_query,
-        'status': status
-    }).execute()
-    return interaction.data[0]['interaction_id']
-
-def update_interaction_status(interaction_id, new_status):
-    supabase.table('Interactions').update({'status': new_status}).eq('interaction_id', interaction_id).execute()
-
-def update_guest_on_checkin(guest_id, name, room_number, check_in_date):
-    supabase.table('Guest').update({
-        'name': name,
-        'room_number': room_number,
-        'check_in_date': check_in_date
-    }).eq('guest_id', guest_id).execute()
-
-def create_service_request(interaction_id, service_type):
-    now = datetime.now().isoformat()
-    supabase.table('ServiceRequests').insert({
-        'interaction_id': interaction_id,
-        'service_type': service_type,
-        'request_time': now
-    }).execute()
+def resolve_guest_id(guest_phone):
+    """Guest id for the session's phone: session store first, then the process-wide cache"""
+    if session.get('guest_id') is not None and session.get('guest_phone') == guest_phone:
+        return session['guest_id']
+    guest_id, _ = guest_cache.get_or_create(guest_phone)
+    session['guest_id'] = guest_id
+    return guest_id
 
 # --- PMS check-in logic ---
+@traced('pms.check_in')
 def verify_and_check_in(guest_name, guest_phone):
     today_str = datetime.now().strftime('%Y-%m-%d')
     try:
-        response = requests.get(f"{PMS_API_URL}/bookings", timeout=5)
-        if response.status_code != 200:
-            return {'success': False, 'message': 'Cannot connect to the booking system.'}
-        bookings = response.json().get('data', [])
-        target_booking = None
-        for booking in bookings:
-            booking_phone = booking.get('guest_phone', '').replace('-', '').replace(' ', '').replace('+91', '')
-            input_phone = guest_phone.replace('-', '').replace(' ', '').replace('+91', '')
-            if (booking['guest_name'].lower() == guest_name.lower() and
-                    booking_phone == input_phone and
-                    booking['status'] == 'confirmed' and
-                    booking['check_in'] == today_str):
-                target_booking = booking
-                break
+        target_booking, authoritative = None, False
+        if ARRIVALS_MIRROR_ENABLED:
+            target_booking, authoritative = arrivals_mirror.lookup(guest_name, guest_phone)
+        if not target_booking and not authoritative:
+            # Mirror not current: scan all bookings on the PMS
+            response = requests.get(f"{PMS_API_URL}/bookings", timeout=5)
+            if response.status_code != 200:
+                return PMS_UNAVAILABLE
+            bookings = response.json().get('data', [])
+            target_booking = find_todays_booking(bookings, guest_name, guest_phone, today_str)
         if not target_booking:
-            return {
-                'success': False,
-                'message': "I'm sorry, I couldn't find a confirmed booking for today with that name and phone number. Please check your details or contact the front desk."
-            }
+            return BOOKING_NOT_FOUND
         booking_id = target_booking['booking_id']
         update_response = requests.put(
             f"{PMS_API_URL}/bookings/{booking_id}",
-            json={'status': 'checked_in'},
+            json={'status': 'checked_in', 'expected_status': 'confirmed'},
             timeout=5
         )
+        if update_response.status_code == 409:
+            # Cancelled or checked in since the mirror last saw it
+            arrivals_mirror.discard(target_booking)
+            return BOOKING_NOT_FOUND
         if update_response.status_code != 200:
-            return {
-                'success': False,
-                'message': 'Found your booking, but there was an error checking you in. Please see the front desk.'
-            }
-        updated_data = update_response.json().get('data', {})
-        room_number = updated_data.get('room_number', target_booking.get('room_number', 'N/A'))
-        room_type = updated_data.get('room_type', target_booking.get('room_type', 'N/A'))
-        return {
-            'success': True,
-            'guest_name': updated_data.get('guest_name', target_booking['guest_name']),
-            'room_number': room_number,
-            'room_type': room_type,
-            'box_id': KEY_BOX_MAP.get(str(room_number), 'Lobby'),
-            'booking_id': booking_id
-        }
+            return BOOKING_UPDATE_FAILED
+        arrivals_mirror.discard(target_booking)
+        return build_check_in_result(target_booking, update_response.json().get('data', {}))
     except requests.exceptions.ConnectionError:
-        return {'success': False, 'message': 'Error: Cannot connect to the hotel management system. Please contact the front desk.'}
+        return PMS_CONNECTION_ERROR
     except requests.exceptions.Timeout:
-        return {'success': False, 'message': 'Error: Request timed out. Please try again or contact the front desk.'}
+        return PMS_TIMEOUT
     except Exception as e:
-        print(f"Error in verify_and_check_in: {e}")
-        return {'success': False, 'message': 'An unexpected error occurred. Please contact the front desk.'}
+        log.error("Error in verify_and_check_in: %s", e)
+        return PMS_UNEXPECTED_ERROR
+
+# --- Background workers ---
+# Started by the first request each process serves (a /ready probe does it),
+# like the clients: importing the app starts no threads, and a forked worker
+# runs its own instead of relying on threads that did not survive the fork
+_workers_pid = None
+_workers_lock = threading.Lock()
+
+@app.before_request
+def start_background_workers():
+    global _workers_pid
+    if _workers_pid == os.getpid():
+        return
+    with _workers_lock:
+        if _workers_pid == os.getpid():
+            return
+        # Load the model and prime prompt prefixes before guests need them
+        start_warm_up(get_hotel_info())
+        # Mirror today's arrivals so check-in verification is a local lookup
+        if ARRIVALS_MIRROR_ENABLED:
+            arrivals_mirror.start()
+        # Deliver emails left in the outbox by a previous run
+        email_dispatcher.start()
+        # Finish housekeeping jobs a previous run accepted, and watch for stale claims
+        housekeeping_jobs.start()
+        _workers_pid = os.getpid()
+
+# --- Per-turn tracing ---
+@app.before_request
+def start_turn_trace():
+    if request.endpoint == 'chat':
+        g.trace = start_trace('chat')
+
+@app.after_request
+def finish_turn_trace(response):
+    trace = g.pop('trace', None)
+    if trace is not None:
+        finish_trace(trace, status=response.status_code)
+        response.headers['Server-Timing'] = trace.server_timing()
+        response.headers['X-Trace-Id'] = trace.trace_id
+    return response
 
 @app.route('/')
 def index():
@@ -135,9 +152,20 @@ def index():
     session['state'] = 'INIT'
     session['guest_name'] = None
     session['guest_phone'] = None
+    session['guest_id'] = None
     session['checked_in'] = False
     return render_template('index.html')
 
+def client_ip():
+    return forwarded_client(request.headers.get('X-Forwarded-For'), request.remote_addr)
+
+def rate_limited_response(retry_after):
+    seconds = max(1, math.ceil(retry_after))
+    response = jsonify({'response': RATE_LIMITED_REPLY, 'action': None, 'retry_after': seconds})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(seconds)
+    return response
+
 @app.route('/chat', methods=['POST'])
 def chat():
     data = request.get_json()
@@ -153,23 +181,35 @@ def chat():
     bot_response = "I'm not sure how to help with that."
     action = None
 
+    # Admission control: turns that reach the LLM cost more than check-in steps and shortcuts
+    shortcut = checked_in and any(word in user_message.lower() for word in ['check in', 'checked in', 'already'])
+    kind = COST_BASIC if shortcut or state in ['AWAITING_NAME', 'AWAITING_PHONE'] else COST_LLM
+    # A new session's id is only issued with this response, so admission charges it per IP
+    session_key = None if getattr(session, 'new', True) else getattr(session, 'sid', None)
+    admitted, retry_after, _ = chat_admission.admit(session_key, client_ip(), kind)
+    if not admitted:
+        return rate_limited_response(retry_after)
+
     # Checked-in guest shortcut
-    if checked_in and any(word in user_message.lower() for word in ['check in', 'checked in', 'already']):
+    if shortcut:
         room = session.get('checked_in_room', 'your room')
-        bot_response = (
-            f"You're already checked in to Room {room}! \n\n"
-            "I can help you with:\n"
-            "• **Questions** about the hotel\n"
-            "• **Housekeeping** requests\n\n"
-            "How else can I assist you?"
-        )
+        bot_response = already_checked_in_reply(room)
         return jsonify({'response': bot_response, 'action': None})
 
-    # Intent classification
+    # Intent classification; all LLM calls of this turn share one deadline
+    deadline = turn_deadline()
+    fused = None
     if state in ['AWAITING_NAME', 'AWAITING_PHONE']:
         intent = 'check_in'
     else:
-        intent = llm_classify_intent(user_message.lower())
+        # Guests who are not checked in yet are most likely starting check-in
+        priority = PRIORITY_HOUSEKEEPING if checked_in else PRIORITY_CHECK_IN
+        # Fused mode classifies and summarizes/answers in one call (None if off)
+        fused = llm_fused_turn(user_message, get_hotel_info(), priority=priority, deadline=deadline)
+        if fused:
+            intent = fused['intent']
+        else:
+            intent = llm_classify_intent(user_message.lower(), priority=priority, deadline=deadline)
 
     # --- Check-in Flow ---
     if state == 'AWAITING_NAME':
@@ -189,19 +229,13 @@ def chat():
         else:
             # SUPABASE: Profile lookup and interaction log
             try:
-                guest_id, is_new = get_or_create_guest(guest_phone)
+                guest_id, is_new = guest_cache.get_or_create(guest_phone)
                 session['guest_phone'] = guest_phone
+                session['guest_id'] = guest_id
                 interaction_id = log_interaction(guest_id, intent, user_message, "initiated")
                 result = verify_and_check_in(guest_name, guest_phone)
                 if result['success']:
-                    bot_response = (
-                        f"Perfect! Welcome, {result['guest_name']}! \n\n"
-                        f"You are all checked in to your **{result['room_type']}** room. \n"
-                        f"Your room number is **{result['room_number']}**. \n\n"
-                        f"Your key is in **Box {result['box_id']}**. I am unlocking it for you right now. \n\n"
-                        "Have a wonderful stay! 🎉\n\n"
-                        "I'm here if you need anything else - just ask!"
-                    )
+                    bot_response = check_in_success_reply(result)
                     action = {
                         'type': 'unlock',
                         'box_id': result['box_id'],
@@ -214,10 +248,7 @@ def chat():
                     session['checked_in_room'] = result['room_number']
                     session['guest_name'] = result['guest_name']
                 else:
-                    bot_response = (
-                        f"{result['message']} \n\n"
-                        "Would you like to try again? (Say 'check in' to restart, or ask a question)"
-                    )
+                    bot_response = check_in_failed_reply(result)
                     update_interaction_status(interaction_id, "failed")
                     session['state'] = 'INIT'
                     session['guest_name'] = None
@@ -234,42 +265,28 @@ def chat():
         guest_phone = session.get('guest_phone', None)
         if guest_phone and guest_phone.isdigit():
             try:
-                guest_id, _ = get_or_create_guest(guest_phone)
+                guest_id = resolve_guest_id(guest_phone)
                 interaction_id = log_interaction(guest_id, intent, user_message, "initiated")
-                summary = summarize_request(user_message)
-                send_result = send_housekeeping_notification(
-                    request_text=user_message,
-                    summary=summary,
-                    guest_name=guest_name,
-                    room_number=room_number
-                )
-                if send_result['success']:
-                    bot_response = (
-                        f"✅ Your housekeeping request has been received!\n\n"
-                        f"**Request:** {summary}\n"
-                        f"**Room:** {room_number}\n\n"
-                        "Our staff has been notified and will attend to it shortly.\n\n"
-                        "Is there anything else I can help with?"
+                # Summary, staff alert and analytics run in the background
+                with span('housekeeping.submit'):
+                    ticket_id, merged = housekeeping_jobs.submit(
+                        user_message, guest_name, room_number,
+                        context={'interaction_id': interaction_id},
+                        summary=fused.get('summary') if fused else None
                     )
-                    action = {
-                        'type': 'housekeeping',
-                        'summary': summary,
-                        'notification_id': send_result.get('notification_id')
-                    }
+                tickets = [t for t in session.get('housekeeping_tickets', []) if t != ticket_id]
+                session['housekeeping_tickets'] = (tickets + [ticket_id])[-MAX_SESSION_TICKETS:]
+                if merged:
+                    bot_response = housekeeping_merged_reply(ticket_id, room_number)
+                    update_interaction_status(interaction_id, "resolved")
                 else:
-                    bot_response = (
-                        f"✅ Your housekeeping request has been logged!\n\n"
-                        f"**Request:** {summary}\n"
-                        f"**Room:** {room_number}\n\n"
-                        "Our staff will be notified. For urgent requests, please call the front desk.\n\n"
-                        "Is there anything else I can help with?"
-                    )
-                    action = {
-                        'type': 'housekeeping',
-                        'summary': summary
-                    }
-                create_service_request(interaction_id, "housekeeping")
-                update_interaction_status(interaction_id, "resolved")
+                    bot_response = housekeeping_accepted_reply(ticket_id, room_number)
+                action = {
+                    'type': 'housekeeping',
+                    'ticket_id': ticket_id,
+                    'notification_id': ticket_id,
+                    'merged': merged
+                }
             except Exception as e:
                 bot_response = f"Sorry, there was an error processing your housekeeping request: {e}"
         else:
@@ -277,12 +294,15 @@ def chat():
         session['state'] = 'INIT'
     # --- FAQ/General Query ---
     elif intent == 'faq':
-        answer = llm_answer_faq(user_message, HOTEL_INFO)
+        if fused and fused.get('answer'):
+            answer = fused['answer']
+        else:
+            answer = llm_answer_faq(user_message, get_hotel_info(), deadline=deadline)
         # Optional for analytics: only log if phone is valid
         guest_phone = session.get('guest_phone', None)
         if guest_phone and guest_phone.isdigit():
             try:
-                guest_id, _ = get_or_create_guest(guest_phone)
+                guest_id = resolve_guest_id(guest_phone)
                 interaction_id = log_interaction(guest_id, intent, user_message, "initiated")
                 update_interaction_status(interaction_id, "resolved")
             except:
@@ -292,33 +312,203 @@ def chat():
     # --- Fallback for Other Queries ---
     else:
         if checked_in:
-            bot_response = (
-                "I can help you with:\n\n"
-                "• **Questions** - Ask about hotel amenities, location, or services\n"
-                "• **Housekeeping** - Send requests to our staff\n\n"
-                "What would you like to know?"
-            )
+            bot_response = HELP_CHECKED_IN_REPLY
         else:
-            bot_response = (
-                "I'm Nexrova, your AI hotel assistant. I can help with:\n\n"
-                "• **Check-in** - Verify your booking and get your room key\n"
-                "• **Questions** - Ask about hotel amenities, location, or services\n"
-                "• **Housekeeping** - Send requests to our staff\n\n"
-                "How can I assist you today?"
-            )
+            bot_response = HELP_REPLY
         session['state'] = 'INIT'
 
     return jsonify({'response': bot_response, 'action': action})
 
+@app.route('/housekeeping/jobs/<ticket_id>', methods=['GET'])
+def housekeeping_job_status(ticket_id):
+    # Guests can only poll tickets raised in their own session
+    if ticket_id not in session.get('housekeeping_tickets', []):
+        return jsonify({'error': 'Ticket not found'}), 404
+    job = housekeeping_jobs.status(ticket_id)
+    if job is None:
+        return jsonify({'error': 'Ticket not found'}), 404
+    return jsonify(job)
+
+# --- Staff housekeeping board ---
+HOUSEKEEPING_STAFF_TOKEN = os.environ.get('HOUSEKEEPING_STAFF_TOKEN')
+
+def staff_authorized():
+    """Staff pages need X-Staff-Token; without HOUSEKEEPING_STAFF_TOKEN set they only answer this host"""
+    if not HOUSEKEEPING_STAFF_TOKEN:
+        return is_local_request(request.remote_addr, request.headers.get('X-Forwarded-For'))
+    token = request.headers.get('X-Staff-Token') or request.args.get('token')
+    return token == HOUSEKEEPING_STAFF_TOKEN
+
+@app.route('/housekeeping')
+def housekeeping_page():
+    if not staff_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return render_template('housekeeping.html')
+
+@app.route('/housekeeping/requests', methods=['GET'])
+def housekeeping_requests():
+    if not staff_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify(housekeeping_board.snapshot())
+
+@app.route('/housekeeping/requests/<notification_id>/<transition>', methods=['POST'])
+def housekeeping_transition(notification_id, transition):
+    if not staff_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    if transition not in ('claim', 'complete'):
+        return jsonify({'error': 'Unknown action'}), 404
+    staff_name = ((request.get_json(silent=True) or {}).get('staff') or '').strip()
+    if not staff_name:
+        return jsonify({'error': 'Staff name is required'}), 400
+    if transition == 'claim':
+        updated = housekeeping_board.claim(notification_id, staff_name)
+    else:
+        updated = housekeeping_board.complete(notification_id, staff_name)
+    if updated is None:
+        return jsonify({'error': f'Request is not open for {transition} (already taken or closed)'}), 409
+    return jsonify(updated)
+
+@app.route('/housekeeping/next', methods=['POST'])
+def housekeeping_next_task():
+    if not staff_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    staff_name = ((request.get_json(silent=True) or {}).get('staff') or '').strip()
+    if not staff_name:
+        return jsonify({'error': 'Staff name is required'}), 400
+    task = housekeeping_dispatcher.next_task(staff_name)
+    if task is None:
+        return jsonify({'task': None, 'message': 'No pending requests'})
+    return jsonify({'task': task})
+
+@app.route('/housekeeping/queue', methods=['GET'])
+def housekeeping_queue():
+    if not staff_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify(housekeeping_dispatcher.queue())
+
+@app.route('/housekeeping/stream', methods=['GET'])
+def housekeeping_stream():
+    if not staff_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return Response(
+        housekeeping_board.stream(), mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/reset', methods=['POST'])
 def reset():
     session.clear()
     session['state'] = 'INIT'
     session['guest_name'] = None
     session['guest_phone'] = None
+    session['guest_id'] = None
     session['checked_in'] = False
     return jsonify({'response': "Conversation reset. How can I help you?", 'action': None})
 
+# --- Debug endpoints ---
+DEBUG_TOKEN = os.environ.get('DEBUG_TOKEN')
+
+def debug_authorized():
+    """Debug endpoints need X-Debug-Token; without DEBUG_TOKEN set they only answer this host"""
+    if not DEBUG_TOKEN:
+        return is_local_request(request.remote_addr, request.headers.get('X-Forwarded-For'))
+    token = request.headers.get('X-Debug-Token') or request.args.get('token')
+    return token == DEBUG_TOKEN
+
+@app.route('/debug/traces', methods=['GET'])
+def debug_traces():
+    """Recent traces (?name=chat&min_ms=500&limit=20) with the hottest stages, or one turn by ?trace_id="""
+    if not debug_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    trace_id = request.args.get('trace_id')
+    if trace_id:
+        return jsonify({'traces': trace_recorder.get(trace_id)})
+    name = request.args.get('name')
+    return jsonify({
+        'stats': trace_recorder.stats(),
+        'hot_stages': trace_recorder.hot_stages(name),
+        'traces': trace_recorder.recent(
+            limit=request.args.get('limit', 50, type=int),
+            name=name,
+            min_ms=request.args.get('min_ms', 0.0, type=float)
+        )
+    })
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """
+    Sample every thread for ?seconds=N (default 10) and return collapsed
+    stacks for flamegraph.pl/speedscope, or ?format=json for the top
+    functions. ?mode=alloc returns the tracemalloc allocation growth over
+    the window instead.
+    """
+    if not debug_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    seconds = request.args.get('seconds', 10.0, type=float)
+    limit = request.args.get('limit', 30, type=int)
+    try:
+        if request.args.get('mode', 'cpu') == 'alloc':
+            group_by = 'traceback' if request.args.get('group_by') == 'traceback' else 'lineno'
+            return jsonify(profiler.allocations(seconds, limit, group_by))
+        interval_ms = request.args.get('interval_ms', type=float)
+        interval = interval_ms / 1000 if interval_ms else None
+        output = 'json' if request.args.get('format') == 'json' else 'collapsed'
+        idle = request.args.get('idle') == '1'
+        result = profiler.profile(seconds, interval, output, idle, limit)
+    except ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 409
+    if output == 'json':
+        return jsonify(result)
+    return result, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """
+    Readiness probe: 503 until the hotel information is loaded and the
+    Supabase client is available. Ollama and the arrivals mirror are
+    reported but not required, as chat falls back without them.
+    """
+    checks = {
+        'hotel_info': hotel_info_loaded(),
+        'supabase': supabase_client.ready()
+    }
+    is_ready = all(checks.values())
+    return jsonify({
+        'ready': is_ready,
+        'checks': checks,
+        'degraded': {
+            'ollama': ollama_breaker.stats()['state'] != CLOSED,
+            'arrivals_mirror': ARRIVALS_MIRROR_ENABLED and not arrivals_mirror.is_current()
+        }
+    }), 200 if is_ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify({
+        'ollama_breaker': ollama_breaker.stats(),
+        'ollama_latency': ollama_latency.stats(),
+        'llm_tasks': task_latency.stats(TASK_ROUTES),
+        'llm_hedge': llm_hedge.stats(),
+        'llm_scheduler': llm_scheduler.stats(),
+        'faq_cache': faq_cache.stats(),
+        'guest_cache': guest_cache.stats(),
+        'supabase_writer': supabase_writer.stats(),
+        'housekeeping_jobs': housekeeping_jobs.stats(),
+        'housekeeping_board': housekeeping_board.stats(),
+        'housekeeping_dispatch': housekeeping_dispatcher.stats(),
+        'email_dispatcher': email_dispatcher.stats(),
+        'sessions': session_store.stats() if session_store else {'backend': 'filesystem'},
+        'arrivals_mirror': arrivals_mirror.stats(),
+        'admission': chat_admission.stats(),
+        'tracing': trace_recorder.stats(),
+        'profiler': profiler.stats(),
+        'logging': logging_stats(),
+        'clients': {'supabase': supabase_client.stats()}
+    })
+
+if GC_FREEZE:
+    gc.freeze()
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5001))
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,159 @@
+import os
+import time
+import threading
+from datetime import datetime
+
+import requests
+
+from chat_common import PMS_API_URL, normalize_phone
+from event_log import get_logger
+
+log = get_logger('arrivals')
+
+# Arrivals mirror configuration
+ARRIVALS_MIRROR_ENABLED = os.environ.get('ARRIVALS_MIRROR_ENABLED', '1') == '1'
+ARRIVALS_POLL_INTERVAL = float(os.environ.get('ARRIVALS_POLL_INTERVAL', 5))
+# A mirror not confirmed current for this long is not trusted for "not found"
+ARRIVALS_MAX_STALENESS = float(os.environ.get('ARRIVALS_MAX_STALENESS', 60))
+
+
+def arrival_key(guest_name, guest_phone):
+    """Index key of an arrival: normalized phone plus case-folded name"""
+    return normalize_phone(guest_phone or ''), (guest_name or '').strip().lower()
+
+
+class ArrivalsMirror:
+    """
+    In-memory copy of today's confirmed arrivals from the PMS.
+
+    Loaded on first use and again when the date rolls over, then kept fresh
+    by a poller thread that sends the PMS version token back; while no
+    booking changes, each poll returns only the token. Check-in verification
+    is a dict lookup by (phone, name) instead of fetching and scanning every
+    booking; only the final status change goes to the PMS.
+
+    A miss triggers one immediate poll before it is believed, so a booking
+    made seconds ago is still found. While the mirror is not current (never
+    loaded, or the PMS unreachable for ARRIVALS_MAX_STALENESS) lookups report
+    that, and callers fall back to the full booking scan.
+    """
+
+    def __init__(self, api_url=PMS_API_URL, poll_interval=ARRIVALS_POLL_INTERVAL,
+                 max_staleness=ARRIVALS_MAX_STALENESS):
+        self.api_url = api_url
+        self.poll_interval = poll_interval
+        self.max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._index = {}
+        self._date = None
+        self._version = None
+        self._synced_at = None
+        self._poller = None
+        self.reloads = 0
+        self.polls = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def start(self):
+        """Load today's arrivals and start the poller thread"""
+        if self._poller is not None and self._poller.is_alive():
+            return
+        with self._lock:
+            if self._poller is None or not self._poller.is_alive():
+                self._poller = threading.Thread(target=self._poll_loop, name='arrivals-mirror', daemon=True)
+                self._poller.start()
+
+    def _poll_loop(self):
+        while True:
+            self.refresh()
+            time.sleep(self.poll_interval)
+
+    def refresh(self):
+        """
+        Bring the mirror up to date: a full load on a new day, otherwise a poll
+        with the version token. Returns True if the mirror is current.
+        """
+        with self._refresh_lock:
+            today = datetime.now().strftime('%Y-%m-%d')
+            since = self._version if self._date == today else None
+            try:
+                params = {'date': today}
+                if since:
+                    params['since'] = since
+                response = requests.get(f"{self.api_url}/arrivals", params=params, timeout=5)
+                response.raise_for_status()
+                payload = response.json()
+            except Exception as e:
+                self.errors += 1
+                log.warning("Could not refresh arrivals: %s", e)
+                return False
+
+            with self._lock:
+                if payload.get('changed', True):
+                    self._index = {
+                        arrival_key(b.get('guest_name'), b.get('guest_phone')): b
+                        for b in payload.get('data', [])
+                    }
+                    self._date = today
+                    self.reloads += 1
+                self._version = payload.get('version')
+                self._synced_at = time.monotonic()
+                self.polls += 1
+            return True
+
+    def is_current(self):
+        with self._lock:
+            return (self._synced_at is not None
+                    and self._date == datetime.now().strftime('%Y-%m-%d')
+                    and time.monotonic() - self._synced_at < self.max_staleness)
+
+    def _get(self, guest_name, guest_phone):
+        with self._lock:
+            return self._index.get(arrival_key(guest_name, guest_phone))
+
+    def lookup(self, guest_name, guest_phone, refresh_on_miss=True):
+        """
+        Today's confirmed booking for this name and phone.
+
+        Returns:
+            tuple: (booking or None, authoritative). authoritative is False when
+            the mirror is not current and a miss proves nothing.
+        """
+        self.start()
+        booking = self._get(guest_name, guest_phone)
+        if booking is None and refresh_on_miss:
+            self.refresh()
+            booking = self._get(guest_name, guest_phone)
+        if booking is not None:
+            self.hits += 1
+            return booking, True
+        self.misses += 1
+        return None, self.is_current()
+
+    def discard(self, booking):
+        """Drop a booking that is no longer a pending arrival (e.g. just checked in)"""
+        with self._lock:
+            key = arrival_key(booking.get('guest_name'), booking.get('guest_phone'))
+            if self._index.get(key, {}).get('booking_id') == booking.get('booking_id'):
+                del self._index[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': ARRIVALS_MIRROR_ENABLED,
+                'date': self._date,
+                'version': self._version,
+                'arrivals': len(self._index),
+                'synced_seconds_ago': round(time.monotonic() - self._synced_at, 1) if self._synced_at else None,
+                'reloads': self.reloads,
+                'polls': self.polls,
+                'hits': self.hits,
+                'misses': self.misses,
+                'errors': self.errors
+            }
+
+
+# Process-wide mirror shared by all requests
+arrivals_mirror = ArrivalsMirror()
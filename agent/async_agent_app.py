@@ -0,0 +1,462 @@
+"""
+ASGI variant of agent_app built on Quart.
+
+The conversation flow, replies and process-wide services (lazy Supabase
+client, analytics write-behind, guest cache, housekeeping jobs, admission
+control) are the same as agent_app. Ollama and the PMS are called through
+async clients, LLM callers queue on the event loop, and steps that do not
+depend on each other run concurrently. Serve it with an ASGI server:
+
+    hypercorn async_agent_app:app --bind 0.0.0.0:5001
+"""
+import asyncio
+import math
+import os
+import secrets
+import sys
+from datetime import datetime
+
+import httpx
+from dotenv import load_dotenv
+from quart import Quart, render_template, request, jsonify, session, g
+
+# Helpers shared by the agent and the PMS (e.g. the profiler) live in ../shared
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'shared'))
+
+import async_llm_handler
+from async_llm_handler import llm_classify_intent, llm_answer_faq, llm_fused_turn
+from llm_handler import ollama_breaker, ollama_latency, task_latency, TASK_ROUTES, start_warm_up
+from llm_scheduler import llm_scheduler, PRIORITY_CHECK_IN, PRIORITY_HOUSEKEEPING
+from llm_hedge import llm_hedge, turn_deadline
+from faq_cache import faq_cache
+from arrivals_mirror import arrivals_mirror, ARRIVALS_MIRROR_ENABLED
+from admission import chat_admission, forwarded_client, COST_LLM, COST_BASIC
+from tracing import start_trace, finish_trace, span, traced, trace_recorder
+from profiler import profiler, ProfilerBusy
+from local_access import is_local_request
+from event_log import get_logger, logging_stats
+from circuit_breaker import CLOSED
+from chat_services import (
+    supabase_client, supabase_writer, guest_cache, housekeeping_jobs, MAX_SESSION_TICKETS,
+    log_interaction, update_interaction_status, update_guest_on_checkin
+)
+from housekeeping_notification import email_dispatcher
+from chat_common import (
+    PMS_API_URL, get_hotel_info, hotel_info_loaded, find_todays_booking, build_check_in_result,
+    BOOKING_NOT_FOUND, BOOKING_UPDATE_FAILED, PMS_UNAVAILABLE, PMS_CONNECTION_ERROR,
+    PMS_TIMEOUT, PMS_UNEXPECTED_ERROR, already_checked_in_reply, check_in_success_reply,
+    check_in_failed_reply, housekeeping_accepted_reply, housekeeping_merged_reply,
+    HELP_CHECKED_IN_REPLY, HELP_REPLY, RATE_LIMITED_REPLY
+)
+
+# Load environment variables
+load_dotenv()
+
+log = get_logger('app')
+
+app = Quart(__name__)
+app.config['SECRET_KEY'] = 'super-secret-key-for-nexrova'
+
+pms_client: httpx.AsyncClient = None
+
+@app.before_serving
+async def startup():
+    # Supabase is not touched here: its client is built on first use (see /ready)
+    global pms_client
+    pms_client = httpx.AsyncClient(base_url=PMS_API_URL, timeout=5)
+    start_warm_up(get_hotel_info())
+    if ARRIVALS_MIRROR_ENABLED:
+        arrivals_mirror.start()
+    # Deliver emails left in the outbox by a previous run
+    email_dispatcher.start()
+    # Finish housekeeping jobs a previous run accepted, and watch for stale claims
+    housekeeping_jobs.start()
+
+@app.after_serving
+async def shutdown():
+    await pms_client.aclose()
+    await async_llm_handler.close_client()
+
+
+# --- Supabase helper functions ---
+# Writes go through the shared write-behind queue and never wait for Supabase.
+async def guest_id_for(guest_phone):
+    """Guest id from the process-wide cache; a miss is loaded off the event loop"""
+    guest_id = guest_cache.peek(guest_phone)
+    if guest_id is None:
+        guest_id, _ = await asyncio.to_thread(guest_cache.get_or_create, guest_phone)
+    return guest_id
+
+async def resolve_guest_id(guest_phone):
+    """Guest id for the session's phone: session first, then the process-wide cache"""
+    if session.get('guest_id') is not None and session.get('guest_phone') == guest_phone:
+        return session['guest_id']
+    guest_id = await guest_id_for(guest_phone)
+    session['guest_id'] = guest_id
+    return guest_id
+
+async def start_interaction(guest_phone, intent_type, user_query):
+    """Guest id lookup followed by a queued interaction insert; returns (guest_id, interaction_id)"""
+    guest_id = await guest_id_for(guest_phone)
+    return guest_id, log_interaction(guest_id, intent_type, user_query, "initiated")
+
+# --- PMS check-in logic ---
+@traced('pms.check_in')
+async def verify_and_check_in(guest_name, guest_phone):
+    today_str = datetime.now().strftime('%Y-%m-%d')
+    try:
+        target_booking, authoritative = None, False
+        if ARRIVALS_MIRROR_ENABLED:
+            # A miss polls the PMS once before it is believed; keep that off the event loop
+            target_booking, authoritative = await asyncio.to_thread(arrivals_mirror.lookup, guest_name, guest_phone)
+        if not target_booking and not authoritative:
+            # Mirror not current: scan all bookings on the PMS
+            response = await pms_client.get("/bookings")
+            if response.status_code != 200:
+                return PMS_UNAVAILABLE
+            bookings = response.json().get('data', [])
+            target_booking = find_todays_booking(bookings, guest_name, guest_phone, today_str)
+        if not target_booking:
+            return BOOKING_NOT_FOUND
+        booking_id = target_booking['booking_id']
+        update_response = await pms_client.put(
+            f"/bookings/{booking_id}", json={'status': 'checked_in', 'expected_status': 'confirmed'}
+        )
+        if update_response.status_code == 409:
+            # Cancelled or checked in since the mirror last saw it
+            arrivals_mirror.discard(target_booking)
+            return BOOKING_NOT_FOUND
+        if update_response.status_code != 200:
+            return BOOKING_UPDATE_FAILED
+        arrivals_mirror.discard(target_booking)
+        return build_check_in_result(target_booking, update_response.json().get('data', {}))
+    except httpx.ConnectError:
+        return PMS_CONNECTION_ERROR
+    except httpx.TimeoutException:
+        return PMS_TIMEOUT
+    except Exception as e:
+        log.error("Error in verify_and_check_in: %s", e)
+        return PMS_UNEXPECTED_ERROR
+
+# --- Per-turn tracing ---
+@app.before_request
+async def start_turn_trace():
+    if request.endpoint == 'chat':
+        g.trace = start_trace('chat')
+
+@app.after_request
+async def finish_turn_trace(response):
+    trace = g.pop('trace', None)
+    if trace is not None:
+        finish_trace(trace, status=response.status_code)
+        response.headers['Server-Timing'] = trace.server_timing()
+        response.headers['X-Trace-Id'] = trace.trace_id
+    return response
+
+@app.route('/')
+async def index():
+    session.clear()
+    session['state'] = 'INIT'
+    session['guest_name'] = None
+    session['guest_phone'] = None
+    session['guest_id'] = None
+    session['checked_in'] = False
+    return await render_template('index.html')
+
+def client_ip():
+    return forwarded_client(request.headers.get('X-Forwarded-For'), request.remote_addr)
+
+def admission_session_key():
+    """
+    Admission key of an established session, or None for a new one. Cookie
+    sessions have no server-side id, so one is issued with the first reply;
+    until a client sends it back, admission charges its turns per IP.
+    """
+    session_key = session.get('admission_id')
+    if session_key is None:
+        session['admission_id'] = secrets.token_urlsafe(16)
+    return session_key
+
+def rate_limited_response(retry_after):
+    seconds = max(1, math.ceil(retry_after))
+    response = jsonify({'response': RATE_LIMITED_REPLY, 'action': None, 'retry_after': seconds})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(seconds)
+    return response
+
+@app.route('/chat', methods=['POST'])
+async def chat():
+    data = await request.get_json()
+    user_message = data.get('message', '').strip()
+    if not user_message:
+        return jsonify({'response': "Please enter a message.", 'action': None})
+
+    state = session.get('state', 'INIT')
+    checked_in = session.get('checked_in', False)
+    bot_response = "I'm not sure how to help with that."
+    action = None
+
+    # Admission control: turns that reach the LLM cost more than check-in steps and shortcuts
+    shortcut = checked_in and any(word in user_message.lower() for word in ['check in', 'checked in', 'already'])
+    kind = COST_BASIC if shortcut or state in ['AWAITING_NAME', 'AWAITING_PHONE'] else COST_LLM
+    admitted, retry_after, _ = chat_admission.admit(admission_session_key(), client_ip(), kind)
+    if not admitted:
+        return rate_limited_response(retry_after)
+
+    # Checked-in guest shortcut
+    if shortcut:
+        room = session.get('checked_in_room', 'your room')
+        return jsonify({'response': already_checked_in_reply(room), 'action': None})
+
+    # Intent classification; all LLM calls of this turn share one deadline
+    deadline = turn_deadline()
+    fused = None
+    if state in ['AWAITING_NAME', 'AWAITING_PHONE']:
+        intent = 'check_in'
+    else:
+        priority = PRIORITY_HOUSEKEEPING if checked_in else PRIORITY_CHECK_IN
+        # Fused mode classifies and summarizes/answers in one call (None if off)
+        fused = await llm_fused_turn(user_message, get_hotel_info(), priority=priority, deadline=deadline)
+        if fused:
+            intent = fused['intent']
+        else:
+            intent = await llm_classify_intent(user_message.lower(), priority=priority, deadline=deadline)
+
+    # --- Check-in Flow ---
+    if state == 'AWAITING_NAME':
+        session['guest_name'] = user_message.strip()
+        bot_response = f"Got it, {session['guest_name']}. And what's the **phone number** associated with the booking?"
+        session['state'] = 'AWAITING_PHONE'
+    elif state == 'AWAITING_PHONE':
+        guest_name = session.get('guest_name', '')
+        guest_phone = user_message.strip().replace('-', '').replace(' ', '')
+        if not guest_name:
+            bot_response = "I seem to have lost your name. Let's start over. What's the full name on the reservation?"
+            session['state'] = 'AWAITING_NAME'
+            session['guest_name'] = None
+        elif not guest_phone.isdigit():
+            bot_response = "Please enter a valid phone number (digits only)."
+            session['state'] = 'AWAITING_PHONE'
+        else:
+            # The guest lookup and the PMS check-in are independent.
+            # The PMS result decides the reply: once the booking is checked in
+            # the guest must get the unlock, whatever happened to the analytics.
+            started, result = await asyncio.gather(
+                start_interaction(guest_phone, intent, user_message),
+                verify_and_check_in(guest_name, guest_phone),
+                return_exceptions=True
+            )
+            if isinstance(started, BaseException):
+                log.warning("Could not log check-in interaction: %s", started)
+                guest_id, interaction_id = None, None
+            else:
+                guest_id, interaction_id = started
+            if isinstance(result, BaseException):
+                bot_response = f"Sorry, there was an error processing your check-in: {result}"
+            else:
+                session['guest_phone'] = guest_phone
+                session['guest_id'] = guest_id
+                if result['success']:
+                    bot_response = check_in_success_reply(result)
+                    action = {
+                        'type': 'unlock',
+                        'box_id': result['box_id'],
+                        'room_number': result['room_number']
+                    }
+                    session['state'] = 'INIT'
+                    session['checked_in'] = True
+                    session['checked_in_room'] = result['room_number']
+                    session['guest_name'] = result['guest_name']
+                    if interaction_id is not None:
+                        update_guest_on_checkin(guest_id, result["guest_name"], result["room_number"], datetime.now().isoformat())
+                        update_interaction_status(interaction_id, "checked_in")
+                else:
+                    bot_response = check_in_failed_reply(result)
+                    session['state'] = 'INIT'
+                    session['guest_name'] = None
+                    if interaction_id is not None:
+                        update_interaction_status(interaction_id, "failed")
+    elif intent == 'check_in' and state == 'INIT' and not checked_in:
+        bot_response = "Welcome! To check you in, I need to verify your booking. What's the **full name** on the reservation?"
+        session['state'] = 'AWAITING_NAME'
+        session['guest_name'] = None
+    # --- Housekeeping Flow ---
+    elif intent == 'housekeeping' and checked_in:
+        guest_name = session.get('guest_name', 'Guest')
+        room_number = session.get('checked_in_room', 'Unknown')
+        guest_phone = session.get('guest_phone', None)
+        if guest_phone and guest_phone.isdigit():
+            try:
+                guest_id = await resolve_guest_id(guest_phone)
+                interaction_id = log_interaction(guest_id, intent, user_message, "initiated")
+                # Summary, staff alert and analytics run in the background;
+                # accepting the job appends to the housekeeping log, so keep it off the event loop
+                with span('housekeeping.submit'):
+                    ticket_id, merged = await asyncio.to_thread(
+                        housekeeping_jobs.submit,
+                        user_message, guest_name, room_number,
+                        context={'interaction_id': interaction_id},
+                        summary=fused.get('summary') if fused else None
+                    )
+                tickets = [t for t in session.get('housekeeping_tickets', []) if t != ticket_id]
+                session['housekeeping_tickets'] = (tickets + [ticket_id])[-MAX_SESSION_TICKETS:]
+                if merged:
+                    bot_response = housekeeping_merged_reply(ticket_id, room_number)
+                    update_interaction_status(interaction_id, "resolved")
+                else:
+                    bot_response = housekeeping_accepted_reply(ticket_id, room_number)
+                action = {
+                    'type': 'housekeeping',
+                    'ticket_id': ticket_id,
+                    'notification_id': ticket_id,
+                    'merged': merged
+                }
+            except Exception as e:
+                bot_response = f"Sorry, there was an error processing your housekeeping request: {e}"
+        else:
+            bot_response = "To request housekeeping, you need to check in first."
+        session['state'] = 'INIT'
+    # --- FAQ/General Query ---
+    elif intent == 'faq':
+        if fused and fused.get('answer'):
+            answer = fused['answer']
+        else:
+            answer = await llm_answer_faq(user_message, get_hotel_info(), deadline=deadline)
+        # Optional for analytics: only log if phone is valid
+        guest_phone = session.get('guest_phone', None)
+        if guest_phone and guest_phone.isdigit():
+            try:
+                guest_id = await resolve_guest_id(guest_phone)
+                interaction_id = log_interaction(guest_id, intent, user_message, "initiated")
+                update_interaction_status(interaction_id, "resolved")
+            except Exception as e:
+                log.warning("Could not log FAQ interaction: %s", e)
+        bot_response = answer
+        session['state'] = 'INIT'
+    # --- Fallback for Other Queries ---
+    else:
+        if checked_in:
+            bot_response = HELP_CHECKED_IN_REPLY
+        else:
+            bot_response = HELP_REPLY
+        session['state'] = 'INIT'
+
+    return jsonify({'response': bot_response, 'action': action})
+
+@app.route('/housekeeping/jobs/<ticket_id>', methods=['GET'])
+async def housekeeping_job_status(ticket_id):
+    # Guests can only poll tickets raised in their own session
+    if ticket_id not in session.get('housekeeping_tickets', []):
+        return jsonify({'error': 'Ticket not found'}), 404
+    job = await asyncio.to_thread(housekeeping_jobs.status, ticket_id)
+    if job is None:
+        return jsonify({'error': 'Ticket not found'}), 404
+    return jsonify(job)
+
+@app.route('/reset', methods=['POST'])
+async def reset():
+    session.clear()
+    session['state'] = 'INIT'
+    session['guest_name'] = None
+    session['guest_phone'] = None
+    session['guest_id'] = None
+    session['checked_in'] = False
+    return jsonify({'response': "Conversation reset. How can I help you?", 'action': None})
+
+# --- Debug endpoints ---
+DEBUG_TOKEN = os.environ.get('DEBUG_TOKEN')
+
+def debug_authorized():
+    """Debug endpoints need X-Debug-Token; without DEBUG_TOKEN set they only answer this host"""
+    if not DEBUG_TOKEN:
+        return is_local_request(request.remote_addr, request.headers.get('X-Forwarded-For'))
+    token = request.headers.get('X-Debug-Token') or request.args.get('token')
+    return token == DEBUG_TOKEN
+
+@app.route('/debug/traces', methods=['GET'])
+async def debug_traces():
+    """Recent traces (?name=chat&min_ms=500&limit=20) with the hottest stages, or one turn by ?trace_id="""
+    if not debug_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    trace_id = request.args.get('trace_id')
+    if trace_id:
+        return jsonify({'traces': trace_recorder.get(trace_id)})
+    name = request.args.get('name')
+    return jsonify({
+        'stats': trace_recorder.stats(),
+        'hot_stages': trace_recorder.hot_stages(name),
+        'traces': trace_recorder.recent(
+            limit=request.args.get('limit', 50, type=int),
+            name=name,
+            min_ms=request.args.get('min_ms', 0.0, type=float)
+        )
+    })
+
+@app.route('/debug/profile', methods=['GET'])
+async def debug_profile():
+    """
+    Sample every thread for ?seconds=N (default 10) and return collapsed
+    stacks for flamegraph.pl/speedscope, or ?format=json for the top
+    functions. ?mode=alloc returns the tracemalloc allocation growth over
+    the window instead.
+    """
+    if not debug_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    seconds = request.args.get('seconds', 10.0, type=float)
+    limit = request.args.get('limit', 30, type=int)
+    try:
+        if request.args.get('mode', 'cpu') == 'alloc':
+            group_by = 'traceback' if request.args.get('group_by') == 'traceback' else 'lineno'
+            return jsonify(await asyncio.to_thread(profiler.allocations, seconds, limit, group_by))
+        interval_ms = request.args.get('interval_ms', type=float)
+        interval = interval_ms / 1000 if interval_ms else None
+        output = 'json' if request.args.get('format') == 'json' else 'collapsed'
+        idle = request.args.get('idle') == '1'
+        result = await asyncio.to_thread(profiler.profile, seconds, interval, output, idle, limit)
+    except ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 409
+    if output == 'json':
+        return jsonify(result)
+    return result, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+
+@app.route('/ready', methods=['GET'])
+async def ready():
+    """Readiness probe, as agent_app's /ready; a first Supabase build runs off the event loop"""
+    checks = {
+        'hotel_info': hotel_info_loaded(),
+        'supabase': await asyncio.to_thread(supabase_client.ready)
+    }
+    is_ready = all(checks.values())
+    return jsonify({
+        'ready': is_ready,
+        'checks': checks,
+        'degraded': {
+            'ollama': ollama_breaker.stats()['state'] != CLOSED,
+            'arrivals_mirror': ARRIVALS_MIRROR_ENABLED and not arrivals_mirror.is_current()
+        }
+    }), 200 if is_ready else 503
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    return jsonify({
+        'ollama_breaker': ollama_breaker.stats(),
+        'ollama_latency': ollama_latency.stats(),
+        'llm_tasks': task_latency.stats(TASK_ROUTES),
+        'llm_hedge': llm_hedge.stats(),
+        'arrivals_mirror': arrivals_mirror.stats(),
+        'llm_scheduler': llm_scheduler.stats(),
+        'faq_cache': faq_cache.stats(),
+        'guest_cache': guest_cache.stats(),
+        'supabase_writer': supabase_writer.stats(),
+        'housekeeping_jobs': housekeeping_jobs.stats(),
+        'email_dispatcher': email_dispatcher.stats(),
+        'admission': chat_admission.stats(),
+        'tracing': trace_recorder.stats(),
+        'profiler': profiler.stats(),
+        'logging': logging_stats(),
+        'clients': {'supabase': supabase_client.stats()}
+    })
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 5001))
+    app.run(host='0.0.0.0', port=port)
@@ -0,0 +1,206 @@
+"""
+Async counterparts of the llm_handler entry points for async_agent_app.
+
+Prompts, response parsing, keyword fallbacks, the FAQ cache, the circuit breaker
+and the LLM scheduler are shared with llm_handler; only the HTTP call differs.
+"""
+import time
+
+import httpx
+
+from faq_cache import faq_cache, fingerprint_text, FAQ_CACHE_ENABLED
+from llm_scheduler import llm_scheduler, PRIORITY_HOUSEKEEPING, PRIORITY_FAQ
+from llm_routing import (
+    TASK_CLASSIFY, TASK_FAQ, TASK_SUMMARIZE, TASK_FUSED,
+    OUTCOME_OK, OUTCOME_OVER_BUDGET, OUTCOME_SHED, OUTCOME_UNAVAILABLE, OUTCOME_ERROR
+)
+from llm_handler import (
+    OLLAMA_API_URL, OLLAMA_TIMEOUT, LLM_FUSED_MODE, TASK_ROUTES,
+    ollama_breaker, ollama_latency, task_latency, build_generate_payload,
+    build_fused_prompt, accept_fused_response, keyword_fused_turn,
+    build_classify_prompt, parse_intent, keyword_classify_intent,
+    build_faq_prompt, keyword_answer_faq, accept_faq_answer,
+    build_summary_prompt, accept_summary
+)
+from llm_hedge import llm_hedge, late_results, THIS_TURN, resolve_deadline
+from tracing import span, traced
+from event_log import get_logger
+
+log = get_logger('llm')
+
+_client = None
+
+def get_client():
+    """Shared async HTTP client for Ollama (created on first use inside the event loop)"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(base_url=OLLAMA_API_URL, timeout=OLLAMA_TIMEOUT)
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def call_task(task, prompt, priority=PRIORITY_FAQ, response_format=None):
+    """Async llm_handler.call_task"""
+    route = TASK_ROUTES[task]
+    with span(f"llm.{task}", model=route.model) as current:
+        text, outcome = await _call_task(task, route, prompt, priority, response_format)
+        if current is not None:
+            current.set(outcome=outcome)
+        return text
+
+async def _call_task(task, route, prompt, priority, response_format):
+    started = time.monotonic()
+    if not ollama_breaker.allow_request():
+        task_latency.record(task, OUTCOME_UNAVAILABLE, 0.0)
+        return None, OUTCOME_UNAVAILABLE
+
+    if not await llm_scheduler.acquire_async(priority, max_wait=route.max_wait):
+        log.warning("LLM queue is full, using fallback logic")
+        task_latency.record(task, OUTCOME_SHED, (time.monotonic() - started) * 1000)
+        return None, OUTCOME_SHED
+
+    try:
+        remaining = route.budget - (time.monotonic() - started)
+        if remaining <= 0:
+            ollama_breaker.record_inconclusive()
+            text, outcome = None, OUTCOME_OVER_BUDGET
+        else:
+            with span('ollama.generate', queued_ms=round((time.monotonic() - started) * 1000, 1)):
+                text, outcome = await _generate(
+                    prompt, route.model, route.max_tokens, response_format,
+                    temperature=route.temperature, timeout=remaining, budgeted=True
+                )
+    finally:
+        llm_scheduler.release()
+    task_latency.record(task, outcome, (time.monotonic() - started) * 1000)
+    return text, outcome
+
+async def _generate(prompt, model, max_tokens, response_format=None, temperature=0.7,
+                    timeout=OLLAMA_TIMEOUT, budgeted=False):
+    """Async llm_handler._generate: returns (response text or None, outcome)"""
+    try:
+        started = time.perf_counter()
+        response = await get_client().post(
+            "/api/generate",
+            json=build_generate_payload(prompt, model, max_tokens, response_format, temperature),
+            timeout=timeout
+        )
+        if response.status_code == 200:
+            ollama_breaker.record_success()
+            result = response.json()
+            ollama_latency.record(result, (time.perf_counter() - started) * 1000)
+            return result.get('response', '').strip(), OUTCOME_OK
+        if response.status_code == 404:
+            ollama_breaker.record_inconclusive()
+            log.warning("Ollama model %s not found, using fallback logic", model)
+            return None, OUTCOME_ERROR
+        ollama_breaker.record_failure()
+        log.error("Ollama API error: %s", response.status_code)
+        return None, OUTCOME_ERROR
+    except httpx.ConnectError:
+        ollama_breaker.record_failure()
+        log.warning("Cannot connect to Ollama, using fallback logic")
+        return None, OUTCOME_UNAVAILABLE
+    except httpx.TimeoutException:
+        if budgeted and timeout < OLLAMA_TIMEOUT:
+            ollama_breaker.record_timeout()
+            log.warning("%s exceeded its latency budget, using fallback logic", model)
+            return None, OUTCOME_OVER_BUDGET
+        ollama_breaker.record_failure()
+        log.warning("Ollama request timed out, using fallback logic")
+        return None, OUTCOME_UNAVAILABLE
+    except Exception as e:
+        ollama_breaker.record_failure()
+        log.error("Error calling Ollama: %s", e)
+        return None, OUTCOME_ERROR
+
+@traced('classify')
+async def llm_classify_intent(user_message, priority=PRIORITY_HOUSEKEEPING, deadline=THIS_TURN):
+    """Async llm_handler.llm_classify_intent"""
+    late_intent = late_results.get(TASK_CLASSIFY, user_message)
+    if late_intent:
+        return late_intent
+
+    return await llm_hedge.run_async(
+        TASK_CLASSIFY,
+        call_task(TASK_CLASSIFY, build_classify_prompt(user_message), priority=priority),
+        lambda: keyword_classify_intent(user_message),
+        parse_intent,
+        resolve_deadline(deadline),
+        on_late=lambda intent: late_results.put(TASK_CLASSIFY, user_message, intent)
+    )
+
+@traced('faq')
+async def llm_answer_faq(user_message, hotel_info, deadline=THIS_TURN):
+    """Async llm_handler.llm_answer_faq"""
+    fingerprint = fingerprint_text(hotel_info)
+    if FAQ_CACHE_ENABLED:
+        cached_answer = faq_cache.lookup(user_message, fingerprint)
+        if cached_answer:
+            return cached_answer
+
+    return await llm_hedge.run_async(
+        TASK_FAQ,
+        call_task(TASK_FAQ, build_faq_prompt(user_message, hotel_info), priority=PRIORITY_FAQ),
+        lambda: keyword_answer_faq(user_message, hotel_info),
+        lambda llm_response: accept_faq_answer(llm_response, user_message, fingerprint),
+        resolve_deadline(deadline)
+    )
+
+@traced('summarize')
+async def summarize_request(request_text, deadline=THIS_TURN):
+    """Async llm_handler.summarize_request"""
+    late_summary = late_results.get(TASK_SUMMARIZE, request_text)
+    if late_summary:
+        return late_summary
+
+    return await llm_hedge.run_async(
+        TASK_SUMMARIZE,
+        call_task(TASK_SUMMARIZE, build_summary_prompt(request_text), priority=PRIORITY_HOUSEKEEPING),
+        lambda: request_text.strip(),
+        accept_summary,
+        resolve_deadline(deadline),
+        on_late=lambda summary: late_results.put(TASK_SUMMARIZE, request_text, summary)
+    )
+
+@traced('fused')
+async def llm_fused_turn(user_message, hotel_info, priority=PRIORITY_HOUSEKEEPING, deadline=THIS_TURN):
+    """Async llm_handler.llm_fused_turn"""
+    if not LLM_FUSED_MODE:
+        return None
+    late_result = late_results.get(TASK_FUSED, user_message)
+    if late_result:
+        return late_result
+
+    deadline = resolve_deadline(deadline)
+    malformed = []
+    result = await llm_hedge.run_async(
+        TASK_FUSED,
+        call_task(
+            TASK_FUSED, build_fused_prompt(user_message, hotel_info),
+            priority=priority, response_format='json'
+        ),
+        lambda: keyword_fused_turn(user_message, hotel_info),
+        lambda llm_response: accept_fused_response(llm_response, user_message, hotel_info, malformed),
+        deadline,
+        on_late=lambda result: late_results.put(TASK_FUSED, user_message, result)
+    )
+    if malformed and (deadline is None or time.monotonic() < deadline):
+        return await per_task_fused_turn(user_message, hotel_info, priority, deadline)
+    return result
+
+async def per_task_fused_turn(user_message, hotel_info, priority, deadline):
+    """Async llm_handler.per_task_fused_turn"""
+    intent = await llm_classify_intent(user_message.lower(), priority=priority, deadline=deadline)
+    result = {'intent': intent}
+    if intent == 'faq':
+        result['answer'] = await llm_answer_faq(user_message, hotel_info, deadline=deadline)
+    elif intent == 'housekeeping':
+        summary = await summarize_request(user_message, deadline=deadline)
+        if summary != user_message.strip():
+            result['summary'] = summary
+    return result
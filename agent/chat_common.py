@@ -0,0 +1,167 @@
+"""
+Pieces of the guest chat flow shared by agent_app (Flask) and async_agent_app (ASGI):
+configuration, hotel information loading, booking matching and reply texts.
+"""
+import os
+
+from event_log import get_logger
+
+log = get_logger('app')
+
+PMS_API_URL = os.environ.get('PMS_API_URL', 'http://127.0.0.1:5000/api')
+KEY_BOX_MAP = {
+    '101': 'A1', '102': 'A2', '103': 'A3', '104': 'A4',
+    '105': 'B1', '106': 'B2', '107': 'B3', '108': 'B4',
+}
+
+HOTEL_INFO_PATH = os.path.join(os.path.dirname(__file__), 'hotel_info.txt')
+HOTEL_INFO = "Hotel information not available."
+HOTEL_INFO_MTIME = None
+
+def get_hotel_info():
+    """Return hotel_info.txt contents, reloading the file when it changes on disk."""
+    global HOTEL_INFO, HOTEL_INFO_MTIME
+    try:
+        mtime = os.stat(HOTEL_INFO_PATH).st_mtime_ns
+    except FileNotFoundError:
+        if HOTEL_INFO_MTIME != -1:
+            log.warning("%s not found", HOTEL_INFO_PATH)
+            HOTEL_INFO = "Hotel information not available."
+            HOTEL_INFO_MTIME = -1
+        return HOTEL_INFO
+    if mtime != HOTEL_INFO_MTIME:
+        with open(HOTEL_INFO_PATH, 'r', encoding='utf-8') as f:
+            HOTEL_INFO = f.read()
+        HOTEL_INFO_MTIME = mtime
+    return HOTEL_INFO
+
+def hotel_info_loaded():
+    """True if hotel_info.txt could be read"""
+    get_hotel_info()
+    return HOTEL_INFO_MTIME != -1
+
+get_hotel_info()
+
+
+# --- Check-in matching ---
+def normalize_phone(phone):
+    return phone.replace('-', '').replace(' ', '').replace('+91', '')
+
+def find_todays_booking(bookings, guest_name, guest_phone, today_str):
+    """Return the confirmed booking arriving today for this name and phone, or None"""
+    input_phone = normalize_phone(guest_phone)
+    for booking in bookings:
+        booking_phone = normalize_phone(booking.get('guest_phone', ''))
+        if (booking['guest_name'].lower() == guest_name.lower() and
+                booking_phone == input_phone and
+                booking['status'] == 'confirmed' and
+                booking['check_in'] == today_str):
+            return booking
+    return None
+
+def build_check_in_result(target_booking, updated_data):
+    """Successful verify_and_check_in result from the booking and the PMS update response"""
+    room_number = updated_data.get('room_number', target_booking.get('room_number', 'N/A'))
+    room_type = updated_data.get('room_type', target_booking.get('room_type', 'N/A'))
+    return {
+        'success': True,
+        'guest_name': updated_data.get('guest_name', target_booking['guest_name']),
+        'room_number': room_number,
+        'room_type': room_type,
+        'box_id': KEY_BOX_MAP.get(str(room_number), 'Lobby'),
+        'booking_id': target_booking['booking_id']
+    }
+
+BOOKING_NOT_FOUND = {
+    'success': False,
+    'message': "I'm sorry, I couldn't find a confirmed booking for today with that name and phone number. Please check your details or contact the front desk."
+}
+BOOKING_UPDATE_FAILED = {
+    'success': False,
+    'message': 'Found your booking, but there was an error checking you in. Please see the front desk.'
+}
+PMS_UNAVAILABLE = {'success': False, 'message': 'Cannot connect to the booking system.'}
+PMS_CONNECTION_ERROR = {'success': False, 'message': 'Error: Cannot connect to the hotel management system. Please contact the front desk.'}
+PMS_TIMEOUT = {'success': False, 'message': 'Error: Request timed out. Please try again or contact the front desk.'}
+PMS_UNEXPECTED_ERROR = {'success': False, 'message': 'An unexpected error occurred. Please contact the front desk.'}
+
+
+# --- Bot replies ---
+def already_checked_in_reply(room):
+    return (
+        f"You're already checked in to Room {room}! \n\n"
+        "I can help you with:\n"
+        "• **Questions** about the hotel\n"
+        "• **Housekeeping** requests\n\n"
+        "How else can I assist you?"
+    )
+
+def check_in_success_reply(result):
+    return (
+        f"Perfect! Welcome, {result['guest_name']}! \n\n"
+        f"You are all checked in to your **{result['room_type']}** room. \n"
+        f"Your room number is **{result['room_number']}**. \n\n"
+        f"Your key is in **Box {result['box_id']}**. I am unlocking it for you right now. \n\n"
+        "Have a wonderful stay! 🎉\n\n"
+        "I'm here if you need anything else - just ask!"
+    )
+
+def check_in_failed_reply(result):
+    return (
+        f"{result['message']} \n\n"
+        "Would you like to try again? (Say 'check in' to restart, or ask a question)"
+    )
+
+def housekeeping_sent_reply(summary, room_number):
+    return (
+        f"✅ Your housekeeping request has been received!\n\n"
+        f"**Request:** {summary}\n"
+        f"**Room:** {room_number}\n\n"
+        "Our staff has been notified and will attend to it shortly.\n\n"
+        "Is there anything else I can help with?"
+    )
+
+def housekeeping_logged_reply(summary, room_number):
+    return (
+        f"✅ Your housekeeping request has been logged!\n\n"
+        f"**Request:** {summary}\n"
+        f"**Room:** {room_number}\n\n"
+        "Our staff will be notified. For urgent requests, please call the front desk.\n\n"
+        "Is there anything else I can help with?"
+    )
+
+def housekeeping_accepted_reply(ticket_id, room_number):
+    return (
+        f"✅ Your housekeeping request has been received!\n\n"
+        f"**Ticket:** {ticket_id}\n"
+        f"**Room:** {room_number}\n\n"
+        "Our staff are being notified and will attend to it shortly.\n\n"
+        "Is there anything else I can help with?"
+    )
+
+def housekeeping_merged_reply(ticket_id, room_number):
+    return (
+        f"🔔 We already have this request for room {room_number} (ticket **{ticket_id}**).\n\n"
+        "I've added your message to it and marked it as more urgent for our staff.\n\n"
+        "Is there anything else I can help with?"
+    )
+
+HELP_CHECKED_IN_REPLY = (
+    "I can help you with:\n\n"
+    "• **Questions** - Ask about hotel amenities, location, or services\n"
+    "• **Housekeeping** - Send requests to our staff\n\n"
+    "What would you like to know?"
+)
+
+HELP_REPLY = (
+    "I'm Nexrova, your AI hotel assistant. I can help with:\n\n"
+    "• **Check-in** - Verify your booking and get your room key\n"
+    "• **Questions** - Ask about hotel amenities, location, or services\n"
+    "• **Housekeeping** - Send requests to our staff\n\n"
+    "How can I assist you today?"
+)
+
+RATE_LIMITED_REPLY = (
+    "You're sending messages a little too quickly. "
+    "Please wait a few seconds and try again."
+)
@@ -0,0 +1,108 @@
+"""
+Process-wide services behind the guest chat, shared by agent_app (Flask) and
+async_agent_app (ASGI): the lazily built Supabase client, the analytics
+write-behind queue, the guest identity cache and the housekeeping jobs.
+"""
+import os
+import atexit
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from supabase_writer import (
+    SupabaseWriteBehind, new_local_id,
+    INSERT_INTERACTION, UPDATE_INTERACTION, INSERT_SERVICE_REQUEST, UPDATE_GUEST
+)
+from guest_cache import GuestIdentityCache
+from lazy_client import LazyClient
+from housekeeping_jobs import HousekeepingJobs
+from tracing import traced
+
+load_dotenv()
+
+# Supabase connection, built on first use: startup does not wait for it and
+# does not fail when the settings are missing or Supabase is down
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+
+def create_supabase_client():
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set")
+    from supabase import create_client
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+supabase_client = LazyClient('supabase', create_supabase_client)
+
+# Analytics writes are queued and flushed to Supabase in the background
+supabase_writer = SupabaseWriteBehind(supabase_client.get)
+atexit.register(supabase_writer.stop)
+
+# --- Supabase helper functions ---
+@traced('supabase.guest')
+def get_or_create_guest(phone_number):
+    if not phone_number or not phone_number.isdigit():
+        raise ValueError("Invalid or missing phone number for guest record.")
+    supabase = supabase_client.get()
+    result = supabase.table('Guest').select('*').eq('phone_number', phone_number).execute()
+    if result.data:
+        return result.data[0]['guest_id'], False
+    insert_result = supabase.table('Guest').insert({'phone_number': int(phone_number)}).execute()
+    return insert_result.data[0]['guest_id'], True
+
+# Phone -> guest_id lookups are cached across sessions; the id never changes during a stay
+guest_cache = GuestIdentityCache(get_or_create_guest)
+
+def log_interaction(guest_id, intent_type, user_query, status="initiated"):
+    """Queue an interaction insert; returns a client-generated interaction id"""
+    interaction_id = new_local_id()
+    supabase_writer.submit({
+        'op': INSERT_INTERACTION,
+        'local_id': interaction_id,
+        'row': {
+            'guest_id': guest_id,
+            'timestamp': datetime.now().isoformat(),
+            'intent_type': intent_type,
+            'user_query': user_query,
+            'status': status
+        }
+    })
+    return interaction_id
+
+def update_interaction_status(interaction_id, new_status):
+    supabase_writer.submit({
+        'op': UPDATE_INTERACTION,
+        'local_id': interaction_id,
+        'values': {'status': new_status}
+    })
+
+def update_guest_on_checkin(guest_id, name, room_number, check_in_date):
+    supabase_writer.submit({
+        'op': UPDATE_GUEST,
+        'guest_id': guest_id,
+        'values': {
+            'name': name,
+            'room_number': room_number,
+            'check_in_date': check_in_date
+        }
+    })
+
+def create_service_request(interaction_id, service_type):
+    supabase_writer.submit({
+        'op': INSERT_SERVICE_REQUEST,
+        'local_id': interaction_id,
+        'row': {
+            'service_type': service_type,
+            'request_time': datetime.now().isoformat()
+        }
+    })
+
+# --- Housekeeping jobs ---
+MAX_SESSION_TICKETS = 20
+
+def complete_housekeeping_analytics(notification):
+    interaction_id = notification.get('job_context', {}).get('interaction_id')
+    if interaction_id:
+        create_service_request(interaction_id, "housekeeping")
+        update_interaction_status(interaction_id, "resolved")
+
+housekeeping_jobs = HousekeepingJobs(on_done=complete_housekeeping_analytics)
@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+
+from event_log import get_logger
+
+log = get_logger('breaker')
+
+# Circuit breaker configuration
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('OLLAMA_BREAKER_FAILURES', 3))
+BREAKER_RECOVERY_TIMEOUT = float(os.environ.get('OLLAMA_BREAKER_RECOVERY', 30.0))
+BREAKER_PROBE_INTERVAL = float(os.environ.get('OLLAMA_BREAKER_PROBE_INTERVAL', 5.0))
+# Consecutive calls abandoned at their latency budget that open the circuit:
+# one slow generation says little, a run of them means Ollama is overloaded
+BREAKER_TIMEOUT_THRESHOLD = int(os.environ.get('OLLAMA_BREAKER_TIMEOUTS', 5))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker with an optional health probe.
+
+    - closed: calls flow; failure_threshold consecutive failures, or
+      timeout_threshold consecutive calls over their latency budget, open the circuit
+    - open: calls are rejected immediately; after recovery_timeout, or as soon
+      as the health probe succeeds, the circuit goes half-open
+    - half_open: a single trial call is let through; success closes the
+      circuit, failure or a timeout opens it again
+
+    While the circuit is open a daemon thread runs probe() every probe_interval
+    seconds, so recovery does not depend on guest traffic.
+    """
+
+    def __init__(self, name, probe=None, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 recovery_timeout=BREAKER_RECOVERY_TIMEOUT, probe_interval=BREAKER_PROBE_INTERVAL,
+                 timeout_threshold=BREAKER_TIMEOUT_THRESHOLD):
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.timeout_threshold = timeout_threshold
+        self.recovery_timeout = recovery_timeout
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._timeouts = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+        self._probe_thread = None
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        return self._state
+
+    def allow_request(self):
+        """Return True if a call may proceed, False if it should fall back right away"""
+        state = self._state
+        if state == CLOSED:
+            return True
+
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._state = HALF_OPEN
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN:
+                # A trial that never reported back (e.g. shed upstream) must not wedge the circuit
+                now = time.monotonic()
+                if not self._trial_in_flight or now - self._trial_started >= self.recovery_timeout:
+                    self._trial_in_flight = True
+                    self._trial_started = now
+                    return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        if self._state == CLOSED and not self._failures and not self._timeouts:
+            return
+        with self._lock:
+            if self._state != CLOSED:
+                log.info("%s recovered, circuit closed", self.name)
+            self._state = CLOSED
+            self._failures = 0
+            self._timeouts = 0
+            self._trial_in_flight = False
+
+    def record_inconclusive(self):
+        """
+        Report a call that says nothing about health (e.g. the model is not
+        pulled): frees a half-open trial without changing state.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_timeout(self):
+        """
+        Report a call abandoned at its latency budget. A single one is
+        inconclusive; timeout_threshold in a row with no success in between,
+        or one on a half-open trial, open the circuit.
+        """
+        with self._lock:
+            self._timeouts += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or self._timeouts >= self.timeout_threshold:
+                self._open("too slow")
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open("unavailable")
+
+    def _open(self, reason):
+        """Open the circuit (caller holds the lock)"""
+        if self._state != OPEN:
+            self.times_opened += 1
+            log.warning("%s %s, circuit open", self.name, reason)
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._timeouts = 0
+        self._start_probe()
+
+    def _start_probe(self):
+        """Start the health probe thread (caller holds the lock)"""
+        if self.probe is None or (self._probe_thread and self._probe_thread.is_alive()):
+            return
+        self._probe_thread = threading.Thread(
+            target=self._probe_loop, name=f"{self.name}-health-probe", daemon=True
+        )
+        self._probe_thread.start()
+
+    def _probe_loop(self):
+        while self._state == OPEN:
+            time.sleep(self.probe_interval)
+            try:
+                healthy = self.probe()
+            except Exception:
+                healthy = False
+            if healthy:
+                with self._lock:
+                    if self._state == OPEN:
+                        self._state = HALF_OPEN
+                        self._trial_in_flight = False
+                return
+
+    def stats(self):
+        return {
+            'state': self._state,
+            'consecutive_failures': self._failures,
+            'consecutive_timeouts': self._timeouts,
+            'times_opened': self.times_opened,
+            'rejected': self.rejected
+        }
@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import sqlite3
+import smtplib
+import threading
+
+from tracing import start_trace, finish_trace, traced
+from event_log import get_logger
+
+log = get_logger('email')
+
+# SMTP configuration (point SMTP_HOST/SMTP_PORT at a local stand-in such as
+# `python -m aiosmtpd -n -l 127.0.0.1:8025` with SMTP_USE_SSL=0 SMTP_AUTH=0 for testing)
+SMTP_HOST = os.environ.get('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', 465))
+SMTP_USE_SSL = os.environ.get('SMTP_USE_SSL', '1') == '1'
+SMTP_STARTTLS = os.environ.get('SMTP_STARTTLS', '0') == '1'
+SMTP_AUTH = os.environ.get('SMTP_AUTH', '1') == '1'
+SMTP_TIMEOUT = float(os.environ.get('SMTP_TIMEOUT', 10))
+SMTP_IDLE_TIMEOUT = float(os.environ.get('SMTP_IDLE_TIMEOUT', 120))
+
+# Outbox configuration
+EMAIL_OUTBOX_DB = os.environ.get(
+    'EMAIL_OUTBOX_DB', os.path.join(os.path.dirname(__file__), 'email_outbox.db')
+)
+EMAIL_DIGEST_WINDOW = float(os.environ.get('EMAIL_DIGEST_WINDOW', 0))
+EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', 8))
+EMAIL_RETRY_BASE = float(os.environ.get('EMAIL_RETRY_BASE', 5))
+EMAIL_RETRY_MAX = float(os.environ.get('EMAIL_RETRY_MAX', 600))
+EMAIL_BATCH_SIZE = int(os.environ.get('EMAIL_BATCH_SIZE', 50))
+EMAIL_CLAIM_TIMEOUT = float(os.environ.get('EMAIL_CLAIM_TIMEOUT', 120))
+
+STATUS_QUEUED = 'queued'
+STATUS_SENDING = 'sending'
+STATUS_FAILED = 'failed'
+
+
+def smtp_credentials():
+    """(address, password) from the environment; either may be None"""
+    return os.environ.get('HOTEL_AGENT_EMAIL'), os.environ.get('HOTEL_AGENT_PASS')
+
+
+class EmailDispatcher:
+    """
+    Background email sender with a durable SQLite outbox.
+
+    enqueue() stores the payload and returns at once. A worker thread claims
+    due rows, sends them over one authenticated SMTP connection that is kept
+    open between messages, and deletes them once delivered. Failed sends are
+    retried with exponential backoff up to max_attempts, then marked failed.
+    Rows survive restarts, and a claim that is never finished (crashed
+    worker) is picked up again after EMAIL_CLAIM_TIMEOUT.
+
+    With a digest window, payloads queued within the window are sent as a
+    single email built by build_digest.
+
+    Args:
+        build_message: callable(payload, from_addr) -> EmailMessage
+        build_digest: callable(payloads, from_addr) -> EmailMessage, for digest mode
+        on_sent: callable(payloads) run after a successful delivery
+    """
+
+    def __init__(self, build_message, build_digest=None, on_sent=None, db_path=EMAIL_OUTBOX_DB,
+                 digest_window=EMAIL_DIGEST_WINDOW, max_attempts=EMAIL_MAX_ATTEMPTS):
+        self.build_message = build_message
+        self.build_digest = build_digest
+        self.on_sent = on_sent
+        self.db_path = db_path
+        self.digest_window = digest_window if build_digest else 0
+        self.max_attempts = max_attempts
+        self._wakeup = threading.Event()
+        self._start_lock = threading.Lock()
+        self._worker = None
+        self._smtp = None
+        self._smtp_last_used = 0.0
+        self._schema_ready = False
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.connections = 0
+
+    # --- Outbox ---
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        if not self._schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt REAL NOT NULL,
+                    created REAL NOT NULL,
+                    claimed_at REAL,
+                    last_error TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt)")
+            self._schema_ready = True
+        return conn
+
+    def enqueue(self, payload):
+        """Persist a payload for delivery and wake the worker"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO outbox (payload, status, next_attempt, created) VALUES (?, ?, ?, ?)",
+                (json.dumps(payload, ensure_ascii=False), STATUS_QUEUED, now, now)
+            )
+        finally:
+            conn.close()
+        self.start()
+        self._wakeup.set()
+
+    def _claim_due(self):
+        """Claim due rows for this worker. Returns [(id, attempts, created, payload)]."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                """SELECT id, attempts, created, payload FROM outbox
+                   WHERE (status = ? AND next_attempt <= ?) OR (status = ? AND claimed_at < ?)
+                   ORDER BY id LIMIT ?""",
+                (STATUS_QUEUED, now, STATUS_SENDING, now - EMAIL_CLAIM_TIMEOUT, EMAIL_BATCH_SIZE)
+            ).fetchall()
+            if rows and self.digest_window and min(r[2] for r in rows) + self.digest_window > now:
+                # Keep collecting until the oldest request has waited a full window
+                rows = []
+            if rows:
+                conn.executemany(
+                    "UPDATE outbox SET status = ?, claimed_at = ? WHERE id = ?",
+                    [(STATUS_SENDING, now, r[0]) for r in rows]
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return [(r[0], r[1], r[2], json.loads(r[3])) for r in rows]
+
+    def _next_due_in(self):
+        """Seconds until something in the outbox is due (None if empty)"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT MIN(next_attempt), MIN(created) FROM outbox WHERE status = ?", (STATUS_QUEUED,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row[0] is None:
+            return None
+        due = row[0]
+        if self.digest_window:
+            due = max(due, row[1] + self.digest_window)
+        return max(0.0, due - time.time())
+
+    def _mark_sent(self, ids):
+        conn = self._connect()
+        try:
+            conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+        finally:
+            conn.close()
+
+    def _mark_failed(self, rows, error):
+        now = time.time()
+        conn = self._connect()
+        try:
+            for row_id, attempts, _, _ in rows:
+                attempts += 1
+                if attempts >= self.max_attempts:
+                    status, next_attempt = STATUS_FAILED, now
+                    self.failed += 1
+                else:
+                    status = STATUS_QUEUED
+                    next_attempt = now + min(EMAIL_RETRY_BASE * (2 ** (attempts - 1)), EMAIL_RETRY_MAX)
+                    self.retried += 1
+                conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, next_attempt = ?, claimed_at = NULL, last_error = ? WHERE id = ?",
+                    (status, attempts, next_attempt, str(error)[:500], row_id)
+                )
+        finally:
+            conn.close()
+
+    # --- SMTP session ---
+    def _open_smtp(self):
+        address, password = smtp_credentials()
+        if SMTP_USE_SSL:
+            smtp = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        else:
+            smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+            if SMTP_STARTTLS:
+                smtp.starttls()
+        if SMTP_AUTH:
+            smtp.login(address, password)
+        self.connections += 1
+        return smtp
+
+    def _close_smtp(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+    @traced('smtp.send')
+    def _send(self, msg):
+        """Send over the persistent connection, reconnecting once if the server dropped it"""
+        if self._smtp is not None and time.monotonic() - self._smtp_last_used > SMTP_IDLE_TIMEOUT:
+            self._close_smtp()
+        for attempt in range(2):
+            if self._smtp is None:
+                self._smtp = self._open_smtp()
+            try:
+                self._smtp.send_message(msg)
+                self._smtp_last_used = time.monotonic()
+                return
+            except smtplib.SMTPServerDisconnected:
+                self._smtp = None
+                if attempt:
+                    raise
+
+    # --- Worker ---
+    def start(self):
+        """Start the worker; rows left in the outbox by an earlier run are sent right away"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='email-dispatcher', daemon=True)
+                self._worker.start()
+
+    def _deliver(self, rows):
+        from_addr = smtp_credentials()[0] or 'nexrova@localhost'
+        payloads = [r[3] for r in rows]
+        if self.digest_window and len(rows) > 1:
+            groups = [(rows, self.build_digest(payloads, from_addr))]
+        else:
+            groups = [([r], self.build_message(r[3], from_addr)) for r in rows]
+
+        for group_rows, msg in groups:
+            try:
+                self._send(msg)
+            except Exception as e:
+                log.warning("Delivery failed, will retry: %s", e)
+                self._close_smtp()
+                self._mark_failed(group_rows, e)
+                continue
+            self._mark_sent([r[0] for r in group_rows])
+            self.sent += len(group_rows)
+            if self.on_sent:
+                try:
+                    self.on_sent([r[3] for r in group_rows])
+                except Exception as e:
+                    log.warning("Post-send update failed: %s", e)
+
+    def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                rows = self._claim_due()
+                if rows:
+                    trace = start_trace('email_delivery')
+                    try:
+                        self._deliver(rows)
+                    finally:
+                        finish_trace(trace, emails=len(rows))
+                    continue
+                wait = self._next_due_in()
+            except Exception as e:
+                log.error("Dispatcher error: %s", e)
+                wait = EMAIL_RETRY_BASE
+            if wait is None:
+                wait = SMTP_IDLE_TIMEOUT
+            self._wakeup.wait(timeout=wait)
+            if self._smtp is not None and time.monotonic() - self._smtp_last_used > SMTP_IDLE_TIMEOUT:
+                self._close_smtp()
+
+    def stats(self):
+        conn = self._connect()
+        try:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        finally:
+            conn.close()
+        return {
+            'worker_alive': self._worker is not None and self._worker.is_alive(),
+            'queued': counts.get(STATUS_QUEUED, 0),
+            'sending': counts.get(STATUS_SENDING, 0),
+            'failed_permanently': counts.get(STATUS_FAILED, 0),
+            'sent': self.sent,
+            'retried': self.retried,
+            'failed': self.failed,
+            'smtp_connections': self.connections,
+            'digest_window_seconds': self.digest_window
+        }
@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+from tracing import current_trace_id
+
+# Logging configuration
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# 'json' writes one JSON object per line; 'text' is easier to read in a terminal
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+# Events waiting for the writer thread; when full, new events are dropped
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+# Repeated warnings and errors: the first LOG_SAMPLE_BURST of a kind per
+# LOG_SAMPLE_WINDOW seconds are written, the rest only counted
+LOG_SAMPLE_BURST = int(os.environ.get('LOG_SAMPLE_BURST', 5))
+LOG_SAMPLE_WINDOW = float(os.environ.get('LOG_SAMPLE_WINDOW', 60))
+
+ROOT_LOGGER = 'agent'
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class RepeatSampler(logging.Filter):
+    """
+    Lets through the first `burst` warnings or errors with the same logger
+    and message template per `window` seconds. The first one written after
+    a window closes carries the number suppressed in the meantime.
+    CRITICAL records and anything below WARNING always pass.
+    """
+
+    def __init__(self, burst=LOG_SAMPLE_BURST, window=LOG_SAMPLE_WINDOW):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._lock = threading.Lock()
+        self._kinds = {}
+        self.suppressed = 0
+
+    def filter(self, record):
+        if not (logging.WARNING <= record.levelno < logging.CRITICAL) or self.burst <= 0:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            state = self._kinds.get(key)
+            if state is None or now - state[0] >= self.window:
+                skipped = state[2] if state else 0
+                self._kinds[key] = [now, 1, 0]
+                if skipped:
+                    record.suppressed = skipped
+                return True
+            if state[1] < self.burst:
+                state[1] += 1
+                return True
+            state[2] += 1
+            self.suppressed += 1
+            return False
+
+
+class TraceContext(logging.Filter):
+    """Stamps each record with the current trace id (the request's X-Trace-Id)"""
+
+    def filter(self, record):
+        trace_id = current_trace_id()
+        if trace_id:
+            record.trace_id = trace_id
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on a bounded queue for the writer thread and returns. The
+    message is formatted by the writer, not the caller, so arguments passed
+    to a log call must not be mutated afterwards. A full queue drops the
+    record instead of blocking the request.
+    """
+
+    def __init__(self, event_queue):
+        super().__init__(event_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per event: time, level, logger, message, then extras"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """[LEVEL] logger: message key=value ..."""
+
+    def format(self, record):
+        line = f"[{record.levelname}] {record.name}: {record.getMessage()}"
+        extras = ' '.join(f"{k}={v}" for k, v in vars(record).items() if k not in _RECORD_ATTRS)
+        if extras:
+            line = f"{line} {extras}"
+        if record.exc_info:
+            line = f"{line}\n{self.formatException(record.exc_info)}"
+        return line
+
+
+_lock = threading.Lock()
+_handler = None
+_listener = None
+_sampler = None
+
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, stream=None):
+    """
+    Route the agent's loggers through a queue to a writer thread. Safe to
+    call more than once; only the first call takes effect.
+    """
+    global _handler, _listener, _sampler
+    with _lock:
+        if _handler is not None:
+            return
+        writer = logging.StreamHandler(stream or sys.stdout)
+        writer.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+
+        _sampler = RepeatSampler()
+        _handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        _handler.addFilter(_sampler)
+        _handler.addFilter(TraceContext())
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(level)
+        root.addHandler(_handler)
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(_handler.queue, writer)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Write out queued events and stop the writer thread"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _restart_after_fork():
+    """A forked worker gets no copy of the writer thread; give it its own"""
+    global _lock, _listener
+    _lock = threading.Lock()
+    if _listener is not None:
+        _handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+        _listener = logging.handlers.QueueListener(_handler.queue, *_listener.handlers)
+        _listener.start()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def get_logger(name):
+    """Logger for one component, e.g. get_logger('llm') -> 'agent.llm'"""
+    configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def logging_stats():
+    return {
+        'level': logging.getLevelName(logging.getLogger(ROOT_LOGGER).level),
+        'format': LOG_FORMAT,
+        'queued': _handler.queue.qsize() if _handler else 0,
+        'dropped': _handler.dropped if _handler else 0,
+        'sampled_out': _sampler.suppressed if _sampler else 0
+    }
@@ -0,0 +1,224 @@
+import os
+import re
+import time
+import zlib
+import hashlib
+import threading
+
+import numpy as np
+
+# Semantic FAQ cache configuration
+FAQ_CACHE_ENABLED = os.environ.get('FAQ_CACHE_ENABLED', '1') == '1'
+FAQ_CACHE_CAPACITY = int(os.environ.get('FAQ_CACHE_CAPACITY', 256))
+FAQ_CACHE_THRESHOLD = float(os.environ.get('FAQ_CACHE_THRESHOLD', 0.80))
+FAQ_CACHE_DIM = int(os.environ.get('FAQ_CACHE_DIM', 2048))
+
+# Words that carry no meaning for matching FAQ questions
+STOPWORDS = {
+    'a', 'an', 'the', 'is', 'are', 'was', 'do', 'does', 'did', 'i', 'me', 'my', 'we',
+    'you', 'your', 'it', 'its', 'to', 'of', 'for', 'in', 'on', 'at', 'and', 'or',
+    'can', 'could', 'would', 'please', 'there', 'this', 'that', 'what', 'whats',
+    'how', 'where', 'when', 'tell', 'about', 'any', 'get', 'have', 'has', 'be', 's'
+}
+
+# Different wordings of the same hotel topic map to one canonical term. Only
+# true synonyms: words that need different answers (phone vs email, breakfast
+# vs food) must stay distinct.
+SYNONYMS = {
+    'wifi': 'wifi', 'wi': 'wifi', 'fi': 'wifi', 'internet': 'wifi', 'online': 'wifi',
+    'network': 'wifi', 'wireless': 'wifi', 'ssid': 'wifi',
+    'pass': 'password', 'passcode': 'password', 'pwd': 'password',
+    'car': 'parking', 'park': 'parking', 'vehicle': 'parking',
+    'checkout': 'checkout', 'leave': 'checkout', 'depart': 'checkout',
+    'checkin': 'checkin', 'arrive': 'checkin', 'arrival': 'checkin',
+    'located': 'location', 'address': 'location', 'directions': 'location',
+    'direction': 'location', 'reach': 'location', 'find': 'location',
+    'telephone': 'phone', 'mobile': 'phone', 'e': 'email', 'mail': 'email',
+    'cost': 'price', 'rate': 'price', 'rates': 'price', 'tariff': 'price', 'charges': 'price',
+}
+
+# Terms naming what a question is about. A cached answer is only reused for a
+# question with the same topic terms, however similar the rest of the wording.
+TOPIC_TERMS = set(SYNONYMS.values()) | {
+    'phone', 'email', 'whatsapp', 'breakfast', 'lunch', 'dinner', 'food', 'restaurant',
+    'pool', 'gym', 'laundry', 'kitchen', 'taxi', 'airport', 'reception', 'pet', 'smoking'
+}
+
+
+def _normalize_tokens(text):
+    """Lowercase, tokenize, drop stopwords and map synonyms to canonical terms."""
+    text = text.lower().replace('check-in', 'checkin').replace('check in', 'checkin')
+    text = text.replace('check-out', 'checkout').replace('check out', 'checkout')
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", text):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 4 and word.endswith('s'):
+            word = word[:-1]
+        tokens.append(SYNONYMS.get(word, word))
+    return tokens
+
+
+def question_topics(text):
+    """The topic terms of a question, as a frozenset"""
+    return frozenset(t for t in _normalize_tokens(text) if t in TOPIC_TERMS)
+
+
+def embed_question(text, dim=FAQ_CACHE_DIM):
+    """
+    Embed a question with a hashed n-gram vectorizer.
+
+    Word unigrams and character trigrams are hashed into a fixed-size vector
+    with a signed hashing trick, then L2-normalized so a dot product is the
+    cosine similarity.
+
+    Returns:
+        np.ndarray: float32 vector of length dim (all zeros for empty text)
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    tokens = _normalize_tokens(text)
+
+    features = []
+    for token in tokens:
+        features.append(('w:' + token, 2.0))
+        padded = f"#{token}#"
+        for i in range(len(padded) - 2):
+            features.append(('c:' + padded[i:i + 3], 1.0))
+
+    for feature, weight in features:
+        h = zlib.crc32(feature.encode('utf-8'))
+        sign = 1.0 if (h >> 31) & 1 else -1.0
+        vector[h % dim] += sign * weight
+
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+def fingerprint_text(text):
+    """Stable fingerprint of the hotel information used to answer FAQs"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class SemanticFAQCache:
+    """
+    Bounded nearest-neighbour cache of answered FAQ questions.
+
+    Embeddings live in a preallocated NumPy matrix so a lookup is a single
+    matrix-vector product. A hit also needs the same topic terms as the
+    cached question, so "hotel email" never gets the "hotel phone" answer.
+    When the cache is full the least recently used
+    entry is evicted. All entries are dropped when the hotel information
+    fingerprint changes.
+    """
+
+    def __init__(self, capacity=FAQ_CACHE_CAPACITY, threshold=FAQ_CACHE_THRESHOLD, dim=FAQ_CACHE_DIM):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._questions = [None] * capacity
+        self._topics = [None] * capacity
+        self._answers = [None] * capacity
+        self._size = 0
+        self._fingerprint = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_fingerprint(self, fingerprint):
+        if fingerprint != self._fingerprint:
+            if self._size:
+                self.invalidations += 1
+            self._size = 0
+            self._questions = [None] * self.capacity
+            self._topics = [None] * self.capacity
+            self._answers = [None] * self.capacity
+            self._fingerprint = fingerprint
+
+    def _nearest(self, vector, topics):
+        """Most similar entry with the same topic terms, and its similarity"""
+        if not self._size:
+            return None, 0.0
+        similarities = self._vectors[:self._size] @ vector
+        for idx in np.argsort(similarities)[::-1]:
+            idx = int(idx)
+            if similarities[idx] < self.threshold:
+                break
+            if self._topics[idx] == topics:
+                return idx, float(similarities[idx])
+        return None, 0.0
+
+    def lookup(self, question, fingerprint):
+        """
+        Return the cached answer for a semantically similar question.
+
+        Args:
+            question: The guest's question
+            fingerprint: Fingerprint of the hotel information in use
+
+        Returns:
+            str: Cached answer, or None on a miss
+        """
+        vector = embed_question(question, self.dim)
+        if not vector.any():
+            return None
+
+        topics = question_topics(question)
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+            idx, similarity = self._nearest(vector, topics)
+            if idx is not None:
+                self._last_used[idx] = time.monotonic()
+                self.hits += 1
+                return self._answers[idx]
+            self.misses += 1
+            return None
+
+    def store(self, question, answer, fingerprint):
+        """Store an answered question, evicting the least recently used entry if full"""
+        vector = embed_question(question, self.dim)
+        if not vector.any():
+            return
+
+        topics = question_topics(question)
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+            idx, similarity = self._nearest(vector, topics)
+            if idx is None:
+                if self._size < self.capacity:
+                    idx = self._size
+                    self._size += 1
+                else:
+                    idx = int(np.argmin(self._last_used[:self._size]))
+                    self.evictions += 1
+            self._vectors[idx] = vector
+            self._questions[idx] = question
+            self._topics[idx] = topics
+            self._answers[idx] = answer
+            self._last_used[idx] = time.monotonic()
+
+    def invalidate(self):
+        """Drop every cached answer"""
+        with self._lock:
+            self._check_fingerprint(None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self._size,
+                'capacity': self.capacity,
+                'threshold': self.threshold,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+# Process-wide cache shared by all requests
+faq_cache = SemanticFAQCache()
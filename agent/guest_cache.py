@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Guest identity cache configuration
+GUEST_CACHE_MAX_SIZE = int(os.environ.get('GUEST_CACHE_MAX_SIZE', 5000))
+GUEST_CACHE_TTL = float(os.environ.get('GUEST_CACHE_TTL', 24 * 3600))
+GUEST_CACHE_NEGATIVE_TTL = float(os.environ.get('GUEST_CACHE_NEGATIVE_TTL', 30))
+
+
+class _Flight:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class GuestIdentityCache:
+    """
+    Process-wide phone number -> guest_id cache in front of get_or_create_guest.
+
+    - Bounded LRU with a TTL per entry (a guest id never changes during a stay)
+    - Negative caching: a failed lookup is remembered for negative_ttl seconds
+      and re-raised, so a broken Supabase is not hit again on every turn
+    - Single flight: concurrent misses for the same phone share one lookup
+    """
+
+    def __init__(self, loader, max_size=GUEST_CACHE_MAX_SIZE, ttl=GUEST_CACHE_TTL,
+                 negative_ttl=GUEST_CACHE_NEGATIVE_TTL):
+        self.loader = loader
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._failures = {}
+        self._flights = {}
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.coalesced = 0
+
+    def put(self, phone_number, guest_id):
+        with self._lock:
+            self._store(phone_number, guest_id)
+
+    def _store(self, phone_number, guest_id):
+        self._entries[phone_number] = (guest_id, time.monotonic() + self.ttl)
+        self._entries.move_to_end(phone_number)
+        self._failures.pop(phone_number, None)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, phone_number):
+        with self._lock:
+            self._entries.pop(phone_number, None)
+            self._failures.pop(phone_number, None)
+
+    def peek(self, phone_number):
+        """Cached guest_id, or None; never loads or waits, for callers that must not block"""
+        with self._lock:
+            entry = self._entries.get(phone_number)
+            if entry and entry[1] > time.monotonic():
+                self._entries.move_to_end(phone_number)
+                self.hits += 1
+                return entry[0]
+        return None
+
+    def get_or_create(self, phone_number):
+        """
+        Return (guest_id, is_new) like get_or_create_guest, serving from the cache when possible.
+
+        Raises:
+            The loader's exception, live or negatively cached
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(phone_number)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(phone_number)
+                self.hits += 1
+                return entry[0], False
+            failure = self._failures.get(phone_number)
+            if failure and failure[1] > now:
+                self.negative_hits += 1
+                raise failure[0]
+            flight = self._flights.get(phone_number)
+            leader = flight is None
+            if leader:
+                flight = self._flights[phone_number] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result[0], False
+
+        try:
+            flight.result = self.loader(phone_number)
+        except Exception as e:
+            flight.error = e
+        with self._lock:
+            if flight.error is None:
+                self._store(phone_number, flight.result[0])
+            else:
+                if len(self._failures) >= self.max_size:
+                    self._failures.clear()
+                self._failures[phone_number] = (flight.error, time.monotonic() + self.negative_ttl)
+            del self._flights[phone_number]
+        flight.event.set()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'negative_hits': self.negative_hits,
+                'coalesced': self.coalesced
+            }
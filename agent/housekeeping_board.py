@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import queue
+import threading
+from datetime import datetime
+
+from housekeeping_store import housekeeping_log
+from event_log import get_logger
+
+log = get_logger('housekeeping')
+
+# Staff board configuration
+HK_BOARD_POLL_INTERVAL = float(os.environ.get('HK_BOARD_POLL_INTERVAL', 1.0))
+HK_BOARD_KEEPALIVE = float(os.environ.get('HK_BOARD_KEEPALIVE', 15))
+HK_BOARD_SUBSCRIBER_QUEUE = int(os.environ.get('HK_BOARD_SUBSCRIBER_QUEUE', 256))
+
+# Request status lifecycle on the board
+STATUS_PENDING = 'pending'
+STATUS_CLAIMED = 'claimed'
+STATUS_COMPLETED = 'completed'
+OPEN_STATUSES = (STATUS_PENDING, STATUS_CLAIMED)
+
+
+class HousekeepingBoard:
+    """
+    Live view of open housekeeping requests for floor staff.
+
+    Keeps pending and claimed requests in memory, fed by the housekeeping
+    log's listener hook: requests written in this process appear at once, and
+    a poller tails the log for requests written by other workers. Claim and
+    complete are compare-and-set updates on the log, so two staff members can
+    never take the same request. Every change is pushed to subscribers (the
+    SSE stream); a subscriber that falls too far behind is dropped and
+    resyncs from a fresh snapshot when it reconnects.
+    """
+
+    def __init__(self, log=housekeeping_log, poll_interval=HK_BOARD_POLL_INTERVAL):
+        self.log = log
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._open = {}
+        self._subscribers = set()
+        self._started = False
+        self._poller = None
+        self.events_published = 0
+        self.subscribers_dropped = 0
+
+    def _ensure_started(self):
+        if self._poller is not None and self._poller.is_alive():
+            return
+        with self._lock:
+            start_poller = self._poller is None or not self._poller.is_alive()
+            if start_poller:
+                self._poller = threading.Thread(target=self._poll, name='housekeeping-board', daemon=True)
+            first_start = not self._started
+            self._started = True
+        if first_start:
+            # Listen before loading so nothing written in between is missed
+            self.log.add_listener(self._on_change)
+            for status in OPEN_STATUSES:
+                for notification in self.log.by_status(status):
+                    self._on_change(notification)
+        if start_poller:
+            self._poller.start()
+
+    def _poll(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.log.refresh()
+            except Exception as e:
+                log.error("Board refresh error: %s", e)
+
+    def _on_change(self, notification):
+        """Log listener: keep the open index current and push the change"""
+        notification_id = notification['notification_id']
+        with self._lock:
+            previous = self._open.get(notification_id)
+            if notification.get('status') in OPEN_STATUSES:
+                self._open[notification_id] = notification
+            elif previous is None:
+                return
+            else:
+                del self._open[notification_id]
+            if previous == notification:
+                return  # replayed after a reload, nothing changed
+            self._publish('request', notification)
+
+    def _publish(self, event, data):
+        """Queue an event for every subscriber (caller holds the lock)"""
+        message = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        self.events_published += 1
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # Consumer is behind: discard its backlog and tell it to reconnect
+                self._subscribers.discard(subscriber)
+                while not subscriber.empty():
+                    subscriber.get_nowait()
+                subscriber.put_nowait(None)
+                self.subscribers_dropped += 1
+
+    # --- Staff actions ---
+    def snapshot(self):
+        """Open requests, oldest first"""
+        self._ensure_started()
+        with self._lock:
+            return sorted(self._open.values(), key=lambda n: n['notification_id'])
+
+    def claim(self, notification_id, staff_name):
+        """Take a pending request. Returns the updated request, or None if it is no longer pending."""
+        self._ensure_started()
+        claimed = self.log.update_if(
+            notification_id, {'status': STATUS_PENDING},
+            status=STATUS_CLAIMED, claimed_by=staff_name,
+            claimed_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        )
+        return self.log.get(notification_id) if claimed else None
+
+    def complete(self, notification_id, staff_name):
+        """Close a claimed request. Returns the updated request, or None if it is not claimed."""
+        self._ensure_started()
+        completed = self.log.update_if(
+            notification_id, {'status': STATUS_CLAIMED},
+            status=STATUS_COMPLETED, completed_by=staff_name,
+            completed_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        )
+        return self.log.get(notification_id) if completed else None
+
+    # --- Push feed ---
+    def stream(self):
+        """
+        Server-sent event generator: a snapshot of open requests, then one
+        'request' event per change, with keep-alive comments in between.
+        """
+        self._ensure_started()
+        subscriber = queue.Queue(maxsize=HK_BOARD_SUBSCRIBER_QUEUE)
+        with self._lock:
+            snapshot = sorted(self._open.values(), key=lambda n: n['notification_id'])
+            self._subscribers.add(subscriber)
+        try:
+            yield f"event: snapshot\ndata: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+            while True:
+                try:
+                    message = subscriber.get(timeout=HK_BOARD_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+    def stats(self):
+        with self._lock:
+            pending = sum(1 for n in self._open.values() if n.get('status') == STATUS_PENDING)
+            return {
+                'pending': pending,
+                'claimed': len(self._open) - pending,
+                'subscribers': len(self._subscribers),
+                'events_published': self.events_published,
+                'subscribers_dropped': self.subscribers_dropped
+            }
+
+
+# Process-wide board shared by all staff connections
+housekeeping_board = HousekeepingBoard()
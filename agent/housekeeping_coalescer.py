@@ -0,0 +1,147 @@
+import os
+import re
+import time
+import threading
+
+from housekeeping_store import housekeeping_log
+from llm_handler import HOUSEKEEPING_KEYWORDS
+from event_log import get_logger
+
+log = get_logger('housekeeping')
+
+# Coalescing configuration
+HK_COALESCE_ENABLED = os.environ.get('HK_COALESCE_ENABLED', '1') == '1'
+HK_COALESCE_WINDOW = float(os.environ.get('HK_COALESCE_WINDOW', 15 * 60))
+MAX_FOLLOW_UPS = 10
+# Conditional merge attempts before giving up on a ticket that keeps changing
+MERGE_ATTEMPTS = 5
+
+# Requests still being worked on can absorb follow-ups
+OPEN_STATUSES = ('pending', 'claimed')
+
+# Keywords that say what to do rather than what it is about; they only count
+# towards the signature when a request names nothing more specific
+ACTION_KEYWORDS = {
+    'clean', 'housekeeping', 'room service', 'maid', 'broken', 'fix', 'repair',
+    'maintenance', 'not working', 'need more', 'need extra', 'need new', 'replace',
+    'please clean', 'please fix', 'help with'
+}
+KEYWORD_ALIASES = {'spilled': 'spill'}
+
+# Words that carry no meaning for telling requests apart
+FILLER_WORDS = {
+    'a', 'an', 'the', 'i', 'me', 'my', 'we', 'our', 'you', 'your', 'it', 'is', 'are',
+    'to', 'of', 'for', 'in', 'on', 'at', 'and', 'or', 'can', 'could', 'would', 'please',
+    'need', 'want', 'some', 'more', 'still', 'waiting', 'again', 'yet', 'any', 'get',
+    'send', 'bring', 'room', 'hi', 'hello', 'thanks', 'thank', 'asap', 'now', 'urgent'
+}
+
+_KEYWORD_PATTERNS = [
+    (keyword, re.compile(r'\b' + re.escape(keyword) + r'(?:s|es)?\b'))
+    for keyword in sorted(HOUSEKEEPING_KEYWORDS, key=len, reverse=True)
+]
+
+
+def match_keywords(request_text):
+    """
+    Housekeeping keywords named in a request, as whole words (plurals
+    allowed), plus the text left over once they are removed.
+    """
+    text = request_text.lower()
+    matched = set()
+    for keyword, pattern in _KEYWORD_PATTERNS:
+        if pattern.search(text):
+            text = pattern.sub(' ', text)  # 'toilet paper' must not also count as 'toilet'
+            matched.add(KEYWORD_ALIASES.get(keyword, keyword))
+    return matched, text
+
+
+def request_signature(request_text):
+    """
+    Normalized signature of what a request is about, as a sorted list of terms.
+
+    "need towels", "towels please" and "still waiting for towels" all give
+    ['towel']. Specific keywords (items, spills, fixtures) win over action
+    words; a request with no keyword at all falls back to its content words.
+    """
+    matched, text = match_keywords(request_text)
+    actions = matched & ACTION_KEYWORDS
+    specific = matched - actions
+    if specific:
+        return sorted(specific)
+    if actions:
+        return sorted(actions)
+    return sorted({w for w in re.findall(r'[a-z]+', text) if w not in FILLER_WORDS})
+
+
+class HousekeepingCoalescer:
+    """
+    Merges repeat housekeeping requests into the guest's open ticket.
+
+    A request is a duplicate when the same room has an open (pending or
+    claimed) ticket, last asked for within the window, whose signature
+    covers the new request's signature. The duplicate is recorded on that
+    ticket (follow-up text, duplicate count, which raises its urgency) and no
+    new summary, notification or email is produced. The room index of the
+    housekeeping log makes the lookup cheap; a per-process lock keeps two
+    quick messages from the same guest from both opening tickets, and merges
+    are conditional updates, so workers merging into one ticket at once do
+    not overwrite each other's follow-ups.
+    """
+
+    def __init__(self, log=housekeeping_log, window=HK_COALESCE_WINDOW, enabled=HK_COALESCE_ENABLED):
+        self.log = log
+        self.window = window
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.merged = 0
+
+    def find_open_ticket(self, room_number, signature, now=None):
+        """Open ticket for the room that already covers this signature, or None"""
+        if not self.enabled or not signature:
+            return None
+        now = now or time.time()
+        wanted = set(signature)
+        for notification in reversed(self.log.by_room(room_number)):
+            if notification.get('status') not in OPEN_STATUSES:
+                continue
+            last_request_at = notification.get('last_request_at') or 0
+            if now - last_request_at > self.window:
+                continue
+            if wanted <= set(notification.get('signature') or ()):
+                return notification
+        return None
+
+    def merge(self, notification, request_text, now=None):
+        """
+        Record a duplicate request on an open ticket. Returns the new duplicate
+        count, or None if the ticket closed meanwhile (open a new one instead).
+        """
+        now = now or time.time()
+        notification_id = notification['notification_id']
+        for _ in range(MERGE_ATTEMPTS):
+            duplicates = (notification.get('duplicates') or 0) + 1
+            follow_ups = (notification.get('follow_ups') or []) + [request_text]
+            # Applies only if no other worker merged or moved the ticket since we read it
+            expected = {'duplicates': notification.get('duplicates'), 'status': notification.get('status')}
+            if self.log.update_if(
+                notification_id, expected,
+                duplicates=duplicates,
+                follow_ups=follow_ups[-MAX_FOLLOW_UPS:],
+                last_request_at=now
+            ):
+                self.merged += 1
+                log.info("Merged repeat request into %s", notification_id, extra={'duplicates': duplicates + 1})
+                return duplicates
+            notification = self.log.get(notification_id)
+            if notification is None or notification.get('status') not in OPEN_STATUSES:
+                return None
+        log.warning("Could not merge into %s, it kept changing", notification_id)
+        return None
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'window_seconds': self.window,
+            'merged': self.merged
+        }
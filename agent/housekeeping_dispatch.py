@@ -0,0 +1,237 @@
+import os
+import time
+import heapq
+import threading
+from datetime import datetime
+
+import requests
+
+from chat_common import PMS_API_URL
+from housekeeping_store import housekeeping_log
+from housekeeping_board import housekeeping_board, STATUS_PENDING
+from housekeeping_coalescer import match_keywords
+from event_log import get_logger
+
+log = get_logger('dispatch')
+
+# Dispatch configuration (head starts are in seconds of queue age)
+HK_DISPATCH_URGENT_HEADSTART = float(os.environ.get('HK_DISPATCH_URGENT_HEADSTART', 30 * 60))
+HK_DISPATCH_MAINTENANCE_HEADSTART = float(os.environ.get('HK_DISPATCH_MAINTENANCE_HEADSTART', 10 * 60))
+HK_DISPATCH_DUPLICATE_HEADSTART = float(os.environ.get('HK_DISPATCH_DUPLICATE_HEADSTART', 5 * 60))
+HK_DISPATCH_FLOOR_SLACK = float(os.environ.get('HK_DISPATCH_FLOOR_SLACK', 10 * 60))
+HK_DISPATCH_FLOORS_TTL = float(os.environ.get('HK_DISPATCH_FLOORS_TTL', 10 * 60))
+
+# Urgency classes, most urgent first
+URGENCY_URGENT = 'urgent'
+URGENCY_MAINTENANCE = 'maintenance'
+URGENCY_ROUTINE = 'routine'
+
+# Subsets of HOUSEKEEPING_KEYWORDS: spills, leaks and damage first, then
+# fixtures that stopped working; everything else (cleaning, refills) is routine
+URGENT_KEYWORDS = {
+    'spill', 'leak', 'wet', 'stain', 'mess', 'broken', 'lock', 'door',
+    'gravy', 'coffee', 'water', 'juice', 'food', 'drink', 'flush'
+}
+MAINTENANCE_KEYWORDS = {
+    'fix', 'repair', 'maintenance', 'not working', 'please fix', 'ac', 'air conditioning',
+    'heater', 'light', 'bulb', 'shower', 'bathtub', 'sink', 'tap', 'toilet'
+}
+
+HEADSTARTS = {
+    URGENCY_URGENT: HK_DISPATCH_URGENT_HEADSTART,
+    URGENCY_MAINTENANCE: HK_DISPATCH_MAINTENANCE_HEADSTART,
+    URGENCY_ROUTINE: 0.0
+}
+
+
+def urgency_class(request_text):
+    """Urgency class of a housekeeping request from the keywords it names"""
+    matched, _ = match_keywords(request_text)
+    if matched & URGENT_KEYWORDS:
+        return URGENCY_URGENT
+    if matched & MAINTENANCE_KEYWORDS:
+        return URGENCY_MAINTENANCE
+    return URGENCY_ROUTINE
+
+
+def dispatch_key(notification):
+    """
+    Static sort key: time of the request minus the head start it earns.
+
+    An urgent request ranks as if it had been waiting 30 minutes longer, and
+    every repeat from the guest adds 5 more. Because all requests age at the
+    same rate, the order never has to be recomputed, so a heap stays valid:
+    an old routine request still overtakes a fresh urgent one eventually.
+    """
+    try:
+        created = datetime.strptime(notification['timestamp'], '%Y-%m-%d %H:%M:%S').timestamp()
+    except (KeyError, ValueError):
+        created = notification.get('last_request_at') or time.time()
+    urgency = notification.get('urgency_class') or urgency_class(notification.get('request', ''))
+    return (created - HEADSTARTS.get(urgency, 0.0)
+            - notification.get('duplicates', 0) * HK_DISPATCH_DUPLICATE_HEADSTART)
+
+
+def fetch_room_floors():
+    """room_number -> floor from the PMS"""
+    response = requests.get(f"{PMS_API_URL}/rooms", timeout=5)
+    response.raise_for_status()
+    return {str(r['room_number']): r.get('floor') for r in response.json().get('data', [])}
+
+
+class HousekeepingDispatcher:
+    """
+    Hands each available staff member the next best pending request.
+
+    Pending requests sit in one heap per floor, ordered by dispatch_key
+    (urgency class, repeats and age). next_task() takes the best request
+    overall, unless the staff member's current floor has one within
+    HK_DISPATCH_FLOOR_SLACK of it, in which case they stay on their floor.
+    A pick costs O(floors + log n). Requests claimed, completed or bumped
+    elsewhere leave stale heap entries that are skipped when popped.
+    The heaps follow the housekeeping log through its listener hook, and the
+    claim itself goes through the staff board, so it is safe across workers.
+    """
+
+    def __init__(self, log=housekeeping_log, board=housekeeping_board,
+                 floor_loader=fetch_room_floors, floors_ttl=HK_DISPATCH_FLOORS_TTL):
+        self.log = log
+        self.board = board
+        self.floor_loader = floor_loader
+        self.floors_ttl = floors_ttl
+        self._lock = threading.Lock()
+        self._heaps = {}
+        self._keys = {}
+        self._floors = {}
+        self._floors_loaded_at = None
+        self._staff_floor = {}
+        self._started = False
+        self.assigned = 0
+        self.batched = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.log.add_listener(self._on_change)
+        for notification in self.log.by_status(STATUS_PENDING):
+            self._on_change(notification)
+
+    def _refresh_floors(self):
+        """Reload the room -> floor map when stale (never under the lock)"""
+        if self._floors_loaded_at is not None and time.monotonic() - self._floors_loaded_at < self.floors_ttl:
+            return
+        try:
+            floors = self.floor_loader()
+        except Exception as e:
+            log.warning("Could not load room floors: %s", e)
+            self._floors_loaded_at = time.monotonic()
+            return
+        with self._lock:
+            self._floors_loaded_at = time.monotonic()
+            if floors == self._floors:
+                return
+            self._floors = floors
+            # Rooms may have moved floors: rebuild the heaps
+            entries = [(key, nid, room) for nid, (key, room) in self._keys.items()]
+            self._heaps = {}
+            for key, notification_id, room in entries:
+                self._push(key, notification_id, room)
+
+    def _push(self, key, notification_id, room_number):
+        floor = self._floors.get(str(room_number))
+        heapq.heappush(self._heaps.setdefault(floor, []), (key, notification_id))
+
+    def _on_change(self, notification):
+        """Log listener: track pending requests (runs under the log lock)"""
+        notification_id = notification['notification_id']
+        with self._lock:
+            if notification.get('status') != STATUS_PENDING:
+                self._keys.pop(notification_id, None)
+                return
+            key = dispatch_key(notification)
+            current = self._keys.get(notification_id)
+            if current is not None and current[0] == key:
+                return
+            self._keys[notification_id] = (key, notification['room_number'])
+            self._push(key, notification_id, notification['room_number'])
+
+    def _head(self, floor):
+        """Best live entry on a floor, discarding stale ones (caller holds the lock)"""
+        heap = self._heaps.get(floor)
+        while heap:
+            key, notification_id = heap[0]
+            current = self._keys.get(notification_id)
+            if current is not None and current[0] == key:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def _pick(self, staff_floor):
+        """Pop the next request for a staff member on staff_floor (caller holds the lock)"""
+        heads = {floor: self._head(floor) for floor in list(self._heaps)}
+        heads = {floor: head for floor, head in heads.items() if head is not None}
+        if not heads:
+            return None, None
+        floor = min(heads, key=lambda f: heads[f])
+        home = heads.get(staff_floor)
+        if staff_floor is not None and home is not None and floor != staff_floor \
+                and home[0] - heads[floor][0] <= HK_DISPATCH_FLOOR_SLACK:
+            floor = staff_floor
+        _, notification_id = heapq.heappop(self._heaps[floor])
+        del self._keys[notification_id]
+        return notification_id, floor
+
+    def next_task(self, staff_name):
+        """
+        Claim the next best pending request for a staff member.
+
+        Returns:
+            dict: The claimed request, or None if nothing is pending
+        """
+        self._ensure_started()
+        self._refresh_floors()
+        self.log.refresh()
+        while True:
+            with self._lock:
+                staff_floor = self._staff_floor.get(staff_name)
+                notification_id, floor = self._pick(staff_floor)
+            if notification_id is None:
+                return None
+            claimed = self.board.claim(notification_id, staff_name)
+            if claimed is None:
+                continue  # taken from the board or by another worker meanwhile
+            with self._lock:
+                if staff_floor is not None and floor == staff_floor:
+                    self.batched += 1
+                self._staff_floor[staff_name] = floor
+                self.assigned += 1
+            claimed['floor'] = floor
+            return claimed
+
+    def queue(self):
+        """Pending requests in dispatch order"""
+        self._ensure_started()
+        with self._lock:
+            ordered = sorted(self._keys.items(), key=lambda item: item[1][0])
+            return [{'notification_id': nid, 'room_number': room,
+                     'floor': self._floors.get(str(room))} for nid, (_, room) in ordered]
+
+    def stats(self):
+        with self._lock:
+            per_floor = {}
+            for _, room in self._keys.values():
+                floor = str(self._floors.get(str(room)))
+                per_floor[floor] = per_floor.get(floor, 0) + 1
+            return {
+                'pending': len(self._keys),
+                'pending_by_floor': per_floor,
+                'assigned': self.assigned,
+                'batched_on_floor': self.batched,
+                'staff_on_floor': dict(self._staff_floor)
+            }
+
+
+# Process-wide dispatcher shared by all staff
+housekeeping_dispatcher = HousekeepingDispatcher()
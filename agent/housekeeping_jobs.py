@@ -0,0 +1,221 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from housekeeping_notification import create_notification, dispatch_notification
+from housekeeping_store import housekeeping_log
+from housekeeping_coalescer import HousekeepingCoalescer, request_signature
+from housekeeping_dispatch import urgency_class
+from llm_handler import summarize_request
+from tracing import start_trace, finish_trace, current_trace_id
+from event_log import get_logger
+
+log = get_logger('housekeeping')
+
+# Job pipeline configuration
+HK_JOB_WORKERS = int(os.environ.get('HK_JOB_WORKERS', 4))
+HK_JOB_CLAIM_TIMEOUT = float(os.environ.get('HK_JOB_CLAIM_TIMEOUT', 120))
+# How often unfinished jobs are rescanned for stale claims
+HK_JOB_RESCAN_INTERVAL = float(os.environ.get('HK_JOB_RESCAN_INTERVAL', 30))
+
+# Job states, stored on the notification as 'job_status'
+JOB_QUEUED = 'queued'
+JOB_PROCESSING = 'processing'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+class HousekeepingJobs:
+    """
+    Deferred processing of housekeeping requests.
+
+    submit() logs the request straight away as a pending notification (the
+    raw request text stands in for the summary) with job_status 'queued',
+    and returns its notification id as the guest's ticket. A worker thread
+    then summarizes the request with the LLM, alerts staff (console and
+    email) and runs the on_done callback for analytics. The job state lives
+    in the durable housekeeping log, so it can be polled from any worker.
+    A job is claimed with a compare-and-set on that log, so it runs once even
+    when several workers recover it. start() resubmits unfinished jobs after a
+    restart and then rescans every HK_JOB_RESCAN_INTERVAL seconds, taking over
+    claims older than HK_JOB_CLAIM_TIMEOUT (crashed worker) and jobs left
+    queued that long.
+
+    Repeat requests for something a room already has an open ticket for are
+    merged into that ticket by the coalescer instead of starting a new job.
+
+    Args:
+        on_done: callable(notification) run by the worker after staff are alerted
+    """
+
+    def __init__(self, on_done=None, max_workers=HK_JOB_WORKERS, coalescer=None,
+                 rescan_interval=HK_JOB_RESCAN_INTERVAL):
+        self.on_done = on_done
+        self.coalescer = coalescer or HousekeepingCoalescer()
+        self.max_workers = max_workers
+        self.rescan_interval = rescan_interval
+        self._executor = None
+        self._rescanner = None
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.recovered = 0
+
+    def start(self):
+        """Start the workers, resubmit unfinished jobs and keep rescanning for stale ones"""
+        self._get_executor()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix='housekeeping-job'
+                    )
+                    self._recover()
+                    self._rescanner = threading.Thread(
+                        target=self._rescan_loop, name='housekeeping-rescan', daemon=True
+                    )
+                    self._rescanner.start()
+        return self._executor
+
+    def _enqueue(self, ticket_id, parent_trace_id=None):
+        """Hand a job to the pool unless this process already has it queued or running"""
+        with self._in_flight_lock:
+            if ticket_id in self._in_flight:
+                return False
+            self._in_flight.add(ticket_id)
+        self._executor.submit(self._run, ticket_id, parent_trace_id)
+        return True
+
+    def _recover(self):
+        """Resubmit jobs a previous process accepted but never finished"""
+        for state in (JOB_QUEUED, JOB_PROCESSING):
+            for notification in housekeeping_log.by_job_status(state):
+                self.recovered += self._enqueue(notification['notification_id'])
+
+    def _rescan(self, now=None):
+        """Resubmit jobs whose claim went stale, or that were left queued, since startup"""
+        cutoff = (now or time.time()) - HK_JOB_CLAIM_TIMEOUT
+        for state, since in ((JOB_PROCESSING, 'job_claimed_at'), (JOB_QUEUED, 'job_queued_at')):
+            for notification in housekeeping_log.by_job_status(state):
+                if (notification.get(since) or 0) < cutoff:
+                    self.recovered += self._enqueue(notification['notification_id'])
+
+    def _rescan_loop(self):
+        while True:
+            time.sleep(self.rescan_interval)
+            try:
+                self._rescan()
+            except Exception as e:
+                log.error("Job rescan failed: %s", e)
+
+    def _claim(self, notification):
+        """Mark a job as processing by this worker; False if another worker has it"""
+        expected = {'job_status': notification.get('job_status')}
+        if expected['job_status'] == JOB_PROCESSING:
+            claimed_at = notification.get('job_claimed_at') or 0
+            if claimed_at > time.time() - HK_JOB_CLAIM_TIMEOUT:
+                return False
+            expected['job_claimed_at'] = notification.get('job_claimed_at')
+        return housekeeping_log.update_if(
+            notification['notification_id'], expected,
+            job_status=JOB_PROCESSING, job_claimed_at=time.time()
+        )
+
+    def submit(self, request_text, guest_name='Guest', room_number='Unknown', context=None, summary=None):
+        """
+        Accept a housekeeping request for background processing.
+
+        Args:
+            request_text: Original guest request
+            guest_name: Name of the guest
+            room_number: Room number
+            context: JSON-serializable data handed back to on_done (e.g. interaction id)
+            summary: Summary already produced (fused LLM mode); the job then skips summarization
+
+        Returns:
+            tuple: (ticket_id, merged) - merged is True when the request was
+            folded into the room's open ticket for the same thing
+        """
+        self._get_executor()
+        signature = request_signature(request_text)
+        with self.coalescer.lock:
+            now = time.time()
+            duplicate = self.coalescer.find_open_ticket(room_number, signature, now)
+            if duplicate is not None and self.coalescer.merge(duplicate, request_text, now) is not None:
+                return duplicate['notification_id'], True
+            notification = create_notification(
+                request_text, summary or request_text.strip(), guest_name, room_number,
+                summary_ready=bool(summary),
+                job_status=JOB_QUEUED, job_queued_at=now, job_context=context or {},
+                signature=signature, last_request_at=now,
+                urgency_class=urgency_class(request_text)
+            )
+        self._enqueue(notification['notification_id'], current_trace_id())
+        return notification['notification_id'], False
+
+    def _run(self, ticket_id, parent_trace_id=None):
+        try:
+            self._process(ticket_id, parent_trace_id)
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.discard(ticket_id)
+
+    def _process(self, ticket_id, parent_trace_id):
+        notification = housekeeping_log.get(ticket_id)
+        if notification is None or notification.get('job_status') not in (JOB_QUEUED, JOB_PROCESSING):
+            return
+        if not self._claim(notification):
+            return
+        # Traced on its own, linked to the chat turn that submitted it
+        trace = start_trace('housekeeping_job', parent_id=parent_trace_id)
+        try:
+            if not notification.get('summary_ready'):
+                # Off the request path: no turn deadline, wait for the real summary
+                summary = summarize_request(notification['request'], deadline=None)
+                housekeeping_log.update(ticket_id, summary=summary, summary_ready=True)
+                notification['summary'] = summary
+
+            dispatch_notification(notification)
+            if self.on_done:
+                self.on_done(notification)
+
+            housekeeping_log.update(ticket_id, job_status=JOB_DONE)
+            self.completed += 1
+        except Exception as e:
+            log.error("Job %s failed: %s", ticket_id, e)
+            housekeeping_log.update(ticket_id, job_status=JOB_FAILED, job_error=str(e))
+            self.failed += 1
+        finally:
+            finish_trace(trace, ticket_id=ticket_id)
+
+    def status(self, ticket_id):
+        """Pollable job status, or None for an unknown ticket"""
+        notification = housekeeping_log.get(ticket_id)
+        if notification is None:
+            return None
+        return {
+            'ticket_id': ticket_id,
+            'job_status': notification.get('job_status', JOB_DONE),
+            'status': notification.get('status'),
+            'summary': notification.get('summary'),
+            'room_number': notification.get('room_number'),
+            'email_sent': notification.get('email_sent', False),
+            'duplicates': notification.get('duplicates', 0),
+            'timestamp': notification.get('timestamp')
+        }
+
+    def stats(self):
+        return {
+            'workers': self.max_workers,
+            'queued': len(housekeeping_log.by_job_status(JOB_QUEUED)),
+            'processing': len(housekeeping_log.by_job_status(JOB_PROCESSING)),
+            'completed': self.completed,
+            'failed': self.failed,
+            'recovered': self.recovered,
+            'coalescing': self.coalescer.stats()
+        }
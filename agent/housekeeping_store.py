@@ -0,0 +1,325 @@
+import os
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from event_log import get_logger
+
+log = get_logger('housekeeping')
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, single worker only
+    fcntl = None
+
+# Housekeeping log configuration
+HOUSEKEEPING_LOG = os.environ.get(
+    'HOUSEKEEPING_LOG', os.path.join(os.path.dirname(__file__), 'housekeeping_requests.jsonl')
+)
+LEGACY_LOG = os.path.join(os.path.dirname(__file__), 'housekeeping_requests.json')
+COMPACT_MIN_EVENTS = int(os.environ.get('HOUSEKEEPING_COMPACT_MIN_EVENTS', 1000))
+# Completed notifications are kept this long, then moved to the archive file
+# at the next compaction (an empty HOUSEKEEPING_ARCHIVE drops them; 0 days keeps them)
+RETENTION_DAYS = float(os.environ.get('HOUSEKEEPING_RETENTION_DAYS', 7))
+HOUSEKEEPING_ARCHIVE = os.environ.get('HOUSEKEEPING_ARCHIVE', HOUSEKEEPING_LOG + '.archive')
+# As housekeeping_board stamps completed_at (local time)
+COMPLETED_AT_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+EVENT_CREATE = 'create'
+EVENT_UPDATE = 'update'
+
+# Notification fields with an in-memory index
+INDEXED_FIELDS = ('room_number', 'status', 'job_status')
+
+
+class HousekeepingLog:
+    """
+    Append-only JSONL event log of housekeeping notifications with an in-memory index.
+
+    Each line is either a create event carrying a full notification or an
+    update event carrying changed fields. Writers append under an exclusive
+    flock, so concurrent workers never lose updates. Every process keeps an
+    index by notification_id, room, status and job status, and catches up by reading only
+    the bytes appended since its last read. When the file holds many more
+    events than live notifications it is compacted into one create event per
+    notification and atomically replaced; other processes notice the new
+    inode and reload. Compaction also moves notifications completed more than
+    retention_days ago to the archive file, so the log and every process's
+    index stay bounded.
+
+    Listeners registered with add_listener are called with a copy of each
+    notification as a create or update is applied, whether it was written by
+    this process or picked up from another worker's appends.
+    """
+
+    def __init__(self, path=HOUSEKEEPING_LOG, legacy_path=LEGACY_LOG, compact_min_events=COMPACT_MIN_EVENTS,
+                 retention_days=RETENTION_DAYS, archive_path=HOUSEKEEPING_ARCHIVE):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.compact_min_events = compact_min_events
+        self.retention_days = retention_days
+        self.archive_path = archive_path
+        self._lock = threading.RLock()
+        self._lock_file = None
+        self._lock_pid = None
+        self._listeners = []
+        self._reset_index()
+
+    def _reset_index(self):
+        self._records = {}
+        self._indexes = {field: {} for field in INDEXED_FIELDS}
+        self._offset = 0
+        self._inode = None
+        self._events = 0
+        self._loaded = False
+
+    # --- Locking ---
+    @contextmanager
+    def _file_lock(self, exclusive):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            if self._lock_file is None or self._lock_pid != os.getpid():
+                # Lock descriptors must not be shared with a forked parent
+                self._lock_file = open(self.path + '.lock', 'a')
+                self._lock_pid = os.getpid()
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    # --- Index maintenance ---
+    def _index_add(self, field, key, notification_id):
+        if key is not None:
+            self._indexes[field].setdefault(key, {})[notification_id] = None
+
+    def _index_remove(self, field, key, notification_id):
+        index = self._indexes[field]
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(notification_id, None)
+            if not bucket:
+                del index[key]
+
+    def _apply(self, event):
+        self._events += 1
+        if event.get('event') == EVENT_CREATE:
+            notification = event['notification']
+            notification_id = notification['notification_id']
+            old = self._records.get(notification_id)
+            for field in INDEXED_FIELDS:
+                if old is not None:
+                    self._index_remove(field, old.get(field), notification_id)
+                self._index_add(field, notification.get(field), notification_id)
+            self._records[notification_id] = notification
+            self._notify(notification)
+        elif event.get('event') == EVENT_UPDATE:
+            notification = self._records.get(event['notification_id'])
+            if notification is None:
+                return
+            fields = event.get('fields', {})
+            for field in INDEXED_FIELDS:
+                if field in fields and fields[field] != notification.get(field):
+                    self._index_remove(field, notification.get(field), event['notification_id'])
+                    self._index_add(field, fields[field], event['notification_id'])
+            notification.update(fields)
+            self._notify(notification)
+
+    def _forget(self, notification_id):
+        notification = self._records.pop(notification_id)
+        for field in INDEXED_FIELDS:
+            self._index_remove(field, notification.get(field), notification_id)
+
+    def _notify(self, notification):
+        for listener in self._listeners:
+            try:
+                listener(dict(notification))
+            except Exception as e:
+                log.warning("Listener failed: %s", e)
+
+    def _refresh(self):
+        """Apply events appended since the last read (caller holds the file lock)"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._loaded and self._inode is not None:
+                self._reset_index()
+            self._loaded = True
+            return
+
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            # First load, or the file was compacted by another process
+            self._reset_index()
+            self._inode = stat.st_ino
+        self._loaded = True
+        if stat.st_size == self._offset:
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1  # ignore a partially written last line
+        for line in data[:end].splitlines():
+            if line.strip():
+                try:
+                    self._apply(json.loads(line))
+                except (json.JSONDecodeError, KeyError):
+                    continue
+        self._offset += end
+
+    def _append(self, events):
+        """Append events (caller holds the exclusive file lock and has refreshed)"""
+        payload = ''.join(json.dumps(e, ensure_ascii=False) + '\n' for e in events).encode('utf-8')
+        with open(self.path, 'ab') as f:
+            f.write(payload)
+            f.flush()
+        for event in events:
+            self._apply(event)
+        stat = os.stat(self.path)
+        self._inode = stat.st_ino
+        self._offset += len(payload)
+
+    def _migrate_legacy(self):
+        """Import the old whole-file JSON log once, if there is no JSONL log yet"""
+        if os.path.exists(self.path) or not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+        try:
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return
+        self._append([{'event': EVENT_CREATE, 'notification': n} for n in legacy if 'notification_id' in n])
+
+    def _expired(self):
+        """Notifications completed longer ago than the retention window"""
+        if self.retention_days <= 0:
+            return []
+        cutoff = datetime.now() - timedelta(days=self.retention_days)
+        expired = []
+        for notification in self._records.values():
+            try:
+                completed_at = datetime.strptime(notification.get('completed_at') or '', COMPLETED_AT_FORMAT)
+            except ValueError:
+                continue
+            if completed_at < cutoff:
+                expired.append(notification)
+        return expired
+
+    def _archive(self, notifications):
+        """Append expired notifications to the archive file (caller holds the exclusive lock)"""
+        if not notifications or not self.archive_path:
+            return
+        with open(self.archive_path, 'a', encoding='utf-8') as f:
+            for notification in notifications:
+                f.write(json.dumps(notification, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _maybe_compact(self):
+        """
+        Rewrite the log as one create event per notification, archiving the
+        expired ones (caller holds the exclusive lock)
+        """
+        if self._events < self.compact_min_events or self._events < 2 * len(self._records):
+            return
+        expired = self._expired()
+        self._archive(expired)
+        for notification in expired:
+            self._forget(notification['notification_id'])
+        tmp_path = self.path + '.compact'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for notification in self._records.values():
+                f.write(json.dumps({'event': EVENT_CREATE, 'notification': notification}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        stat = os.stat(self.path)
+        self._inode = stat.st_ino
+        self._offset = stat.st_size
+        self._events = len(self._records)
+
+    # --- Public API ---
+    def add_listener(self, listener):
+        """Register callable(notification); it runs under the log lock, so keep it short"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def refresh(self):
+        """Pick up events appended by other workers"""
+        with self._lock:
+            self._read()
+
+    def add(self, notification):
+        with self._file_lock(exclusive=True):
+            if not self._loaded:
+                self._migrate_legacy()
+            self._refresh()
+            self._append([{'event': EVENT_CREATE, 'notification': dict(notification)}])
+            self._maybe_compact()
+
+    def update(self, notification_id, **fields):
+        """Record changed fields for a notification; returns False if it is unknown"""
+        return self.update_if(notification_id, None, **fields)
+
+    def update_if(self, notification_id, expected, **fields):
+        """
+        Compare-and-set across workers: record fields only if every key in
+        expected currently has that value. Returns True if the update applied.
+        """
+        with self._file_lock(exclusive=True):
+            self._refresh()
+            notification = self._records.get(notification_id)
+            if notification is None:
+                return False
+            if expected and any(notification.get(k) != v for k, v in expected.items()):
+                return False
+            if fields:
+                self._append([{'event': EVENT_UPDATE, 'notification_id': notification_id, 'fields': fields}])
+                self._maybe_compact()
+            return True
+
+    def _read(self):
+        if not self._loaded:
+            with self._file_lock(exclusive=True):
+                self._migrate_legacy()
+                self._refresh()
+        else:
+            with self._file_lock(exclusive=False):
+                self._refresh()
+
+    def get(self, notification_id):
+        with self._lock:
+            self._read()
+            notification = self._records.get(notification_id)
+            return dict(notification) if notification else None
+
+    def all(self):
+        with self._lock:
+            self._read()
+            return [dict(n) for n in self._records.values()]
+
+    def by_field(self, field, value):
+        """Notifications whose indexed field equals value, oldest first"""
+        with self._lock:
+            self._read()
+            return [dict(self._records[i]) for i in self._indexes[field].get(value, {})]
+
+    def by_status(self, status):
+        return self.by_field('status', status)
+
+    def by_job_status(self, job_status):
+        return self.by_field('job_status', job_status)
+
+    def by_room(self, room_number, status=None):
+        with self._lock:
+            self._read()
+            ids = self._indexes['room_number'].get(room_number, {})
+            return [dict(self._records[i]) for i in ids
+                    if status is None or self._records[i].get('status') == status]
+
+
+# Process-wide log shared by all requests
+housekeeping_log = HousekeepingLog()
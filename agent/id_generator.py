@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, single worker only
+    fcntl = None
+
+# Worker id (0-1023). Set NEXROVA_WORKER_ID to a distinct value per worker, or
+# leave it unset and each process claims a free id with a lock file in
+# NEXROVA_WORKER_ID_DIR (shared by every worker on the host).
+WORKER_ID_ENV = 'NEXROVA_WORKER_ID'
+WORKER_ID_DIR = os.environ.get(
+    'NEXROVA_WORKER_ID_DIR', os.path.join(os.path.dirname(__file__), 'worker_ids')
+)
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+
+class TimeOrderedIdGenerator:
+    """
+    Monotonic, sortable ids built from a millisecond timestamp, worker id and sequence.
+
+    Format: <prefix><YYYYMMDDHHMMSSmmm><worker:04d><sequence:04d>, e.g.
+    HK2025102119001312300070003, with the timestamp in UTC so ids keep their
+    order across DST changes. Every field is fixed width, so ids sort by
+    creation time as plain strings. Up to 4096 ids per millisecond per worker
+    are issued; beyond that, or if the clock steps back, the generator moves
+    onto the next logical millisecond instead of waiting. Workers only share
+    the worker id claim; issuing ids takes a per-process lock.
+    """
+
+    def __init__(self, prefix, worker_id=None, worker_id_dir=WORKER_ID_DIR):
+        self.prefix = prefix
+        self._fixed_worker_id = worker_id
+        self.worker_id_dir = worker_id_dir
+        self._lock = threading.Lock()
+        self._pid = None
+        self._worker_id = 0
+        self._claim_file = None
+        self._last_ms = -1
+        self._sequence = 0
+
+    def _resolve_worker_id(self):
+        if self._fixed_worker_id is not None:
+            return _checked_worker_id(self._fixed_worker_id)
+        env_value = os.environ.get(WORKER_ID_ENV)
+        if env_value is not None:
+            return _checked_worker_id(int(env_value))
+        if fcntl is None:
+            return os.getpid() & MAX_WORKER_ID
+        return self._claim_worker_id()
+
+    def _claim_worker_id(self):
+        """Hold an exclusive lock on the first free worker-<n>.lock for the life of the process"""
+        if self._claim_file is not None:
+            # Inherited from the parent; closing our copy leaves its lock in place
+            self._claim_file.close()
+            self._claim_file = None
+        os.makedirs(self.worker_id_dir, exist_ok=True)
+        for worker_id in range(MAX_WORKER_ID + 1):
+            claim_file = open(os.path.join(self.worker_id_dir, f'worker-{worker_id}.lock'), 'a')
+            try:
+                fcntl.flock(claim_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                claim_file.close()
+                continue
+            self._claim_file = claim_file
+            return worker_id
+        raise RuntimeError(f"All {MAX_WORKER_ID + 1} worker ids in {self.worker_id_dir} are taken")
+
+    def next_id(self):
+        with self._lock:
+            pid = os.getpid()
+            if pid != self._pid:
+                # New process (first call or after fork): new worker id, fresh sequence
+                self._pid = pid
+                self._worker_id = self._resolve_worker_id()
+                self._last_ms = -1
+                self._sequence = 0
+
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            else:
+                self._sequence += 1
+                if self._sequence > MAX_SEQUENCE:
+                    self._last_ms += 1
+                    self._sequence = 0
+            ms, sequence, worker_id = self._last_ms, self._sequence, self._worker_id
+
+        stamp = datetime.fromtimestamp(ms // 1000, tz=timezone.utc).strftime('%Y%m%d%H%M%S')
+        return f"{self.prefix}{stamp}{ms % 1000:03d}{worker_id:04d}{sequence:04d}"
+
+
+def _checked_worker_id(worker_id):
+    if not 0 <= worker_id <= MAX_WORKER_ID:
+        raise ValueError(f"Worker id must be between 0 and {MAX_WORKER_ID}, got {worker_id}")
+    return worker_id
+
+
+notification_ids = TimeOrderedIdGenerator('HK')
+
+def next_notification_id():
+    """New housekeeping notification id"""
+    return notification_ids.next_id()
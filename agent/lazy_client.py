@@ -0,0 +1,86 @@
+import os
+import time
+import threading
+
+from event_log import get_logger
+
+log = get_logger('clients')
+
+# After a failed build, callers fail fast for this long before it is retried
+CLIENT_RETRY_AFTER = float(os.environ.get('CLIENT_RETRY_AFTER', 5))
+
+
+class ClientUnavailable(RuntimeError):
+    """Raised when an external client cannot be built (missing settings, dependency down)"""
+    pass
+
+
+class LazyClient:
+    """
+    An external client built on first use instead of at import, once per
+    process. Concurrent first callers wait for a single build. A failed
+    build is remembered for `retry_after` seconds, during which get() raises
+    ClientUnavailable straight away instead of every request paying for
+    another attempt. A forked worker builds its own client rather than
+    sharing the parent's connections.
+    """
+
+    def __init__(self, name, factory, retry_after=CLIENT_RETRY_AFTER):
+        self.name = name
+        self.factory = factory
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._client = None
+        self._failed_at = None
+        self.last_error = None
+        self.builds = 0
+        self.failures = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._client = None
+        self._failed_at = None
+
+    def get(self):
+        client = self._client
+        if client is not None:
+            return client
+        with self._lock:
+            if self._client is not None:
+                return self._client
+            if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_after:
+                raise ClientUnavailable(f"{self.name} unavailable: {self.last_error}")
+            try:
+                started = time.perf_counter()
+                client = self.factory()
+            except Exception as e:
+                self._failed_at = time.monotonic()
+                self.last_error = str(e)
+                self.failures += 1
+                log.warning("Could not create %s client: %s", self.name, e)
+                raise ClientUnavailable(f"{self.name} unavailable: {e}") from e
+            self._client = client
+            self._failed_at = None
+            self.last_error = None
+            self.builds += 1
+            log.info("%s client ready", self.name,
+                     extra={'build_ms': round((time.perf_counter() - started) * 1000, 1)})
+            return client
+
+    def ready(self):
+        """True once the client is built; tries a build if none is cached"""
+        try:
+            self.get()
+            return True
+        except ClientUnavailable:
+            return False
+
+    def stats(self):
+        return {
+            'ready': self._client is not None,
+            'builds': self.builds,
+            'failures': self.failures,
+            'last_error': self.last_error
+        }
@@ -1,184 +1,423 @@
 import requests
 import os
+import re
+import json
+import time
+import threading
 from datetime import datetime
+from functools import lru_cache
+
+from faq_cache import faq_cache, fingerprint_text, FAQ_CACHE_ENABLED
+from llm_scheduler import llm_scheduler, PRIORITY_HOUSEKEEPING, PRIORITY_FAQ
+from circuit_breaker import CircuitBreaker
+from llm_routing import (
+    load_routes, TaskLatencyStats, TASK_CLASSIFY, TASK_FAQ, TASK_SUMMARIZE, TASK_FUSED,
+    OUTCOME_OK, OUTCOME_OVER_BUDGET, OUTCOME_SHED, OUTCOME_UNAVAILABLE, OUTCOME_ERROR
+)
+from llm_hedge import llm_hedge, late_results, THIS_TURN, resolve_deadline
+from tracing import span, traced
+from event_log import get_logger
+
+log = get_logger('llm')
 
 # Ollama API Configuration
 OLLAMA_API_URL = os.environ.get('OLLAMA_API_URL', 'http://127.0.0.1:11434')
 OLLAMA_MODEL = os.environ.get('OLLAMA_MODEL', 'mistral')
+# Hard timeout for a generation that has no latency budget
+OLLAMA_TIMEOUT = float(os.environ.get('OLLAMA_TIMEOUT', 10))
+def parse_keep_alive(value):
+    """
+    keep_alive as Ollama expects it: a bare number is seconds and must be sent
+    as a number ("-1" as a string is rejected as a duration without a unit);
+    anything else ("30m", "-1m") is passed through as a duration string.
+    """
+    value = value.strip()
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+# How long Ollama keeps the model loaded after a request; -1 pins it in memory
+OLLAMA_KEEP_ALIVE = parse_keep_alive(os.environ.get('OLLAMA_KEEP_ALIVE', '-1'))
+OLLAMA_WARMUP = os.environ.get('OLLAMA_WARMUP', '1') == '1'
+OLLAMA_WARMUP_TIMEOUT = float(os.environ.get('OLLAMA_WARMUP_TIMEOUT', 120))
+# A call whose model load took longer than this counts as cold
+OLLAMA_COLD_LOAD_MS = float(os.environ.get('OLLAMA_COLD_LOAD_MS', 500))
+# Fused mode: one JSON generation returns the intent plus the summary or answer
+LLM_FUSED_MODE = os.environ.get('LLM_FUSED_MODE', '0') == '1'
+
+def probe_ollama():
+    """Health probe: True if Ollama answers and the configured model is available"""
+    response = requests.get(f"{OLLAMA_API_URL}/api/tags", timeout=2)
+    if response.status_code != 200:
+        return False
+    models = [m.get('name', '') for m in response.json().get('models', [])]
+    return any(name == OLLAMA_MODEL or name.startswith(f"{OLLAMA_MODEL}:") for name in models)
+
+ollama_breaker = CircuitBreaker('ollama', probe=probe_ollama)
+
+class OllamaLatencyStats:
+    """
+    Cold vs warm generation latency from the timings Ollama returns.
 
-def call_ollama(prompt, model=OLLAMA_MODEL, max_tokens=500):
+    A call is cold when Ollama had to load the model first (load_duration
+    above OLLAMA_COLD_LOAD_MS). prompt_eval_count only counts prompt tokens
+    that were not served from the KV cache, so a low average on warm calls
+    shows the static prompt prefixes being reused.
     """
-    Call Ollama API for LLM inference.
 
-    Args:
-        prompt: The prompt to send to the LLM
-        model: The model name (default: mistral)
-        max_tokens: Maximum tokens in response
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {
+            kind: {'calls': 0, 'total_ms': 0.0, 'load_ms': 0.0, 'prompt_eval_tokens': 0}
+            for kind in ('cold', 'warm')
+        }
+        self.warmup = None
+
+    def record(self, result, elapsed_ms):
+        load_ms = result.get('load_duration', 0) / 1e6
+        kind = 'cold' if load_ms > OLLAMA_COLD_LOAD_MS else 'warm'
+        with self._lock:
+            bucket = self._buckets[kind]
+            bucket['calls'] += 1
+            bucket['total_ms'] += elapsed_ms
+            bucket['load_ms'] += load_ms
+            bucket['prompt_eval_tokens'] += result.get('prompt_eval_count', 0)
+        return kind
+
+    def stats(self):
+        with self._lock:
+            summary = {}
+            for kind, bucket in self._buckets.items():
+                calls = bucket['calls']
+                summary[kind] = {
+                    'calls': calls,
+                    'avg_ms': round(bucket['total_ms'] / calls, 1) if calls else None,
+                    'avg_load_ms': round(bucket['load_ms'] / calls, 1) if calls else None,
+                    'avg_prompt_eval_tokens': round(bucket['prompt_eval_tokens'] / calls, 1) if calls else None
+                }
+            summary['warmup'] = self.warmup
+            summary['keep_alive'] = OLLAMA_KEEP_ALIVE
+            return summary
+
+ollama_latency = OllamaLatencyStats()
+
+# Model, token limit, temperature and latency budget per task (see llm_routing)
+TASK_ROUTES = load_routes(OLLAMA_MODEL)
+task_latency = TaskLatencyStats()
+
+def call_task(task, prompt, priority=PRIORITY_FAQ, response_format=None):
+    """
+    Run an LLM task on its routed model within its latency budget.
+
+    Calls go through a circuit breaker and the LLM scheduler. While Ollama is
+    known to be down the breaker rejects the call without touching the network;
+    otherwise only a bounded number of generations run at once and the rest
+    queue by priority. Model, token limit and temperature come from
+    TASK_ROUTES, and queueing plus generation must finish within the task's
+    budget. Queueing is limited to the route's max_wait, so an admitted call
+    still has time to generate. A call over budget is abandoned and returns
+    None, so the caller falls back to its keyword path; a run of them opens
+    the circuit breaker (see CircuitBreaker.record_timeout). Every call's
+    outcome and latency is recorded in task_latency.
+
+    Returns:
+        str: The LLM response, or None if the caller should fall back
+    """
+    route = TASK_ROUTES[task]
+    with span(f"llm.{task}", model=route.model) as current:
+        text, outcome = _call_task(task, route, prompt, priority, response_format)
+        if current is not None:
+            current.set(outcome=outcome)
+        return text
+
+def _call_task(task, route, prompt, priority, response_format):
+    started = time.monotonic()
+    if not ollama_breaker.allow_request():
+        task_latency.record(task, OUTCOME_UNAVAILABLE, 0.0)
+        return None, OUTCOME_UNAVAILABLE
+
+    with llm_scheduler.slot(priority, max_wait=route.max_wait) as admitted:
+        if not admitted:
+            log.warning("LLM queue is full, using fallback logic")
+            task_latency.record(task, OUTCOME_SHED, (time.monotonic() - started) * 1000)
+            return None, OUTCOME_SHED
+        remaining = route.budget - (time.monotonic() - started)
+        if remaining <= 0:
+            ollama_breaker.record_inconclusive()
+            text, outcome = None, OUTCOME_OVER_BUDGET
+        else:
+            with span('ollama.generate', queued_ms=round((time.monotonic() - started) * 1000, 1)):
+                text, outcome = _generate(
+                    prompt, route.model, route.max_tokens, response_format,
+                    temperature=route.temperature, timeout=remaining, budgeted=True
+                )
+    task_latency.record(task, outcome, (time.monotonic() - started) * 1000)
+    return text, outcome
+
+def build_generate_payload(prompt, model, max_tokens, response_format=None, temperature=0.7):
+    """Request body for Ollama's /api/generate endpoint (response_format='json' for JSON mode)"""
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": {
+            "num_predict": max_tokens,
+            "temperature": temperature
+        }
+    }
+    if response_format:
+        payload["format"] = response_format
+    return payload
+
+def _generate(prompt, model, max_tokens, response_format=None, temperature=0.7,
+              timeout=OLLAMA_TIMEOUT, budgeted=False):
+    """
+    Send a single generation request to Ollama.
 
     Returns:
-        str: The LLM response, or fallback response if Ollama is unavailable
+        tuple: (response text or None, outcome)
     """
     try:
+        started = time.perf_counter()
         response = requests.post(
             f"{OLLAMA_API_URL}/api/generate",
-            json={
-                "model": model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "num_predict": max_tokens,
-                    "temperature": 0.7
-                }
-            },
-            timeout=10
+            json=build_generate_payload(prompt, model, max_tokens, response_format, temperature),
+            timeout=timeout
         )
 
         if response.status_code == 200:
+            ollama_breaker.record_success()
             result = response.json()
-            return result.get('response', '').strip()
+            ollama_latency.record(result, (time.perf_counter() - started) * 1000)
+            return result.get('response', '').strip(), OUTCOME_OK
+        elif response.status_code == 404:
+            # A routed model that is not pulled says nothing about Ollama's health
+            ollama_breaker.record_inconclusive()
+            log.warning("Ollama model %s not found, using fallback logic", model)
+            return None, OUTCOME_ERROR
         else:
-            print(f"Ollama API error: {response.status_code}")
-            return None
+            ollama_breaker.record_failure()
+            log.error("Ollama API error: %s", response.status_code)
+            return None, OUTCOME_ERROR
 
     except requests.exceptions.ConnectionError:
-        print("Warning: Cannot connect to Ollama. Using fallback logic.")
-        return None
+        ollama_breaker.record_failure()
+        log.warning("Cannot connect to Ollama, using fallback logic")
+        return None, OUTCOME_UNAVAILABLE
     except requests.exceptions.Timeout:
-        print("Warning: Ollama request timed out. Using fallback logic.")
-        return None
+        if budgeted and timeout < OLLAMA_TIMEOUT:
+            ollama_breaker.record_timeout()
+            log.warning("%s exceeded its latency budget, using fallback logic", model)
+            return None, OUTCOME_OVER_BUDGET
+        ollama_breaker.record_failure()
+        log.warning("Ollama request timed out, using fallback logic")
+        return None, OUTCOME_UNAVAILABLE
     except Exception as e:
-        print(f"Error calling Ollama: {e}")
-        return None
+        ollama_breaker.record_failure()
+        log.error("Error calling Ollama: %s", e)
+        return None, OUTCOME_ERROR
 
-def llm_classify_intent(user_message):
+@traced('classify')
+def llm_classify_intent(user_message, priority=PRIORITY_HOUSEKEEPING, deadline=THIS_TURN):
     """
     Classify user intent using Ollama Mistral 7B with fallback to keyword matching.
     Returns: 'check_in', 'faq', 'housekeeping', 'other'
 
+    The keyword intent is computed while the LLM runs and is returned if the
+    LLM has not answered by the deadline (absolute time.monotonic(); defaults
+    to LLM_TURN_DEADLINE from now). A late LLM intent is kept for the next
+    identical message.
+
     FIXED: Less aggressive classification, especially for check_in
     """
-    prompt = f"""You are a hotel assistant. Classify the user's intent into ONE of these categories:
+    late_intent = late_results.get(TASK_CLASSIFY, user_message)
+    if late_intent:
+        return late_intent
+
+    return llm_hedge.run(
+        TASK_CLASSIFY,
+        lambda: call_task(TASK_CLASSIFY, build_classify_prompt(user_message), priority=priority),
+        lambda: keyword_classify_intent(user_message),
+        parse_intent,
+        resolve_deadline(deadline),
+        on_late=lambda intent: late_results.put(TASK_CLASSIFY, user_message, intent)
+    )
+
+# Prompts start with a static instruction prefix and end with the per-request
+# text, so Ollama can reuse the prefix's KV cache from the previous call.
+CLASSIFY_PROMPT_PREFIX = """You are a hotel assistant. Classify the user's intent into ONE of these categories:
 - check_in: User wants to START checking into their room (phrases like "I want to check in", "check me in")
 - housekeeping: User needs cleaning, room service, towels, amenities, maintenance, or reports spills/issues
 - faq: User is asking questions about hotel info, amenities, location, wifi, parking, directions
 - other: Anything else, including statements about being already checked in
 
-User message: "{user_message}"
-
 Respond with ONLY ONE WORD: check_in, housekeeping, faq, or other.
+
+"""
+
+def build_classify_prompt(user_message):
+    """Prompt asking the LLM for a one-word intent"""
+    return CLASSIFY_PROMPT_PREFIX + f"""User message: "{user_message}"
 Intent:"""
 
-    # Try Ollama first
-    llm_response = call_ollama(prompt, max_tokens=10)
-
-    if llm_response:
-        # Parse LLM response
-        intent = llm_response.lower().strip()
-        if 'check' in intent and 'in' in intent:
-            return 'check_in'
-        elif 'housekeeping' in intent or 'cleaning' in intent:
-            return 'housekeeping'
-        elif 'faq' in intent or 'question' in intent:
-            return 'faq'
-        elif any(word in intent for word in ['check_in', 'housekeeping', 'faq']):
-            # Extract the exact word
-            for word in ['check_in', 'housekeeping', 'faq', 'other']:
-                if word in intent:
-                    return word
-
-    # Fallback to keyword matching
+def parse_intent(llm_response):
+    """Map a raw LLM classification to an intent, or None if it cannot be parsed"""
+    if not llm_response:
+        return None
+
+    intent = llm_response.lower().strip()
+    if 'check' in intent and 'in' in intent:
+        return 'check_in'
+    elif 'housekeeping' in intent or 'cleaning' in intent:
+        return 'housekeeping'
+    elif 'faq' in intent or 'question' in intent:
+        return 'faq'
+    elif any(word in intent for word in ['check_in', 'housekeeping', 'faq']):
+        # Extract the exact word
+        for word in ['check_in', 'housekeeping', 'faq', 'other']:
+            if word in intent:
+                return word
+    return None
+
+# Expanded housekeeping keywords - catches spills, damage, issues
+HOUSEKEEPING_KEYWORDS = [
+    # Cleaning
+    'clean', 'housekeeping', 'room service', 'maid',
+    # Items needed
+    'towel', 'toilet paper', 'tissue', 'soap', 'shampoo', 'amenities',
+    # Issues/problems
+    'spill', 'spilled', 'leak', 'dirty', 'mess', 'stain', 'wet',
+    # Damage/maintenance
+    'broken', 'fix', 'repair', 'maintenance', 'not working',
+    # Requests
+    'need more', 'need extra', 'need new', 'replace',
+    # Food/drink spills
+    'gravy', 'coffee', 'water', 'juice', 'food', 'drink',
+    # Room issues
+    'ac', 'air conditioning', 'heater', 'light', 'bulb', 'door', 'lock',
+    # Bathroom
+    'shower', 'bathtub', 'sink', 'tap', 'flush', 'toilet',
+    # Requests
+    'please clean', 'please fix', 'help with'
+]
+
+# FIXED: More specific check-in keywords (avoid false positives)
+# Only trigger check_in if user is STARTING the process
+CHECK_IN_PHRASES = [
+    'i want to check in',
+    'i need to check in',
+    'check me in',
+    'start check in',
+    'begin check in',
+    'checking in now'
+]
+
+# FAQ keywords - FIXED: Added "direction" related terms
+FAQ_KEYWORDS = [
+    'wifi', 'password', 'amenities', 'location', 'address',
+    'check-in time', 'check-out time', 'contact', 'phone',
+    'where', 'what', 'when', 'how', 'parking', 'breakfast',
+    'direction', 'directions', 'get to', 'find', 'map',
+    'timing', 'hours', 'open', 'close'
+]
+
+def keyword_matcher(keywords):
+    """One compiled pattern finding any of the keywords as a substring"""
+    return re.compile('|'.join(re.escape(k) for k in keywords)).search
+
+# Built once at import, so pre-forked workers share them
+_match_check_in = keyword_matcher(CHECK_IN_PHRASES)
+_match_housekeeping = keyword_matcher(HOUSEKEEPING_KEYWORDS)
+_match_faq = keyword_matcher(FAQ_KEYWORDS)
+
+def keyword_classify_intent(user_message):
+    """Keyword-matching intent classifier used when the LLM is unavailable"""
     user_lower = user_message.lower()
 
-    # FIXED: More specific check-in keywords (avoid false positives)
-    # Only trigger check_in if user is STARTING the process
-    if any(phrase in user_lower for phrase in [
-        'i want to check in',
-        'i need to check in', 
-        'check me in',
-        'start check in',
-        'begin check in',
-        'checking in now'
-    ]):
+    if _match_check_in(user_lower):
         return 'check_in'
 
     # Single word "check in" without context
-    if user_lower.strip() in ['check in', 'check-in', 'checkin']:
+    if user_lower.strip() in ('check in', 'check-in', 'checkin'):
         return 'check_in'
 
-    # FIXED: Expanded housekeeping keywords - catches spills, damage, issues
-    housekeeping_keywords = [
-        # Cleaning
-        'clean', 'housekeeping', 'room service', 'maid',
-        # Items needed
-        'towel', 'toilet paper', 'tissue', 'soap', 'shampoo', 'amenities',
-        # Issues/problems
-        'spill', 'spilled', 'dirty', 'mess', 'stain', 'wet',
-        # Damage/maintenance
-        'broken', 'fix', 'repair', 'maintenance', 'not working',
-        # Requests
-        'need more', 'need extra', 'need new', 'replace',
-        # Food/drink spills
-        'gravy', 'coffee', 'water', 'juice', 'food', 'drink',
-        # Room issues
-        'ac', 'air conditioning', 'heater', 'light', 'bulb', 'door', 'lock',
-        # Bathroom
-        'shower', 'bathtub', 'sink', 'tap', 'flush', 'toilet',
-        # Requests
-        'please clean', 'please fix', 'help with'
-    ]
-
-    if any(k in user_lower for k in housekeeping_keywords):
+    if _match_housekeeping(user_lower):
         return 'housekeeping'
 
-    # FAQ keywords - FIXED: Added "direction" related terms
-    if any(k in user_lower for k in ['wifi', 'password', 'amenities', 'location', 'address', 
-                                       'check-in time', 'check-out time', 'contact', 'phone',
-                                       'where', 'what', 'when', 'how', 'parking', 'breakfast',
-                                       'direction', 'directions', 'get to', 'find', 'map',
-                                       'timing', 'hours', 'open', 'close']):
+    if _match_faq(user_lower):
         return 'faq'
 
-    # FIXED: Statements about being already checked in -> 'other'
-    if any(phrase in user_lower for phrase in ['already checked', 'already check', "i'm checked"]):
-        return 'other'
-
+    # Statements about being already checked in, and anything else -> 'other'
     return 'other'
 
-def llm_answer_faq(user_message, hotel_info):
+@traced('faq')
+def llm_answer_faq(user_message, hotel_info, deadline=THIS_TURN):
     """
     Use Ollama Mistral 7B to answer FAQ using hotel_info.txt context, with fallback to keyword search.
+    Answers generated by the LLM are kept in a semantic cache so rephrased questions skip generation.
+    The keyword answer is returned if the LLM misses the deadline; its late
+    answer still goes into the cache.
     """
-    prompt = f"""You are a helpful hotel assistant. Answer the guest's question using ONLY the information provided below. 
+    fingerprint = fingerprint_text(hotel_info)
+    if FAQ_CACHE_ENABLED:
+        cached_answer = faq_cache.lookup(user_message, fingerprint)
+        if cached_answer:
+            return cached_answer
+
+    return llm_hedge.run(
+        TASK_FAQ,
+        lambda: call_task(TASK_FAQ, build_faq_prompt(user_message, hotel_info), priority=PRIORITY_FAQ),
+        lambda: keyword_answer_faq(user_message, hotel_info),
+        lambda llm_response: accept_faq_answer(llm_response, user_message, fingerprint),
+        resolve_deadline(deadline)
+    )
+
+def accept_faq_answer(llm_response, user_message, fingerprint):
+    """Usable LLM answer (cached for rephrased questions), or None"""
+    if not llm_response or len(llm_response) <= 20:
+        return None
+    if FAQ_CACHE_ENABLED:
+        faq_cache.store(user_message, llm_response, fingerprint)
+    return llm_response
+
+@lru_cache(maxsize=4)
+def faq_prompt_prefix(hotel_info):
+    """Static part of the FAQ prompt; only changes when hotel_info.txt does"""
+    return f"""You are a helpful hotel assistant. Answer the guest's question using ONLY the information provided below. 
 If the information is not available, politely say you don't have that information and suggest contacting the front desk.
 
 Hotel Information:
 {hotel_info}
 
-Guest Question: {user_message}
+"""
 
-Answer (be concise and helpful):"""
+def build_faq_prompt(user_message, hotel_info):
+    """Prompt asking the LLM to answer from the hotel information only"""
+    return faq_prompt_prefix(hotel_info) + f"""Guest Question: {user_message}
 
-    # Try Ollama first
-    llm_response = call_ollama(prompt, max_tokens=300)
+Answer (be concise and helpful):"""
 
-    if llm_response and len(llm_response) > 20:
-        return llm_response
+@lru_cache(maxsize=4)
+def hotel_info_lines(hotel_info):
+    """Non-empty hotel information lines with their lowercase form; only changes when hotel_info.txt does"""
+    lines = (line.strip() for line in hotel_info.splitlines())
+    return tuple((line, line.lower()) for line in lines if line)
 
-    # Fallback to keyword search
-    user_lower = user_message.lower()
+def keyword_answer_faq(user_message, hotel_info):
+    """Keyword search over the hotel information used when the LLM is unavailable"""
+    words = [word for word in user_message.lower().split() if len(word) > 3]
     relevant_lines = []
 
-    for line in hotel_info.splitlines():
-        line = line.strip()
-        if not line:
-            continue
-
+    for line, line_lower in hotel_info_lines(hotel_info):
         # Check if any word from the question appears in this line
-        words = user_lower.split()
-        for word in words:
-            if len(word) > 3 and word in line.lower():
-                relevant_lines.append(line)
-                break
+        if any(word in line_lower for word in words):
+            relevant_lines.append(line)
 
     if relevant_lines:
         return "\n".join(relevant_lines[:3])  # Return top 3 relevant lines
@@ -186,21 +425,235 @@ Answer (be concise and helpful):"""
     # Generic fallback
     return "I'm sorry, I don't have that specific information. Please contact the front desk at the number provided, or I can help you with check-in or housekeeping requests."
 
-def summarize_request(request_text):
+@traced('summarize')
+def summarize_request(request_text, deadline=THIS_TURN):
     """
     Use LLM to create a concise summary of housekeeping request.
+    Falls back to the request text itself if the LLM misses the deadline;
+    with deadline=None it waits for the LLM up to the task's budget.
     """
-    prompt = f"""Summarize this hotel guest's housekeeping request in ONE clear sentence:
+    late_summary = late_results.get(TASK_SUMMARIZE, request_text)
+    if late_summary:
+        return late_summary
 
-Guest request: "{request_text}"
+    return llm_hedge.run(
+        TASK_SUMMARIZE,
+        lambda: call_task(TASK_SUMMARIZE, build_summary_prompt(request_text), priority=PRIORITY_HOUSEKEEPING),
+        # Fallback: Return the original request (cleaned up)
+        lambda: request_text.strip(),
+        accept_summary,
+        resolve_deadline(deadline),
+        on_late=lambda summary: late_results.put(TASK_SUMMARIZE, request_text, summary)
+    )
+
+def accept_summary(llm_response):
+    """Usable LLM summary, or None"""
+    return llm_response if llm_response and len(llm_response) > 10 else None
+
+SUMMARY_PROMPT_PREFIX = """Summarize this hotel guest's housekeeping request in ONE clear sentence:
+
+"""
+
+def build_summary_prompt(request_text):
+    """Prompt asking the LLM for a one-sentence summary of a housekeeping request"""
+    return SUMMARY_PROMPT_PREFIX + f"""Guest request: "{request_text}"
 
 Summary:"""
 
-    # Try Ollama first
-    llm_response = call_ollama(prompt, max_tokens=100)
+@lru_cache(maxsize=4)
+def fused_prompt_prefix(hotel_info):
+    """Static part of the fused prompt; only changes when hotel_info.txt does"""
+    return f"""You are a hotel assistant. Read the guest's message and reply with a JSON object only.
 
-    if llm_response and len(llm_response) > 10:
-        return llm_response
+Classify the intent as ONE of:
+- check_in: Guest wants to START checking into their room (phrases like "I want to check in", "check me in")
+- housekeeping: Guest needs cleaning, room service, towels, amenities, maintenance, or reports spills/issues
+- faq: Guest is asking questions about hotel info, amenities, location, wifi, parking, directions
+- other: Anything else, including statements about being already checked in
 
-    # Fallback: Return the original request (cleaned up)
-    return request_text.strip()
+JSON keys:
+- "intent": one of "check_in", "housekeeping", "faq", "other"
+- "summary": for housekeeping only, the request in ONE clear sentence
+- "answer": for faq only, a concise and helpful answer using ONLY the hotel information below; if it is not there, politely say so and suggest contacting the front desk
+
+Hotel Information:
+{hotel_info}
+
+"""
+
+def build_fused_prompt(user_message, hotel_info):
+    """Prompt asking the LLM for the intent plus the summary or answer as JSON"""
+    return fused_prompt_prefix(hotel_info) + f"""Guest message: "{user_message}"
+JSON:"""
+
+def parse_fused_response(llm_response):
+    """
+    Strictly validate a fused JSON reply.
+
+    Returns:
+        dict: {'intent': ..., 'summary' or 'answer': ...}, or None when the
+        output is not exactly what was asked for
+    """
+    if not llm_response:
+        return None
+    try:
+        data = json.loads(llm_response)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    intent = data.get('intent')
+    if intent not in ('check_in', 'housekeeping', 'faq', 'other'):
+        return None
+    result = {'intent': intent}
+    field = {'housekeeping': 'summary', 'faq': 'answer'}.get(intent)
+    if field:
+        text = data.get(field)
+        if not isinstance(text, str) or not text.strip():
+            return None
+        result[field] = text.strip()
+    return result
+
+@traced('fused')
+def llm_fused_turn(user_message, hotel_info, priority=PRIORITY_HOUSEKEEPING, deadline=THIS_TURN):
+    """
+    Classify a message and produce its housekeeping summary or FAQ answer in
+    one generation (Ollama JSON mode).
+
+    If the fused output is malformed, the per-task LLM calls are run in what
+    is left of the deadline (per_task_fused_turn). If the LLM is unavailable
+    or the deadline is gone, the keyword result from keyword_fused_turn is
+    returned instead.
+
+    Returns:
+        dict from parse_fused_response, per_task_fused_turn or
+        keyword_fused_turn; never None in fused mode. None only if fused mode
+        is off; callers then use the per-task functions (llm_classify_intent,
+        summarize_request, llm_answer_faq)
+    """
+    if not LLM_FUSED_MODE:
+        return None
+    late_result = late_results.get(TASK_FUSED, user_message)
+    if late_result:
+        return late_result
+
+    deadline = resolve_deadline(deadline)
+    malformed = []
+    result = llm_hedge.run(
+        TASK_FUSED,
+        lambda: call_task(
+            TASK_FUSED, build_fused_prompt(user_message, hotel_info),
+            priority=priority, response_format='json'
+        ),
+        lambda: keyword_fused_turn(user_message, hotel_info),
+        lambda llm_response: accept_fused_response(llm_response, user_message, hotel_info, malformed),
+        deadline,
+        on_late=lambda result: late_results.put(TASK_FUSED, user_message, result)
+    )
+    if malformed and (deadline is None or time.monotonic() < deadline):
+        return per_task_fused_turn(user_message, hotel_info, priority, deadline)
+    return result
+
+def per_task_fused_turn(user_message, hotel_info, priority, deadline):
+    """
+    Fused result from the per-task LLM calls, sharing the turn's deadline:
+    the fallback for a malformed fused reply
+    """
+    intent = llm_classify_intent(user_message.lower(), priority=priority, deadline=deadline)
+    result = {'intent': intent}
+    if intent == 'faq':
+        result['answer'] = llm_answer_faq(user_message, hotel_info, deadline=deadline)
+    elif intent == 'housekeeping':
+        summary = summarize_request(user_message, deadline=deadline)
+        if summary != user_message.strip():
+            # Only a real summary; the housekeeping job summarizes the raw text
+            result['summary'] = summary
+    return result
+
+def keyword_fused_turn(user_message, hotel_info):
+    """
+    Keyword fallback for a fused turn: the intent, plus the keyword answer for
+    a FAQ. Housekeeping requests get no summary here; the housekeeping job
+    summarizes them in the background.
+    """
+    intent = keyword_classify_intent(user_message)
+    result = {'intent': intent}
+    if intent == 'faq':
+        cached_answer = FAQ_CACHE_ENABLED and faq_cache.lookup(user_message, fingerprint_text(hotel_info))
+        result['answer'] = cached_answer or keyword_answer_faq(user_message, hotel_info)
+    return result
+
+def accept_fused_response(llm_response, user_message, hotel_info, malformed=None):
+    """
+    Parse a fused reply and cache a FAQ answer from it, as llm_answer_faq would.
+    A reply that came back but does not parse is noted in the malformed list.
+    """
+    result = parse_fused_response(llm_response)
+    if result is None and llm_response:
+        log.warning("Malformed fused LLM output, falling back to per-task calls")
+        if malformed is not None:
+            malformed.append(llm_response)
+    if result and result['intent'] == 'faq' and FAQ_CACHE_ENABLED and len(result['answer']) > 20:
+        faq_cache.store(user_message, result['answer'], fingerprint_text(hotel_info))
+    return result
+
+def warm_up_ollama(hotel_info=None):
+    """
+    Load the routed models and prime the KV cache with the static prompt prefixes.
+
+    An empty request per model makes Ollama load it and pin it for
+    OLLAMA_KEEP_ALIVE; then each task's prompt prefix is evaluated once on
+    its own model so the first guest request does not pay for it. Bypasses
+    the scheduler and breaker: it runs before traffic and failures are only
+    logged.
+
+    Returns:
+        dict: Warm-up timings in milliseconds, or None if Ollama is unreachable
+    """
+    # Every chat turn is classified, so that prefix goes last: with a single
+    # Ollama slot (OLLAMA_NUM_PARALLEL=1) it is the one left in the cache
+    prefixes = [(TASK_SUMMARIZE, SUMMARY_PROMPT_PREFIX)]
+    if hotel_info:
+        prefixes.append((TASK_FAQ, faq_prompt_prefix(hotel_info)))
+    if LLM_FUSED_MODE and hotel_info:
+        prefixes.append((TASK_FUSED, fused_prompt_prefix(hotel_info)))
+    else:
+        prefixes.append((TASK_CLASSIFY, CLASSIFY_PROMPT_PREFIX))
+    models = list(dict.fromkeys(TASK_ROUTES[task].model for task, _ in prefixes))
+    timings = {}
+    try:
+        started = time.perf_counter()
+        for model in models:
+            response = requests.post(
+                f"{OLLAMA_API_URL}/api/generate",
+                json={"model": model, "keep_alive": OLLAMA_KEEP_ALIVE},
+                timeout=OLLAMA_WARMUP_TIMEOUT
+            )
+            response.raise_for_status()
+        timings['load_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+        started = time.perf_counter()
+        for task, prefix in prefixes:
+            requests.post(
+                f"{OLLAMA_API_URL}/api/generate",
+                json=build_generate_payload(prefix, TASK_ROUTES[task].model, 1),
+                timeout=OLLAMA_WARMUP_TIMEOUT
+            ).raise_for_status()
+        timings['prefix_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    except Exception as e:
+        log.warning("Ollama warm-up failed: %s", e)
+        return None
+
+    timings['models'] = models
+    ollama_latency.warmup = timings
+    log.info("%s warmed up", ', '.join(models), extra={'load_ms': timings['load_ms'], 'prefix_ms': timings['prefix_ms']})
+    return timings
+
+def start_warm_up(hotel_info=None):
+    """Warm the model in a background thread so startup is not delayed"""
+    if not OLLAMA_WARMUP:
+        return None
+    thread = threading.Thread(target=warm_up_ollama, args=(hotel_info,), name='ollama-warmup', daemon=True)
+    thread.start()
+    return thread
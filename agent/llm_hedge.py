@@ -0,0 +1,197 @@
+import os
+import time
+import asyncio
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import annotate
+from llm_routing import load_routes
+
+# Hedging configuration: every guest turn gets an answer within LLM_TURN_DEADLINE
+# seconds, from the LLM if it is fast enough and from the keyword fallback if not.
+# The default is the longest task budget, so a turn never cuts a task short of
+# its own budget. 0 disables hedging (wait for the LLM up to the task's budget).
+LLM_TURN_DEADLINE = float(os.environ.get('LLM_TURN_DEADLINE', max(r.budget for r in load_routes().values())))
+LLM_HEDGE_WORKERS = int(os.environ.get('LLM_HEDGE_WORKERS', 32))
+LATE_RESULT_TTL = float(os.environ.get('LATE_RESULT_TTL', 15 * 60))
+LATE_RESULT_MAX = int(os.environ.get('LATE_RESULT_MAX', 512))
+
+WINNER_LLM = 'llm'
+WINNER_FALLBACK = 'fallback'
+
+
+def turn_deadline(seconds=None):
+    """Absolute deadline (time.monotonic()) for a turn starting now, or None when hedging is off"""
+    seconds = LLM_TURN_DEADLINE if seconds is None else seconds
+    return time.monotonic() + seconds if seconds > 0 else None
+
+
+# Default deadline of the LLM entry points: the guest turn starting now.
+# deadline=None instead means no hedge, for background work such as the
+# housekeeping job's summary, which waits for the LLM up to its task budget.
+THIS_TURN = object()
+
+
+def resolve_deadline(deadline):
+    """An entry point's deadline argument as an absolute deadline, or None for no hedge"""
+    return turn_deadline() if deadline is THIS_TURN else deadline
+
+
+def late_key(text):
+    """Key a late result by its message, ignoring case and spacing"""
+    return ' '.join(text.lower().split())
+
+
+class LateResultCache:
+    """
+    LLM results that arrived after their turn's deadline, kept for a while so
+    the next identical message gets the LLM answer instead of the fallback.
+    """
+
+    def __init__(self, ttl=LATE_RESULT_TTL, max_entries=LATE_RESULT_MAX):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+
+    def get(self, task, text):
+        key = (task, late_key(text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, task, text, value):
+        key = (task, late_key(text))
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits}
+
+
+class LLMHedge:
+    """
+    Races an LLM call against its cheap fallback under a deadline.
+
+    The LLM call runs on a worker thread (or as an asyncio task) while the
+    caller computes the fallback (keyword intent, matching FAQ lines, the raw
+    request text). If an acceptable LLM result is in by the deadline it wins,
+    otherwise the fallback is returned at the deadline. A call still running
+    at that point keeps going up to its own latency budget, and an acceptable
+    result is handed to on_late so it can be cached for the next time.
+    """
+
+    def __init__(self, workers=LLM_HEDGE_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='llm-hedge')
+        self._lock = threading.Lock()
+        self._tasks = {}
+        self._background = set()  # late asyncio tasks, kept referenced until done
+
+    def _count(self, task, what):
+        with self._lock:
+            counts = self._tasks.setdefault(task, {})
+            counts[what] = counts.get(what, 0) + 1
+
+    def _count_winner(self, task, winner):
+        self._count(task, winner)
+        annotate(winner=winner)
+
+    def _resolve(self, task, raw, accept, fallback_value):
+        value = accept(raw)
+        if value is None:
+            self._count_winner(task, WINNER_FALLBACK)
+            return fallback_value
+        self._count_winner(task, WINNER_LLM)
+        return value
+
+    def _late(self, task, raw, accept, on_late):
+        value = accept(raw)
+        if value is None:
+            self._count(task, 'late_dropped')
+            return
+        if on_late is not None:
+            on_late(value)
+        self._count(task, 'late_recorded')
+
+    def run(self, task, llm_call, fallback, accept, deadline, on_late=None):
+        """
+        Args:
+            task: Task name, for stats
+            llm_call: Callable returning the raw LLM response (or None)
+            fallback: Callable returning the fallback result
+            accept: Callable mapping a raw response to a result, or None to reject it
+            deadline: Absolute time.monotonic() deadline, or None to wait for the LLM
+            on_late: Called with an accepted result that missed the deadline
+                (accept itself may already record it, as FAQ answers do)
+
+        Returns:
+            The LLM result if accepted in time, otherwise the fallback result
+        """
+        if deadline is None:
+            raw = llm_call()
+            value = accept(raw)
+            return value if value is not None else fallback()
+
+        # The worker runs in a copy of this context so its spans join the caller's trace
+        future = self._executor.submit(contextvars.copy_context().run, llm_call)
+        fallback_value = fallback()
+        try:
+            raw = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except Exception:
+            self._count_winner(task, WINNER_FALLBACK)
+            if future.cancel():
+                self._count(task, 'cancelled')  # never left the worker queue
+            else:
+                future.add_done_callback(
+                    lambda f: f.exception() is None and self._late(task, f.result(), accept, on_late)
+                )
+            return fallback_value
+        return self._resolve(task, raw, accept, fallback_value)
+
+    async def run_async(self, task, llm_coro, fallback, accept, deadline, on_late=None):
+        """LLMHedge.run for a coroutine on the event loop"""
+        if deadline is None:
+            value = accept(await llm_coro)
+            return value if value is not None else fallback()
+
+        pending = asyncio.ensure_future(llm_coro)
+        fallback_value = fallback()
+        done, _ = await asyncio.wait({pending}, timeout=max(0.0, deadline - time.monotonic()))
+        if not done:
+            self._count_winner(task, WINNER_FALLBACK)
+            self._background.add(pending)
+            pending.add_done_callback(self._background.discard)
+            pending.add_done_callback(
+                lambda t: t.cancelled() or t.exception() is not None
+                or self._late(task, t.result(), accept, on_late)
+            )
+            return fallback_value
+        if pending.exception() is not None:
+            self._count_winner(task, WINNER_FALLBACK)
+            return fallback_value
+        return self._resolve(task, pending.result(), accept, fallback_value)
+
+    def stats(self):
+        with self._lock:
+            summary = {task: dict(counts) for task, counts in self._tasks.items()}
+        summary['deadline_seconds'] = LLM_TURN_DEADLINE
+        summary['late_results'] = late_results.stats()
+        return summary
+
+
+# Process-wide hedge and late-result cache shared by the sync and async handlers
+llm_hedge = LLMHedge()
+late_results = LateResultCache()
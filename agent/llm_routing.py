@@ -0,0 +1,110 @@
+import os
+import threading
+from collections import deque
+
+# Tasks the agent runs on the LLM
+TASK_CLASSIFY = 'classify'
+TASK_FAQ = 'faq'
+TASK_SUMMARIZE = 'summarize'
+TASK_FUSED = 'fused'
+
+# Call outcomes recorded per task
+OUTCOME_OK = 'ok'
+OUTCOME_OVER_BUDGET = 'over_budget'
+OUTCOME_SHED = 'shed'
+OUTCOME_UNAVAILABLE = 'unavailable'
+OUTCOME_ERROR = 'error'
+
+LATENCY_WINDOW = int(os.environ.get('LLM_LATENCY_WINDOW', 200))
+# Share of a task's budget it may spend queued for an LLM slot, so an admitted
+# call still has time left to generate
+LLM_QUEUE_SHARE = float(os.environ.get('LLM_QUEUE_SHARE', 0.5))
+
+# Defaults per task: (max_tokens, temperature, latency budget in seconds).
+# Classification and fused JSON replies are run cold (temperature 0) so
+# the same message always gets the same intent.
+DEFAULT_ROUTES = {
+    TASK_CLASSIFY: (10, 0.0, 2.0),
+    TASK_FAQ: (300, 0.7, 8.0),
+    TASK_SUMMARIZE: (100, 0.7, 6.0),
+    TASK_FUSED: (300, 0.0, 8.0),
+}
+
+
+class TaskRoute:
+    """Model and limits for one LLM task"""
+
+    def __init__(self, task, model, max_tokens, temperature, budget, max_wait=None):
+        self.task = task
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.budget = budget
+        self.max_wait = budget * LLM_QUEUE_SHARE if max_wait is None else max_wait
+
+    def as_dict(self):
+        return {
+            'model': self.model,
+            'max_tokens': self.max_tokens,
+            'temperature': self.temperature,
+            'budget_seconds': self.budget,
+            'max_wait_seconds': self.max_wait
+        }
+
+
+def load_routes(default_model=None):
+    """
+    Routes for every task, from DEFAULT_ROUTES overridden per task by
+    LLM_<TASK>_MODEL, LLM_<TASK>_MAX_TOKENS, LLM_<TASK>_TEMPERATURE,
+    LLM_<TASK>_BUDGET and LLM_<TASK>_MAX_WAIT (queue wait, default
+    LLM_QUEUE_SHARE of the budget), e.g. LLM_CLASSIFY_MODEL=llama3.2:1b LLM_CLASSIFY_BUDGET=1.5
+    """
+    routes = {}
+    for task, (max_tokens, temperature, budget) in DEFAULT_ROUTES.items():
+        prefix = f"LLM_{task.upper()}_"
+        routes[task] = TaskRoute(
+            task,
+            os.environ.get(prefix + 'MODEL', default_model),
+            int(os.environ.get(prefix + 'MAX_TOKENS', max_tokens)),
+            float(os.environ.get(prefix + 'TEMPERATURE', temperature)),
+            float(os.environ.get(prefix + 'BUDGET', budget))
+        )
+        if prefix + 'MAX_WAIT' in os.environ:
+            routes[task].max_wait = float(os.environ[prefix + 'MAX_WAIT'])
+    return routes
+
+
+class TaskLatencyStats:
+    """Per-task call outcomes and latency percentiles over the last LATENCY_WINDOW calls"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._tasks = {}
+
+    def record(self, task, outcome, elapsed_ms):
+        with self._lock:
+            entry = self._tasks.get(task)
+            if entry is None:
+                entry = self._tasks[task] = {'outcomes': {}, 'latencies': deque(maxlen=self.window)}
+            entry['outcomes'][outcome] = entry['outcomes'].get(outcome, 0) + 1
+            if outcome == OUTCOME_OK:
+                entry['latencies'].append(elapsed_ms)
+
+    def stats(self, routes=None):
+        with self._lock:
+            summary = {}
+            for task, entry in self._tasks.items():
+                latencies = sorted(entry['latencies'])
+                calls = sum(entry['outcomes'].values())
+                summary[task] = {
+                    'calls': calls,
+                    'outcomes': dict(entry['outcomes']),
+                    'fallback_rate': round(1 - entry['outcomes'].get(OUTCOME_OK, 0) / calls, 3),
+                    'p50_ms': round(latencies[len(latencies) // 2], 1) if latencies else None,
+                    'p95_ms': round(latencies[int(len(latencies) * 0.95)], 1) if latencies else None,
+                }
+        if routes:
+            for task, route in routes.items():
+                summary.setdefault(task, {'calls': 0})['route'] = route.as_dict()
+        return summary
@@ -0,0 +1,225 @@
+import os
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from llm_routing import load_routes
+
+# LLM scheduler configuration. LLM_MAX_WAIT caps every caller's queue wait;
+# by default it is the longest per-task wait, so the routes decide (see llm_routing).
+LLM_MAX_CONCURRENT = int(os.environ.get('LLM_MAX_CONCURRENT', 2))
+LLM_MAX_QUEUE = int(os.environ.get('LLM_MAX_QUEUE', 16))
+LLM_MAX_WAIT = float(os.environ.get('LLM_MAX_WAIT', max(r.max_wait for r in load_routes().values())))
+
+# Lower number = served first
+PRIORITY_CHECK_IN = 0
+PRIORITY_HOUSEKEEPING = 1
+PRIORITY_FAQ = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_CHECK_IN: 'check_in',
+    PRIORITY_HOUSEKEEPING: 'housekeeping',
+    PRIORITY_FAQ: 'faq'
+}
+
+
+class _Waiter:
+    """A queued thread, parked on a threading.Event"""
+    __slots__ = ('priority', 'seq', 'event', 'granted', 'cancelled', 'enqueued_at')
+
+    def __init__(self, priority, seq, event=None):
+        self.priority = priority
+        self.seq = seq
+        self.event = threading.Event() if event is None else event
+        self.granted = False
+        self.cancelled = False
+        self.enqueued_at = time.monotonic()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def wake(self):
+        self.event.set()
+
+
+class _AsyncWaiter(_Waiter):
+    """A queued coroutine, parked on a future of its event loop"""
+    __slots__ = ('loop',)
+
+    def __init__(self, priority, seq):
+        self.loop = asyncio.get_running_loop()
+        super().__init__(priority, seq, self.loop.create_future())
+
+    def wake(self):
+        # release() may run on any thread
+        self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.event.done():
+            self.event.set_result(None)
+
+
+class LLMScheduler:
+    """
+    Bounded-concurrency, priority-ordered admission in front of Ollama.
+
+    At most max_concurrent generations run at once. Further callers wait in a
+    priority queue (check-in before housekeeping before FAQ) for at most
+    max_wait seconds. When the queue is full a new caller is shed immediately,
+    unless it outranks a queued caller, in which case the lowest-priority
+    waiter is shed instead. Shed callers are expected to use their fallback.
+    """
+
+    def __init__(self, max_concurrent=LLM_MAX_CONCURRENT, max_queue=LLM_MAX_QUEUE, max_wait=LLM_MAX_WAIT):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._heap = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._queued = 0
+        self._queued_by_priority = {p: 0 for p in PRIORITY_NAMES}
+        self.admitted = 0
+        self.shed = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+
+    def _dequeue(self, waiter):
+        self._queued -= 1
+        self._queued_by_priority[waiter.priority] = self._queued_by_priority.get(waiter.priority, 1) - 1
+
+    def _shed_lowest_waiter(self, priority):
+        """Shed the lowest-priority queued waiter if it ranks below priority"""
+        victim = None
+        for waiter in self._heap:
+            if waiter.cancelled or waiter.granted:
+                continue
+            if victim is None or (waiter.priority, waiter.seq) > (victim.priority, victim.seq):
+                victim = waiter
+        if victim is None or victim.priority <= priority:
+            return False
+        victim.cancelled = True
+        self._dequeue(victim)
+        self.shed += 1
+        victim.wake()
+        return True
+
+    def _enqueue(self, priority, waiter_type):
+        """
+        Take a free slot or join the queue.
+
+        Returns:
+            True if a slot was granted, False if shed, else the queued waiter
+        """
+        with self._lock:
+            if self._active < self.max_concurrent and not self._queued:
+                self._active += 1
+                self.admitted += 1
+                return True
+            if self._queued >= self.max_queue and not self._shed_lowest_waiter(priority):
+                self.shed += 1
+                return False
+            waiter = waiter_type(priority, next(self._seq))
+            heapq.heappush(self._heap, waiter)
+            self._queued += 1
+            self._queued_by_priority[priority] = self._queued_by_priority.get(priority, 0) + 1
+            return waiter
+
+    def _wait_ended(self, waiter):
+        """Settle a waiter whose wait is over; True if it was granted a slot"""
+        with self._lock:
+            waited = time.monotonic() - waiter.enqueued_at
+            self.total_wait += waited
+            self.max_observed_wait = max(self.max_observed_wait, waited)
+            if waiter.granted:
+                self.admitted += 1
+                return True
+            if not waiter.cancelled:
+                # Timed out while queued; leave it in the heap for lazy removal
+                waiter.cancelled = True
+                self._dequeue(waiter)
+                self.timed_out += 1
+            return False
+
+    def _wait_limit(self, max_wait):
+        return self.max_wait if max_wait is None else min(max_wait, self.max_wait)
+
+    def acquire(self, priority=PRIORITY_FAQ, max_wait=None):
+        """
+        Wait for an LLM slot, at most max_wait seconds (default: the scheduler's max_wait).
+
+        Returns:
+            bool: True if a slot was granted (caller must release()), False if shed
+        """
+        waiter = self._enqueue(priority, _Waiter)
+        if isinstance(waiter, bool):
+            return waiter
+        waiter.event.wait(self._wait_limit(max_wait))
+        return self._wait_ended(waiter)
+
+    async def acquire_async(self, priority=PRIORITY_FAQ, max_wait=None):
+        """acquire() for coroutines: a queued caller waits on the event loop, not in a thread"""
+        waiter = self._enqueue(priority, _AsyncWaiter)
+        if isinstance(waiter, bool):
+            return waiter
+        try:
+            await asyncio.wait_for(waiter.event, self._wait_limit(max_wait))
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # Hand back a slot granted after the caller went away
+            if self._wait_ended(waiter):
+                self.release()
+            raise
+        return self._wait_ended(waiter)
+
+    def release(self):
+        """Release a slot, handing it directly to the best queued waiter"""
+        with self._lock:
+            while self._heap:
+                waiter = heapq.heappop(self._heap)
+                if waiter.cancelled:
+                    continue
+                waiter.granted = True
+                self._dequeue(waiter)
+                waiter.wake()
+                return
+            self._active -= 1
+
+    @contextmanager
+    def slot(self, priority=PRIORITY_FAQ, max_wait=None):
+        """Context manager yielding True if admitted, False if the call was shed"""
+        admitted = self.acquire(priority, max_wait)
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release()
+
+    def stats(self):
+        with self._lock:
+            completed_waits = self.admitted + self.timed_out
+            return {
+                'active': self._active,
+                'queue_depth': self._queued,
+                'queue_depth_by_priority': {
+                    PRIORITY_NAMES.get(p, str(p)): n for p, n in self._queued_by_priority.items()
+                },
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'max_wait_seconds': self.max_wait,
+                'admitted': self.admitted,
+                'shed': self.shed,
+                'timed_out': self.timed_out,
+                'avg_wait_seconds': round(self.total_wait / completed_waits, 4) if completed_waits else 0.0,
+                'max_observed_wait_seconds': round(self.max_observed_wait, 4)
+            }
+
+
+# Process-wide scheduler shared by all requests
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,209 @@
+import os
+import copy
+import json
+import time
+import secrets
+import threading
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+# Session backend configuration
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'memory')  # memory, redis, filesystem
+SESSION_TTL = float(os.environ.get('SESSION_TTL', 6 * 3600))
+SESSION_MAX_ENTRIES = int(os.environ.get('SESSION_MAX_ENTRIES', 10000))
+SESSION_SWEEP_INTERVAL = float(os.environ.get('SESSION_SWEEP_INTERVAL', 60))
+SESSION_REDIS_URL = os.environ.get('SESSION_REDIS_URL', 'redis://127.0.0.1:6379/0')
+SESSION_KEY_PREFIX = 'nexrova:session:'
+
+
+class MemorySessionStore:
+    """
+    In-process session store with sliding expiry and a size bound.
+
+    Entries are kept in last-access order, so the sweeper thread only looks
+    at the front of the dict and stops at the first live session. When full,
+    the least recently used session is evicted. Suitable for a single worker
+    process; use the Redis store when several workers share sessions.
+    """
+
+    def __init__(self, ttl=SESSION_TTL, max_entries=SESSION_MAX_ENTRIES, sweep_interval=SESSION_SWEEP_INTERVAL):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._sweeper = None
+        self.expired = 0
+        self.evicted = 0
+
+    def _ensure_sweeper(self):
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        with self._lock:
+            if self._sweeper is None or not self._sweeper.is_alive():
+                self._sweeper = threading.Thread(target=self._sweep_loop, name='session-sweeper', daemon=True)
+                self._sweeper.start()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            self.sweep()
+
+    def sweep(self):
+        """Drop expired sessions; returns how many were removed"""
+        now = time.monotonic()
+        removed = 0
+        with self._lock:
+            while self._entries:
+                sid, (_, expires) = next(iter(self._entries.items()))
+                if expires > now:
+                    break
+                del self._entries[sid]
+                removed += 1
+            self.expired += removed
+        return removed
+
+    def get(self, sid):
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[sid]
+                self.expired += 1
+                return None
+            return copy.deepcopy(entry[0])
+
+    def set(self, sid, data):
+        self._ensure_sweeper()
+        with self._lock:
+            self._entries[sid] = (copy.deepcopy(data), time.monotonic() + self.ttl)
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def touch(self, sid):
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is not None:
+                self._entries[sid] = (entry[0], time.monotonic() + self.ttl)
+                self._entries.move_to_end(sid)
+
+    def delete(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'sessions': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'expired': self.expired,
+                'evicted': self.evicted
+            }
+
+
+class RedisSessionStore:
+    """
+    Session store in Redis (or any Redis-compatible server such as Valkey or
+    KeyDB on localhost), shared by all worker processes. Expiry is enforced by
+    the server; session data is stored as JSON.
+    """
+
+    def __init__(self, client, ttl=SESSION_TTL, prefix=SESSION_KEY_PREFIX):
+        self.client = client
+        self.ttl = int(ttl)
+        self.prefix = prefix
+
+    def get(self, sid):
+        value = self.client.get(self.prefix + sid)
+        return json.loads(value) if value else None
+
+    def set(self, sid, data):
+        self.client.setex(self.prefix + sid, self.ttl, json.dumps(data))
+
+    def touch(self, sid):
+        self.client.expire(self.prefix + sid, self.ttl)
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+    def stats(self):
+        return {'backend': 'redis', 'ttl_seconds': self.ttl}
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(session):
+            session.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Flask session interface keeping session data in a store, keyed by a random
+    id in the session cookie. Unchanged sessions only have their expiry
+    refreshed; nothing touches the disk.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.store.get(sid)
+            if data is not None:
+                return ServerSession(data, sid=sid)
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        cookie_name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(cookie_name, domain=domain, path=path)
+            return
+        if session.modified or session.new:
+            self.store.set(session.sid, dict(session))
+        else:
+            self.store.touch(session.sid)
+            return
+        response.set_cookie(
+            cookie_name, session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+
+def configure_sessions(app, backend=SESSION_BACKEND):
+    """
+    Install the session backend chosen by SESSION_BACKEND and return its store
+    (None for the legacy Flask-Session filesystem backend).
+    """
+    if backend == 'filesystem':
+        from flask_session import Session
+        app.config['SESSION_TYPE'] = 'filesystem'
+        Session(app)
+        return None
+    if backend == 'redis':
+        import redis
+        store = RedisSessionStore(redis.Redis.from_url(SESSION_REDIS_URL))
+    else:
+        store = MemorySessionStore()
+    app.session_interface = ServerSideSessionInterface(store)
+    return store
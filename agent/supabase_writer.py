@@ -0,0 +1,342 @@
+import os
+import json
+import uuid
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from event_log import get_logger
+
+log = get_logger('supabase')
+
+# Write-behind configuration
+WRITER_MAX_QUEUE = int(os.environ.get('SUPABASE_WRITER_MAX_QUEUE', 10000))
+WRITER_BATCH_SIZE = int(os.environ.get('SUPABASE_WRITER_BATCH_SIZE', 100))
+WRITER_FLUSH_INTERVAL = float(os.environ.get('SUPABASE_WRITER_FLUSH_INTERVAL', 0.5))
+WRITER_RETRY_DELAY = float(os.environ.get('SUPABASE_WRITER_RETRY_DELAY', 5.0))
+WRITER_SPILL_FILE = os.environ.get(
+    'SUPABASE_SPILL_FILE', os.path.join(os.path.dirname(__file__), 'supabase_spill.jsonl')
+)
+# local id -> Supabase interaction_id, kept across restarts for late updates
+WRITER_ID_MAP_DB = os.environ.get(
+    'SUPABASE_ID_MAP_DB', os.path.join(os.path.dirname(__file__), 'supabase_ids.db')
+)
+WRITER_ID_MAP_TTL = float(os.environ.get('SUPABASE_ID_MAP_TTL', 7 * 24 * 3600))
+
+# Operation types
+INSERT_INTERACTION = 'insert_interaction'
+UPDATE_INTERACTION = 'update_interaction'
+INSERT_SERVICE_REQUEST = 'insert_service_request'
+UPDATE_GUEST = 'update_guest'
+
+
+def new_local_id():
+    """Client-generated interaction id, valid before the row reaches Supabase"""
+    return f"local-{uuid.uuid4().hex}"
+
+
+class SupabaseWriteBehind:
+    """
+    Bounded in-process write-behind queue for Supabase analytics writes.
+
+    Request threads enqueue operations and return immediately. A background
+    worker drains the queue in batches:
+
+    1. Interaction inserts are sent as one bulk insert. Status updates for an
+       interaction that is still in the same batch are folded into its row.
+    2. Remaining status updates are grouped by value into one update per status.
+    3. Service requests are bulk inserted once their interaction ids are known.
+    4. Guest updates are merged per guest and sent individually.
+
+    Interactions are addressed by client-generated local ids, so later updates
+    can be queued before the insert lands; the worker maps them to the
+    interaction_id Supabase assigns. The mapping is also stored in a small
+    SQLite file, so updates queued before a restart (e.g. by recovered
+    housekeeping jobs) still find their row.
+
+    If Supabase is unreachable, or the queue is full, operations are appended
+    to a local JSONL spill file. Spilled operations are replayed before any
+    newer work, so an update never runs ahead of the insert it refers to.
+    """
+
+    def __init__(self, client_factory, max_queue=WRITER_MAX_QUEUE, batch_size=WRITER_BATCH_SIZE,
+                 flush_interval=WRITER_FLUSH_INTERVAL, spill_path=WRITER_SPILL_FILE,
+                 id_map_path=WRITER_ID_MAP_DB):
+        self.client_factory = client_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self.id_map_path = id_map_path
+        self._id_map_ready = False
+        self._id_map_pruned_at = 0.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._spill_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._worker = None
+        self._stopping = False
+        self._remote_ids = OrderedDict()
+        self._max_remote_ids = max_queue * 2
+        self.batches = 0
+        self.rows_written = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.errors = 0
+        self.dropped = 0
+
+    # --- Producer side (request threads) ---
+    def submit(self, op):
+        """Queue an operation without blocking; spill to disk if the queue is full"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(op)
+        except queue.Full:
+            self._spill([op])
+
+    def _ensure_started(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='supabase-writer', daemon=True)
+                self._worker.start()
+
+    # --- Spill file ---
+    def _spill(self, ops):
+        if not ops:
+            return
+        with self._spill_lock:
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                for op in ops:
+                    f.write(json.dumps(op, ensure_ascii=False) + '\n')
+        self.spilled += len(ops)
+
+    def _take_spilled(self):
+        """Atomically take every spilled operation off disk"""
+        with self._spill_lock:
+            if not os.path.exists(self.spill_path):
+                return []
+            replay_path = self.spill_path + '.replay'
+            os.replace(self.spill_path, replay_path)
+        ops = []
+        with open(replay_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        ops.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        self.dropped += 1
+        os.remove(replay_path)
+        return ops
+
+    # --- Worker side ---
+    def _run(self):
+        retry_at = 0.0
+        while not self._stopping:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                first = None
+
+            batch = [] if first is None else [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if time.monotonic() < retry_at:
+                # Supabase was unreachable recently; keep new writes on disk
+                self._spill(batch)
+                continue
+
+            # Spilled operations are older than anything in the queue
+            spilled = self._take_spilled()
+            work = spilled + batch
+            for start in range(0, len(work), self.batch_size):
+                chunk = work[start:start + self.batch_size]
+                if not self._process(chunk):
+                    # _process spilled the failed chunk; keep the rest behind it
+                    self._spill(work[start + self.batch_size:])
+                    retry_at = time.monotonic() + WRITER_RETRY_DELAY
+                    break
+                self.replayed += max(0, min(len(spilled), start + len(chunk)) - start)
+
+    def _process(self, batch):
+        """Write a batch; on failure spill the operations that did not land. Returns success."""
+        if not batch:
+            return True
+
+        pending = list(batch)
+        try:
+            client = self.client_factory()
+            pending = self._write_interactions(client, pending)
+            pending = self._write_status_updates(client, pending)
+            pending = self._write_service_requests(client, pending)
+            pending = self._write_guest_updates(client, pending)
+            self.batches += 1
+            return True
+        except Exception as e:
+            self.errors += 1
+            log.error("Write-behind batch failed, spilling %d ops: %s", len(pending), e)
+            self._spill(pending)
+            return False
+
+    # --- Local id map ---
+    def _connect_id_map(self):
+        conn = sqlite3.connect(self.id_map_path, timeout=10, isolation_level=None)
+        if not self._id_map_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS interaction_ids (
+                    local_id TEXT PRIMARY KEY,
+                    remote_id INTEGER NOT NULL,
+                    created REAL NOT NULL
+                )
+            """)
+            self._id_map_ready = True
+        return conn
+
+    def _remember(self, pairs):
+        """Record local -> remote ids in memory and on disk"""
+        for local_id, remote_id in pairs:
+            self._remote_ids[local_id] = remote_id
+            if len(self._remote_ids) > self._max_remote_ids:
+                self._remote_ids.popitem(last=False)
+
+        now = time.time()
+        try:
+            conn = self._connect_id_map()
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO interaction_ids (local_id, remote_id, created) VALUES (?, ?, ?)",
+                    [(local_id, remote_id, now) for local_id, remote_id in pairs]
+                )
+                if now - self._id_map_pruned_at > 3600:
+                    conn.execute("DELETE FROM interaction_ids WHERE created < ?", (now - WRITER_ID_MAP_TTL,))
+                    self._id_map_pruned_at = now
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            # The rows are already in Supabase; only updates after a restart lose out
+            log.error("Could not persist interaction ids: %s", e)
+
+    def _lookup_stored(self, local_id):
+        try:
+            conn = self._connect_id_map()
+            try:
+                row = conn.execute(
+                    "SELECT remote_id FROM interaction_ids WHERE local_id = ?", (local_id,)
+                ).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            log.error("Could not read interaction ids: %s", e)
+            return None
+        return row[0] if row else None
+
+    def _write_interactions(self, client, ops):
+        inserts = OrderedDict()
+        rest = []
+        for op in ops:
+            if op['op'] == INSERT_INTERACTION:
+                inserts[op['local_id']] = dict(op['row'])
+            elif op['op'] == UPDATE_INTERACTION and op['local_id'] in inserts:
+                inserts[op['local_id']].update(op['values'])
+            else:
+                rest.append(op)
+        if not inserts:
+            return ops
+
+        result = client.table('Interactions').insert(list(inserts.values())).execute()
+        self._remember([(local_id, row['interaction_id']) for local_id, row in zip(inserts.keys(), result.data)])
+        self.rows_written += len(inserts)
+        return rest
+
+    def _resolve(self, local_id):
+        remote_id = self._remote_ids.get(local_id)
+        if remote_id is None:
+            remote_id = self._lookup_stored(local_id)
+        if remote_id is None:
+            self.dropped += 1
+            log.warning("Dropping write for unknown interaction %s", local_id)
+        return remote_id
+
+    def _write_status_updates(self, client, ops):
+        latest = OrderedDict()
+        rest = []
+        for op in ops:
+            if op['op'] == UPDATE_INTERACTION:
+                latest.setdefault(op['local_id'], {}).update(op['values'])
+            else:
+                rest.append(op)
+        if not latest:
+            return ops
+
+        by_values = {}
+        for local_id, values in latest.items():
+            remote_id = self._resolve(local_id)
+            if remote_id is not None:
+                key = json.dumps(values, sort_keys=True)
+                by_values.setdefault(key, (values, []))[1].append(remote_id)
+
+        for values, remote_ids in by_values.values():
+            client.table('Interactions').update(values).in_('interaction_id', remote_ids).execute()
+            self.rows_written += len(remote_ids)
+        return rest
+
+    def _write_service_requests(self, client, ops):
+        rows = []
+        rest = []
+        for op in ops:
+            if op['op'] == INSERT_SERVICE_REQUEST:
+                remote_id = self._resolve(op['local_id'])
+                if remote_id is not None:
+                    rows.append({**op['row'], 'interaction_id': remote_id})
+            else:
+                rest.append(op)
+        if rows:
+            client.table('ServiceRequests').insert(rows).execute()
+            self.rows_written += len(rows)
+        return rest
+
+    def _write_guest_updates(self, client, ops):
+        merged = OrderedDict()
+        rest = []
+        for op in ops:
+            if op['op'] == UPDATE_GUEST:
+                merged.setdefault(op['guest_id'], {}).update(op['values'])
+            else:
+                rest.append(op)
+
+        for guest_id, values in merged.items():
+            client.table('Guest').update(values).eq('guest_id', guest_id).execute()
+            self.rows_written += 1
+        return rest
+
+    def stop(self):
+        """Stop the worker and spill whatever is still queued"""
+        self._stopping = True
+        if self._worker is not None:
+            self._worker.join(timeout=self.flush_interval * 2)
+        leftover = []
+        while True:
+            try:
+                leftover.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self._spill(leftover)
+
+    def stats(self):
+        return {
+            'queue_depth': self._queue.qsize(),
+            'batches': self.batches,
+            'rows_written': self.rows_written,
+            'spilled': self.spilled,
+            'replayed': self.replayed,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'spill_file_exists': os.path.exists(self.spill_path)
+        }
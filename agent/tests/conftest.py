@@ -0,0 +1,27 @@
+"""
+The agent's modules import each other flat (from llm_handler import ...), as
+when run from agent/, and the helpers in shared/ the same way. Settings are
+read at import, so point every file and external service at a throwaway
+location before any module is imported.
+"""
+import os
+import sys
+import tempfile
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AGENT_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(AGENT_DIR), 'shared'))
+
+_workdir = tempfile.mkdtemp(prefix='nexrova-tests-')
+os.environ.update({
+    'HOUSEKEEPING_LOG': os.path.join(_workdir, 'housekeeping_requests.jsonl'),
+    'EMAIL_OUTBOX_DB': os.path.join(_workdir, 'email_outbox.db'),
+    'SUPABASE_SPILL_FILE': os.path.join(_workdir, 'supabase_spill.jsonl'),
+    'SUPABASE_ID_MAP_DB': os.path.join(_workdir, 'supabase_ids.db'),
+    'NEXROVA_WORKER_ID_DIR': os.path.join(_workdir, 'worker_ids'),
+    'OLLAMA_API_URL': 'http://127.0.0.1:9',
+    'PMS_API_URL': 'http://127.0.0.1:9/api',
+    'OLLAMA_WARMUP': '0',
+    'ARRIVALS_MIRROR_ENABLED': '0',
+    'LOG_FORMAT': 'text',
+})
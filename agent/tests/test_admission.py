@@ -0,0 +1,37 @@
+import pytest
+
+from admission import ChatAdmission, forwarded_client, COST_LLM, SCOPE_NEW_SESSION
+
+
+@pytest.mark.parametrize('forwarded_for, hops, expected', [
+    (None, 1, '10.0.0.1'),
+    ('203.0.113.7', 1, '203.0.113.7'),
+    # a client-supplied entry in front of what the proxy appended is ignored
+    ('6.6.6.6, 203.0.113.7', 1, '203.0.113.7'),
+    ('6.6.6.6, 203.0.113.7, 192.168.1.5', 2, '203.0.113.7'),
+    ('203.0.113.7', 3, '203.0.113.7'),
+    ('203.0.113.7', 0, '10.0.0.1'),
+    (' , ', 1, '10.0.0.1'),
+])
+def test_client_address_behind_trusted_proxies(forwarded_for, hops, expected):
+    assert forwarded_client(forwarded_for, '10.0.0.1', hops) == expected
+
+
+def test_forwarded_for_is_ignored_by_default():
+    assert forwarded_client('203.0.113.7', '10.0.0.1') == '10.0.0.1'
+
+
+def test_cookie_less_turns_share_a_bucket_per_ip():
+    admission = ChatAdmission(enabled=True)
+    results = [admission.admit(None, '10.0.0.1', COST_LLM) for _ in range(10)]
+    assert not all(admitted for admitted, _, _ in results)
+    assert results[-1][2] == SCOPE_NEW_SESSION
+    # established sessions from another address are not affected
+    assert admission.admit('session-1', '10.0.0.2', COST_LLM)[0]
+
+
+def test_established_session_is_not_charged_to_the_new_session_bucket():
+    admission = ChatAdmission(enabled=True)
+    for _ in range(4):
+        assert admission.admit('session-1', '10.0.0.1', COST_LLM)[0]
+    assert admission.stats()['rejected'][SCOPE_NEW_SESSION] == 0
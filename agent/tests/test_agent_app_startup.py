@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+
+import agent_app
+from conftest import AGENT_DIR
+
+WORKER_THREADS = {'ollama-warmup', 'arrivals-mirror', 'email-dispatcher', 'housekeeping-rescan'}
+
+
+def test_import_starts_no_background_workers():
+    env = dict(os.environ, OLLAMA_WARMUP='1', ARRIVALS_MIRROR_ENABLED='1')
+    names = subprocess.run(
+        [sys.executable, '-c', "import threading, agent_app; print([t.name for t in threading.enumerate()])"],
+        cwd=AGENT_DIR, env=env, capture_output=True, text=True, timeout=60, check=True
+    ).stdout
+    assert not any(name in names for name in WORKER_THREADS)
+
+
+def test_first_request_starts_workers_once(monkeypatch):
+    started = []
+    monkeypatch.setattr(agent_app, '_workers_pid', None)
+    monkeypatch.setattr(agent_app, 'ARRIVALS_MIRROR_ENABLED', True)
+    monkeypatch.setattr(agent_app, 'start_warm_up', lambda hotel_info: started.append('warm_up'))
+    monkeypatch.setattr(agent_app.arrivals_mirror, 'start', lambda: started.append('arrivals_mirror'))
+    monkeypatch.setattr(agent_app.email_dispatcher, 'start', lambda: started.append('email_dispatcher'))
+    monkeypatch.setattr(agent_app.housekeeping_jobs, 'start', lambda: started.append('housekeeping_jobs'))
+
+    client = agent_app.app.test_client()
+    client.get('/ready')
+    client.get('/ready')
+
+    assert started == ['warm_up', 'arrivals_mirror', 'email_dispatcher', 'housekeeping_jobs']
@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import pytest
+import requests
+
+import arrivals_mirror
+from arrivals_mirror import ArrivalsMirror
+
+ASHA = {'booking_id': 'B1', 'guest_name': 'Asha Rao', 'guest_phone': '+91 98765-43210'}
+VIKRAM = {'booking_id': 'B2', 'guest_name': 'Vikram Shah', 'guest_phone': '9123456780'}
+
+
+class FakePMS:
+    """/arrivals with a version token; changed=False when the caller is current"""
+
+    def __init__(self, bookings):
+        self.bookings = list(bookings)
+        self.version = 1
+        self.down = False
+        self.requests = []
+
+    def book(self, booking):
+        self.bookings.append(booking)
+        self.version += 1
+
+    def get(self, url, params=None, timeout=None):
+        self.requests.append(dict(params))
+        if self.down:
+            raise requests.exceptions.ConnectionError("PMS unreachable")
+        if params.get('since') == str(self.version):
+            payload = {'changed': False, 'version': str(self.version)}
+        else:
+            payload = {'changed': True, 'version': str(self.version), 'data': list(self.bookings)}
+        return type('Response', (), {'raise_for_status': lambda self: None, 'json': lambda self: payload})()
+
+
+@pytest.fixture
+def pms(monkeypatch):
+    pms = FakePMS([ASHA])
+    monkeypatch.setattr(arrivals_mirror.requests, 'get', pms.get)
+    return pms
+
+
+@pytest.fixture
+def mirror(monkeypatch):
+    mirror = ArrivalsMirror(api_url='http://pms.test/api')
+    # No poller thread: the test drives every refresh
+    monkeypatch.setattr(mirror, 'start', lambda: None)
+    assert mirror.refresh()
+    return mirror
+
+
+def test_lookup_matches_normalized_phone_and_name_without_polling(pms, mirror):
+    booking, authoritative = mirror.lookup('asha rao', '9876543210')
+    assert booking == ASHA and authoritative
+    assert len(pms.requests) == 1
+
+
+def test_miss_polls_once_and_finds_a_booking_made_since(pms, mirror):
+    pms.book(VIKRAM)
+    booking, authoritative = mirror.lookup('Vikram Shah', '9123456780')
+
+    assert booking == VIKRAM and authoritative
+    assert pms.requests[1] == {'date': datetime.now().strftime('%Y-%m-%d'), 'since': '1'}
+    assert mirror.stats()['reloads'] == 2
+
+
+def test_miss_on_a_current_mirror_is_authoritative(pms, mirror):
+    booking, authoritative = mirror.lookup('Nobody', '9000000000')
+    assert booking is None and authoritative
+    # The poll found nothing new and kept the index
+    assert mirror.stats()['reloads'] == 1 and mirror.stats()['arrivals'] == 1
+
+
+def test_miss_while_the_pms_is_unreachable_proves_nothing(pms, mirror):
+    pms.down = True
+    mirror.max_staleness = 0
+    booking, authoritative = mirror.lookup('Vikram Shah', '9123456780')
+    assert booking is None and not authoritative
+    assert mirror.stats()['errors'] == 1
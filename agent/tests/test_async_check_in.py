@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+import async_agent_app
+from supabase_writer import UPDATE_GUEST, UPDATE_INTERACTION
+
+BOOKING_CHECKED_IN = {
+    'success': True, 'guest_name': 'Asha Rao', 'room_number': '101', 'room_type': 'Deluxe',
+    'box_id': 'A1', 'check_in': '2026-10-18', 'check_out': '2026-10-19'
+}
+
+
+def run_check_in(monkeypatch, start_interaction, verify_and_check_in):
+    monkeypatch.setattr(async_agent_app, 'start_interaction', start_interaction)
+    monkeypatch.setattr(async_agent_app, 'verify_and_check_in', verify_and_check_in)
+
+    async def conversation():
+        client = async_agent_app.app.test_client()
+        async with client.session_transaction() as session:
+            session['state'] = 'AWAITING_PHONE'
+            session['guest_name'] = 'Asha Rao'
+        response = await client.post('/chat', json={'message': '9876543210'})
+        async with client.session_transaction() as session:
+            return await response.get_json(), dict(session)
+
+    return asyncio.run(conversation())
+
+
+def test_supabase_failure_does_not_hide_a_completed_check_in(monkeypatch):
+    async def supabase_down(*args):
+        raise ConnectionError("Supabase unreachable")
+
+    async def checked_in(guest_name, guest_phone):
+        return dict(BOOKING_CHECKED_IN)
+
+    reply, session = run_check_in(monkeypatch, supabase_down, checked_in)
+
+    assert reply['action'] == {'type': 'unlock', 'box_id': 'A1', 'room_number': '101'}
+    assert session['checked_in'] is True
+    assert session['checked_in_room'] == '101'
+
+
+def test_check_in_analytics_go_through_the_write_behind_queue(monkeypatch):
+    queued = []
+
+    async def started(*args):
+        return 1, 'interaction-1'
+
+    async def checked_in(guest_name, guest_phone):
+        return dict(BOOKING_CHECKED_IN)
+
+    monkeypatch.setattr(async_agent_app.supabase_writer, 'submit', queued.append)
+    reply, session = run_check_in(monkeypatch, started, checked_in)
+
+    assert reply['action']['type'] == 'unlock'
+    assert session['checked_in'] is True
+    assert session['guest_id'] == 1
+    assert [op['op'] for op in queued] == [UPDATE_GUEST, UPDATE_INTERACTION]
+    assert queued[1] == {'op': UPDATE_INTERACTION, 'local_id': 'interaction-1', 'values': {'status': 'checked_in'}}
+
+
+@pytest.mark.parametrize('interaction_fails', [False, True])
+def test_booking_not_found_is_reported(monkeypatch, interaction_fails):
+    async def start(*args):
+        if interaction_fails:
+            raise ConnectionError("Supabase unreachable")
+        return 1, 'interaction-1'
+
+    async def not_found(guest_name, guest_phone):
+        return dict(async_agent_app.BOOKING_NOT_FOUND)
+
+    monkeypatch.setattr(async_agent_app.supabase_writer, 'submit', lambda op: None)
+    reply, session = run_check_in(monkeypatch, start, not_found)
+
+    assert reply['action'] is None
+    assert not session.get('checked_in')
+    assert session['state'] == 'INIT'
@@ -0,0 +1,42 @@
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+def make_breaker():
+    return CircuitBreaker('test', failure_threshold=3, recovery_timeout=0, timeout_threshold=3)
+
+
+def test_repeated_budget_timeouts_open_the_circuit():
+    breaker = make_breaker()
+    breaker.record_timeout()
+    breaker.record_timeout()
+    assert breaker.state == CLOSED
+    breaker.record_timeout()
+    assert breaker.state == OPEN
+    assert breaker.stats()['times_opened'] == 1
+
+
+def test_success_between_timeouts_keeps_the_circuit_closed():
+    breaker = make_breaker()
+    for _ in range(5):
+        breaker.record_timeout()
+        breaker.record_timeout()
+        breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.stats()['consecutive_timeouts'] == 0
+
+
+def test_timeout_on_a_half_open_trial_reopens_the_circuit():
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    breaker.record_timeout()
+    assert breaker.state == OPEN
+
+
+def test_inconclusive_calls_never_open_the_circuit():
+    breaker = make_breaker()
+    for _ in range(10):
+        breaker.record_inconclusive()
+    assert breaker.state == CLOSED
@@ -0,0 +1,42 @@
+import asyncio
+import os
+
+import pytest
+
+import agent_app
+import async_agent_app
+import local_access
+
+LOCAL = {'REMOTE_ADDR': '127.0.0.1'}
+
+
+@pytest.fixture
+def flask_client(monkeypatch):
+    # Workers count as started, so a request does not spawn them
+    monkeypatch.setattr(agent_app, '_workers_pid', os.getpid())
+    monkeypatch.setattr(agent_app, 'DEBUG_TOKEN', None)
+    return agent_app.app.test_client()
+
+
+def test_local_proxy_does_not_open_the_debug_endpoints(flask_client):
+    assert flask_client.get('/debug/traces', environ_base=LOCAL).status_code == 200
+    relayed = flask_client.get('/debug/traces', environ_base=LOCAL, headers={'X-Forwarded-For': '203.0.113.7'})
+    assert relayed.status_code == 401
+
+
+def test_trusted_proxy_requires_the_debug_token(flask_client, monkeypatch):
+    monkeypatch.setattr(local_access, 'TRUSTED_PROXY_HOPS', 1)
+    assert flask_client.get('/debug/traces', environ_base=LOCAL).status_code == 401
+    monkeypatch.setattr(agent_app, 'DEBUG_TOKEN', 's3cret')
+    assert flask_client.get('/debug/traces', headers={'X-Debug-Token': 's3cret'}).status_code == 200
+
+
+def test_async_app_checks_debug_access_the_same_way(monkeypatch):
+    monkeypatch.setattr(async_agent_app, 'DEBUG_TOKEN', None)
+
+    async def status(headers):
+        client = async_agent_app.app.test_client()
+        response = await client.get('/debug/traces', headers=headers)
+        return response.status_code
+
+    assert asyncio.run(status({'X-Forwarded-For': '203.0.113.7'})) == 401
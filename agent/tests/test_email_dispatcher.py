@@ -0,0 +1,64 @@
+import time
+
+import email_dispatcher
+from email_dispatcher import EmailDispatcher
+
+
+def make_dispatcher(db_path, delivered):
+    dispatcher = EmailDispatcher(
+        build_message=lambda payload, from_addr: payload,
+        on_sent=delivered.extend,
+        db_path=str(db_path)
+    )
+    dispatcher._send = lambda msg: None
+    return dispatcher
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return
+        time.sleep(0.02)
+    raise AssertionError("condition not reached")
+
+
+def queue_without_worker(dispatcher, payload):
+    """What a process that died before sending leaves in the outbox"""
+    start, dispatcher.start = dispatcher.start, lambda: None
+    try:
+        dispatcher.enqueue(payload)
+    finally:
+        dispatcher.start = start
+
+
+def test_outbox_left_by_previous_run_is_sent_on_start(tmp_path):
+    previous = make_dispatcher(tmp_path / 'outbox.db', [])
+    queue_without_worker(previous, {'notification_id': 'HK-1'})
+    queue_without_worker(previous, {'notification_id': 'HK-2'})
+    assert previous.stats()['queued'] == 2
+
+    delivered = []
+    dispatcher = make_dispatcher(tmp_path / 'outbox.db', delivered)
+    dispatcher.start()
+    wait_until(lambda: len(delivered) == 2)
+
+    assert [p['notification_id'] for p in delivered] == ['HK-1', 'HK-2']
+    stats = dispatcher.stats()
+    assert stats['queued'] == 0 and stats['sent'] == 2 and stats['worker_alive']
+
+
+def test_claim_abandoned_by_a_crashed_worker_is_retried(tmp_path, monkeypatch):
+    monkeypatch.setattr(email_dispatcher, 'EMAIL_CLAIM_TIMEOUT', 0)
+    previous = make_dispatcher(tmp_path / 'outbox.db', [])
+    queue_without_worker(previous, {'notification_id': 'HK-3'})
+    assert previous._claim_due()
+    assert previous.stats()['sending'] == 1
+
+    delivered = []
+    dispatcher = make_dispatcher(tmp_path / 'outbox.db', delivered)
+    dispatcher.start()
+    wait_until(lambda: delivered)
+
+    assert delivered == [{'notification_id': 'HK-3'}]
+    assert dispatcher.stats()['sending'] == 0
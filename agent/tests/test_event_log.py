@@ -0,0 +1,44 @@
+import logging
+
+import event_log
+from event_log import RepeatSampler
+
+
+def record(msg, level=logging.WARNING, name='llm', args=()):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def passed(sampler, records):
+    return [r for r in records if sampler.filter(r)]
+
+
+def test_repeats_past_the_burst_are_suppressed_per_template():
+    sampler = RepeatSampler(burst=2, window=60)
+    timeouts = [record("Ollama timed out after %ss", args=(n,)) for n in range(5)]
+
+    assert len(passed(sampler, timeouts)) == 2
+    assert sampler.filter(record("Ollama timed out after %ss", name='pms', args=(1,)))
+    assert sampler.filter(record("Breaker opened: %s", args=('timeouts',)))
+    assert sampler.suppressed == 3
+
+
+def test_first_record_after_the_window_reports_the_suppressed_count(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(event_log.time, 'monotonic', lambda: now[0])
+    sampler = RepeatSampler(burst=1, window=10)
+    passed(sampler, [record("Supabase write failed") for _ in range(4)])
+
+    now[0] += 10
+    after = record("Supabase write failed")
+    assert sampler.filter(after)
+    assert after.suppressed == 3
+    assert not sampler.filter(record("Supabase write failed"))
+
+
+def test_info_and_critical_records_are_never_sampled():
+    sampler = RepeatSampler(burst=1, window=60)
+    infos = [record("Turn finished", level=logging.INFO) for _ in range(3)]
+    criticals = [record("Spill file unwritable", level=logging.CRITICAL) for _ in range(3)]
+
+    assert len(passed(sampler, infos + criticals)) == 6
+    assert sampler.suppressed == 0
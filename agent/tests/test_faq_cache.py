@@ -0,0 +1,52 @@
+import pytest
+
+from faq_cache import SemanticFAQCache, embed_question
+
+HOTEL = 'fingerprint-1'
+PHONE_ANSWER = "You can call the front desk on +91-44-1234-5678."
+EMAIL_ANSWER = "You can write to info@chennaibnb.com."
+
+
+@pytest.fixture
+def cache():
+    return SemanticFAQCache(capacity=8)
+
+
+def similarity(a, b):
+    return float(embed_question(a) @ embed_question(b))
+
+
+def test_rephrased_question_hits(cache):
+    cache.store("What is the wifi password?", "It is at the reception desk.", HOTEL)
+    assert cache.lookup("wifi password please", HOTEL) == "It is at the reception desk."
+    assert cache.lookup("What's the internet passcode?", HOTEL) == "It is at the reception desk."
+
+
+@pytest.mark.parametrize('phone_question, email_question', [
+    ("what is the hotel phone number", "what is the hotel email"),
+    ("how do I contact the hotel by phone", "how do I contact the hotel by email"),
+    ("hotel phone?", "hotel e-mail?"),
+])
+def test_email_and_phone_questions_do_not_share_answers(cache, phone_question, email_question):
+    cache.store(phone_question, PHONE_ANSWER, HOTEL)
+    assert cache.lookup(email_question, HOTEL) is None
+
+    cache.store(email_question, EMAIL_ANSWER, HOTEL)
+    assert cache.lookup(phone_question, HOTEL) == PHONE_ANSWER
+    assert cache.lookup(email_question, HOTEL) == EMAIL_ANSWER
+    assert cache.stats()['size'] == 2
+
+
+def test_phone_and_email_are_not_synonyms():
+    assert similarity("what is the hotel email", "what is the hotel phone number") < 0.8
+
+
+def test_food_question_does_not_get_breakfast_answer(cache):
+    cache.store("what time is breakfast", "Breakfast is served 7-10 am.", HOTEL)
+    assert cache.lookup("is there food nearby", HOTEL) is None
+
+
+def test_hotel_info_change_drops_answers(cache):
+    cache.store("what is the wifi password", "At reception.", HOTEL)
+    assert cache.lookup("what is the wifi password", 'fingerprint-2') is None
+    assert cache.stats()['invalidations'] == 1
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+from guest_cache import GuestIdentityCache
+
+
+class SlowLoader:
+    """get_or_create_guest stand-in that holds every lookup until released"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+        self.release = threading.Event()
+
+    def __call__(self, phone_number):
+        self.calls.append(phone_number)
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return 42, True
+
+
+def test_concurrent_misses_share_one_lookup():
+    loader = SlowLoader()
+    cache = GuestIdentityCache(loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_create('9876543210')))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()['coalesced'] < 7:
+        threading.Event().wait(0.01)
+    loader.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert loader.calls == ['9876543210']
+    # Only the leader learns the guest was just created
+    assert sorted(results) == [(42, False)] * 7 + [(42, True)]
+    assert cache.get_or_create('9876543210') == (42, False)
+    assert cache.stats()['hits'] == 1
+
+
+def test_failed_lookup_is_cached_until_negative_ttl_expires():
+    loader = SlowLoader(error=ConnectionError("Supabase unreachable"))
+    loader.release.set()
+    cache = GuestIdentityCache(loader, negative_ttl=60)
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            cache.get_or_create('9876543210')
+    assert len(loader.calls) == 1
+    assert cache.stats()['negative_hits'] == 2
+
+    expired = GuestIdentityCache(loader, negative_ttl=0)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            expired.get_or_create('9876543210')
+    assert len(loader.calls) == 3
+
+
+def test_peek_never_loads():
+    loader = SlowLoader()
+    cache = GuestIdentityCache(loader)
+    assert cache.peek('9876543210') is None
+    cache.put('9876543210', 7)
+    assert cache.peek('9876543210') == 7
+    assert loader.calls == []
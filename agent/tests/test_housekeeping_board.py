@@ -0,0 +1,47 @@
+import json
+
+from housekeeping_store import HousekeepingLog
+from housekeeping_board import HousekeepingBoard, STATUS_CLAIMED, STATUS_COMPLETED
+
+
+def make_board(tmp_path):
+    log = HousekeepingLog(path=str(tmp_path / 'log.jsonl'), legacy_path=None)
+    log.add({'notification_id': 'HK-1', 'room_number': '101', 'status': 'pending'})
+    log.add({'notification_id': 'HK-2', 'room_number': '102', 'status': 'pending'})
+    return HousekeepingBoard(log=log, poll_interval=60)
+
+
+def test_only_one_staff_member_can_claim_a_request(tmp_path):
+    board = make_board(tmp_path)
+    claimed = board.claim('HK-1', 'Ravi')
+    assert claimed['status'] == STATUS_CLAIMED and claimed['claimed_by'] == 'Ravi'
+    assert board.claim('HK-1', 'Meena') is None
+    assert board.log.get('HK-1')['claimed_by'] == 'Ravi'
+
+
+def test_complete_needs_a_claim_and_closes_the_request(tmp_path):
+    board = make_board(tmp_path)
+    assert board.complete('HK-2', 'Ravi') is None
+
+    board.claim('HK-2', 'Ravi')
+    completed = board.complete('HK-2', 'Ravi')
+    assert completed['status'] == STATUS_COMPLETED and completed['completed_at']
+    assert board.complete('HK-2', 'Ravi') is None
+    assert [n['notification_id'] for n in board.snapshot()] == ['HK-1']
+    stats = board.stats()
+    assert stats['pending'] == 1 and stats['claimed'] == 0
+
+
+def test_stream_pushes_claims_after_the_snapshot(tmp_path):
+    board = make_board(tmp_path)
+    stream = board.stream()
+    snapshot = next(stream)
+    assert snapshot.startswith('event: snapshot\n')
+    assert [n['notification_id'] for n in json.loads(snapshot.split('data: ', 1)[1])] == ['HK-1', 'HK-2']
+
+    board.claim('HK-1', 'Ravi')
+    event = next(stream)
+    assert event.startswith('event: request\n')
+    assert json.loads(event.split('data: ', 1)[1])['claimed_by'] == 'Ravi'
+    stream.close()
+    assert board.stats()['subscribers'] == 0
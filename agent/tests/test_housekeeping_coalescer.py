@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+from housekeeping_store import HousekeepingLog
+from housekeeping_coalescer import HousekeepingCoalescer, request_signature
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two workers' views of one housekeeping log"""
+    path = str(tmp_path / 'housekeeping.jsonl')
+    legacy = str(tmp_path / 'legacy.json')
+    return [HousekeepingCoalescer(log=HousekeepingLog(path, legacy), enabled=True) for _ in range(2)]
+
+
+def open_ticket(store, room='301', text="need towels"):
+    store.add({
+        'notification_id': 'HK-1', 'room_number': room, 'request': text, 'status': 'pending',
+        'signature': request_signature(text), 'last_request_at': time.time()
+    })
+
+
+def test_concurrent_merges_keep_every_follow_up(workers):
+    first, second = workers
+    open_ticket(first.log)
+    seen_by_first = first.find_open_ticket('301', ['towel'])
+    seen_by_second = second.find_open_ticket('301', ['towel'])
+
+    assert first.merge(seen_by_first, "towels please") == 1
+    # second worker still holds the ticket as it was before the first merge
+    assert second.merge(seen_by_second, "still waiting for towels") == 2
+
+    ticket = first.log.get('HK-1')
+    assert ticket['duplicates'] == 2
+    assert ticket['follow_ups'] == ["towels please", "still waiting for towels"]
+
+
+def test_merge_into_a_ticket_closed_meanwhile_is_refused(workers):
+    first, second = workers
+    open_ticket(first.log)
+    stale = second.find_open_ticket('301', ['towel'])
+    first.log.update('HK-1', status='completed')
+
+    assert second.merge(stale, "towels please") is None
+    assert not first.log.get('HK-1').get('duplicates')
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+from housekeeping_store import HousekeepingLog
+from housekeeping_board import HousekeepingBoard
+from housekeeping_dispatch import HousekeepingDispatcher, URGENCY_URGENT, URGENCY_ROUTINE
+
+NOW = datetime(2026, 10, 19, 12, 0, 0)
+FLOORS = {'101': 1, '102': 1, '201': 2, '202': 2}
+
+
+def request(notification_id, room, minutes_ago, urgency=URGENCY_ROUTINE, duplicates=0):
+    return {
+        'notification_id': notification_id, 'room_number': room, 'status': 'pending',
+        'timestamp': (NOW - timedelta(minutes=minutes_ago)).strftime('%Y-%m-%d %H:%M:%S'),
+        'urgency_class': urgency, 'duplicates': duplicates
+    }
+
+
+def make_dispatcher(tmp_path, *requests):
+    log = HousekeepingLog(path=str(tmp_path / 'log.jsonl'), legacy_path=None)
+    for notification in requests:
+        log.add(notification)
+    board = HousekeepingBoard(log=log, poll_interval=60)
+    return HousekeepingDispatcher(log=log, board=board, floor_loader=lambda: dict(FLOORS))
+
+
+def order(dispatcher):
+    return [task['notification_id'] for task in iter(lambda: dispatcher.next_task('Ravi'), None)]
+
+
+def test_urgency_and_repeats_earn_a_head_start_but_age_still_wins(tmp_path):
+    dispatcher = make_dispatcher(
+        tmp_path,
+        request('HK-routine-old', '101', 45),
+        request('HK-routine', '102', 20),
+        request('HK-urgent', '201', 0, urgency=URGENCY_URGENT),
+        request('HK-repeated', '202', 10, duplicates=3)
+    )
+    assert [r['notification_id'] for r in dispatcher.queue()] == \
+        ['HK-routine-old', 'HK-urgent', 'HK-repeated', 'HK-routine']
+
+
+def test_staff_stay_on_their_floor_within_the_slack(tmp_path):
+    dispatcher = make_dispatcher(
+        tmp_path,
+        request('HK-1', '101', 30),
+        request('HK-2', '201', 28),
+        request('HK-3', '102', 25)
+    )
+    # HK-3 is within the floor slack of HK-2, so Ravi keeps to floor 1
+    assert order(dispatcher) == ['HK-1', 'HK-3', 'HK-2']
+    assert dispatcher.stats()['batched_on_floor'] == 1
+
+
+def test_requests_claimed_on_the_board_are_skipped(tmp_path):
+    dispatcher = make_dispatcher(
+        tmp_path,
+        request('HK-1', '101', 30),
+        request('HK-2', '102', 20)
+    )
+    dispatcher.queue()
+    assert dispatcher.board.claim('HK-1', 'Meena') is not None
+    task = dispatcher.next_task('Ravi')
+    assert task['notification_id'] == 'HK-2' and task['claimed_by'] == 'Ravi'
+    assert dispatcher.next_task('Ravi') is None
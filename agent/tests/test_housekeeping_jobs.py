@@ -0,0 +1,90 @@
+import time
+
+import housekeeping_jobs
+import llm_handler
+import llm_hedge
+from housekeeping_jobs import HousekeepingJobs, JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_PROCESSING
+from housekeeping_store import housekeeping_log
+from id_generator import next_notification_id
+
+LLM_SUMMARY = "Guest reports a coffee spill on the bedroom carpet."
+
+
+def slow_llm(monkeypatch, seconds):
+    """call_task answering every prompt after `seconds`, longer than the turn deadline"""
+    def call_task(task, prompt, priority=None, response_format=None):
+        time.sleep(seconds)
+        return LLM_SUMMARY
+    monkeypatch.setattr(llm_handler, 'call_task', call_task)
+    monkeypatch.setattr(llm_hedge, 'LLM_TURN_DEADLINE', 0.05)
+
+
+def wait_for_job(jobs, ticket_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = jobs.status(ticket_id)
+        if status['job_status'] in (JOB_DONE, JOB_FAILED):
+            return status
+        time.sleep(0.02)
+    raise AssertionError(f"job {ticket_id} did not finish")
+
+
+def test_guest_turn_summary_is_hedged(monkeypatch):
+    slow_llm(monkeypatch, 0.3)
+    request = "there is coffee spilled on the carpet in the bedroom"
+    assert llm_handler.summarize_request(request) == request
+
+
+def test_background_job_waits_for_the_llm_summary(monkeypatch):
+    slow_llm(monkeypatch, 0.3)
+    jobs = HousekeepingJobs()
+    ticket_id, merged = jobs.submit("oops I spilled coffee all over the carpet", 'Asha Rao', '301')
+
+    status = wait_for_job(jobs, ticket_id)
+    assert not merged
+    assert status['job_status'] == JOB_DONE
+    assert status['summary'] == LLM_SUMMARY
+
+
+def left_by_previous_process(job_status, **fields):
+    """A ready-to-dispatch job as a crashed process leaves it in the log"""
+    ticket_id = next_notification_id()
+    housekeeping_log.add({
+        'notification_id': ticket_id, 'timestamp': '2026-10-18 09:00:00', 'guest_name': 'Asha Rao',
+        'room_number': '301', 'request': "extra towels", 'summary': "Guest needs extra towels.",
+        'summary_ready': True, 'status': 'pending', 'job_status': job_status, **fields
+    })
+    return ticket_id
+
+
+def record_dispatches(monkeypatch):
+    dispatched = []
+    monkeypatch.setattr(housekeeping_jobs, 'dispatch_notification', lambda n: dispatched.append(n['notification_id']))
+    return dispatched
+
+
+def test_start_finishes_jobs_queued_before_a_crash(monkeypatch):
+    dispatched = record_dispatches(monkeypatch)
+    queued = left_by_previous_process(JOB_QUEUED, job_queued_at=time.time())
+    stale = left_by_previous_process(JOB_PROCESSING, job_claimed_at=time.time() - 3600)
+
+    jobs = HousekeepingJobs()
+    jobs.start()
+
+    assert wait_for_job(jobs, queued)['job_status'] == JOB_DONE
+    assert wait_for_job(jobs, stale)['job_status'] == JOB_DONE
+    assert dispatched.count(queued) == dispatched.count(stale) == 1
+
+
+def test_claim_that_goes_stale_after_startup_is_taken_over(monkeypatch):
+    dispatched = record_dispatches(monkeypatch)
+    monkeypatch.setattr(housekeeping_jobs, 'HK_JOB_CLAIM_TIMEOUT', 0.3)
+    # claimed by a worker that died right before this process started
+    ticket_id = left_by_previous_process(JOB_PROCESSING, job_claimed_at=time.time())
+
+    jobs = HousekeepingJobs(rescan_interval=0.05)
+    jobs.start()
+    assert jobs.status(ticket_id)['job_status'] == JOB_PROCESSING
+
+    assert wait_for_job(jobs, ticket_id)['job_status'] == JOB_DONE
+    assert dispatched == [ticket_id]
@@ -0,0 +1,84 @@
+import json
+import threading
+from datetime import datetime, timedelta
+
+from housekeeping_store import HousekeepingLog, COMPLETED_AT_FORMAT
+
+
+def make_log(tmp_path, **kwargs):
+    return HousekeepingLog(path=str(tmp_path / 'log.jsonl'), legacy_path=None,
+                           archive_path=str(tmp_path / 'log.jsonl.archive'), **kwargs)
+
+
+def completed(days_ago):
+    return (datetime.now() - timedelta(days=days_ago)).strftime(COMPLETED_AT_FORMAT)
+
+
+def test_compaction_archives_notifications_completed_before_the_retention_window(tmp_path):
+    log = make_log(tmp_path, compact_min_events=1, retention_days=7)
+    log.add({'notification_id': 'HK-old', 'room_number': '101', 'status': 'pending'})
+    log.add({'notification_id': 'HK-recent', 'room_number': '102', 'status': 'pending'})
+    log.add({'notification_id': 'HK-open', 'room_number': '101', 'status': 'pending'})
+    log.update('HK-old', status='completed', completed_at=completed(8))
+    log.update('HK-recent', status='completed', completed_at=completed(1))
+    # Twice as many events as notifications: the next write compacts
+    log.update('HK-open', claimed_by='Ravi')
+
+    assert log.get('HK-old') is None
+    assert [n['notification_id'] for n in log.by_room('101')] == ['HK-open']
+    assert [n['notification_id'] for n in log.by_status('completed')] == ['HK-recent']
+    with open(tmp_path / 'log.jsonl.archive', encoding='utf-8') as f:
+        archived = [json.loads(line) for line in f]
+    assert [n['notification_id'] for n in archived] == ['HK-old']
+
+    # Another process reloads the compacted file without the expired record
+    other = make_log(tmp_path)
+    assert {n['notification_id'] for n in other.all()} == {'HK-recent', 'HK-open'}
+
+
+def test_zero_retention_keeps_completed_notifications(tmp_path):
+    log = make_log(tmp_path, compact_min_events=1, retention_days=0)
+    log.add({'notification_id': 'HK-1', 'status': 'pending'})
+    log.update('HK-1', status='completed', completed_at=completed(365))
+    log.update('HK-1', completed_by='Ravi')
+
+    assert log.get('HK-1')['status'] == 'completed'
+    assert not (tmp_path / 'log.jsonl.archive').exists()
+
+
+def test_conditional_update_lets_one_of_many_workers_win(tmp_path):
+    # Two logs on one file stand in for two worker processes
+    workers = [make_log(tmp_path), make_log(tmp_path)]
+    workers[0].add({'notification_id': 'HK-1', 'status': 'pending'})
+    wins = []
+
+    def claim(log, staff):
+        if log.update_if('HK-1', {'status': 'pending'}, status='claimed', claimed_by=staff):
+            wins.append(staff)
+
+    threads = [threading.Thread(target=claim, args=(workers[i % 2], f"staff-{i}")) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(wins) == 1
+    for log in workers:
+        assert log.get('HK-1')['claimed_by'] == wins[0]
+
+
+def test_compaction_keeps_state_and_other_workers_follow_it(tmp_path):
+    writer = make_log(tmp_path, compact_min_events=4)
+    reader = make_log(tmp_path)
+    writer.add({'notification_id': 'HK-1', 'room_number': '101', 'status': 'pending'})
+    assert reader.get('HK-1')['status'] == 'pending'
+    for n in range(5):
+        writer.update('HK-1', repeat_count=n)
+    with open(tmp_path / 'log.jsonl', encoding='utf-8') as f:
+        assert len(f.readlines()) < 6
+
+    # The reader notices the replaced file and keeps appending to it
+    assert reader.get('HK-1')['repeat_count'] == 4
+    assert reader.update_if('HK-1', {'repeat_count': 4}, status='claimed')
+    assert writer.by_status('claimed')[0]['notification_id'] == 'HK-1'
+    assert writer.by_status('pending') == []
@@ -0,0 +1,101 @@
+import multiprocessing
+import threading
+
+import pytest
+
+import id_generator
+from id_generator import TimeOrderedIdGenerator, MAX_SEQUENCE
+
+PREFIX_LEN = len('HK')
+STAMP_LEN = len('YYYYMMDDHHMMSSmmm')
+
+
+def worker_of(notification_id):
+    return int(notification_id[PREFIX_LEN + STAMP_LEN:][:4])
+
+
+@pytest.fixture
+def claims(tmp_path, monkeypatch):
+    monkeypatch.delenv(id_generator.WORKER_ID_ENV, raising=False)
+    return str(tmp_path / 'worker_ids')
+
+
+def test_ids_are_unique_and_increasing(claims):
+    generator = TimeOrderedIdGenerator('HK', worker_id_dir=claims)
+    ids = [generator.next_id() for _ in range(3 * (MAX_SEQUENCE + 1))]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+
+def test_ids_stay_increasing_when_the_clock_steps_back(claims, monkeypatch):
+    clock = iter([5_000_000_000, 5_000_000_000, 4_000_000_000, 3_000_000_000])
+    monkeypatch.setattr(id_generator.time, 'time_ns', lambda: next(clock))
+    generator = TimeOrderedIdGenerator('HK', worker_id_dir=claims)
+    ids = [generator.next_id() for _ in range(4)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == 4
+
+
+def test_ids_are_unique_across_threads(claims):
+    generator = TimeOrderedIdGenerator('HK', worker_id_dir=claims)
+    results = [[] for _ in range(8)]
+
+    def issue(out):
+        out.extend(generator.next_id() for _ in range(2000))
+
+    threads = [threading.Thread(target=issue, args=(out,)) for out in results]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ids = [i for out in results for i in out]
+    assert len(set(ids)) == len(ids)
+    assert all(out == sorted(out) for out in results)
+
+
+def test_timestamp_is_utc(claims, monkeypatch):
+    # 2026-03-29 01:30:00.250 UTC, inside the hour some zones skip for DST
+    monkeypatch.setattr(id_generator.time, 'time_ns', lambda: 1774747800250 * 1_000_000)
+    generator = TimeOrderedIdGenerator('HK', worker_id_dir=claims)
+    assert generator.next_id()[PREFIX_LEN:PREFIX_LEN + STAMP_LEN] == '20260329013000250'
+
+
+def test_generators_in_one_directory_claim_different_workers(claims):
+    first = TimeOrderedIdGenerator('HK', worker_id_dir=claims)
+    second = TimeOrderedIdGenerator('HK', worker_id_dir=claims)
+    assert worker_of(first.next_id()) != worker_of(second.next_id())
+
+
+def issue_ids(generator, out, done):
+    out.put([generator.next_id() for _ in range(500)])
+    # Keep the worker id claimed until every worker has issued its ids
+    done.wait(timeout=10)
+
+
+def test_forked_workers_get_distinct_worker_ids(claims):
+    generator = TimeOrderedIdGenerator('HK', worker_id_dir=claims)
+    parent_ids = [generator.next_id()]
+    context = multiprocessing.get_context('fork')
+    out, done = context.Queue(), context.Event()
+    workers = [context.Process(target=issue_ids, args=(generator, out, done)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    batches = [out.get(timeout=10) for _ in workers]
+    done.set()
+    for worker in workers:
+        worker.join()
+
+    ids = parent_ids + [i for batch in batches for i in batch]
+    assert len(set(ids)) == len(ids)
+    assert len({worker_of(batch[0]) for batch in batches} | {worker_of(parent_ids[0])}) == 5
+
+
+def test_configured_worker_id_is_used(claims, monkeypatch):
+    monkeypatch.setenv(id_generator.WORKER_ID_ENV, '17')
+    assert worker_of(TimeOrderedIdGenerator('HK', worker_id_dir=claims).next_id()) == 17
+
+
+def test_out_of_range_worker_id_is_rejected(claims, monkeypatch):
+    monkeypatch.setenv(id_generator.WORKER_ID_ENV, '1024')
+    with pytest.raises(ValueError):
+        TimeOrderedIdGenerator('HK', worker_id_dir=claims).next_id()
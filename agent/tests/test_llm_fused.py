@@ -0,0 +1,82 @@
+import json
+import time
+
+import pytest
+
+import llm_handler
+import llm_hedge
+
+HOTEL_INFO = "WiFi Password: Available at reception desk\nParking: Free parking in the basement"
+
+
+@pytest.fixture
+def fused_llm(monkeypatch):
+    """Fused mode on, with the LLM replying per task with whatever the test sets"""
+    replies = {}
+    calls = replies.setdefault('calls', [])
+
+    def call_task(task, prompt, priority=None, response_format=None):
+        calls.append(task)
+        if task == llm_handler.TASK_FUSED:
+            return replies['text']
+        return replies.get(task)
+
+    monkeypatch.setattr(llm_handler, 'LLM_FUSED_MODE', True)
+    monkeypatch.setattr(llm_handler, 'FAQ_CACHE_ENABLED', False)
+    monkeypatch.setattr(llm_handler, 'call_task', call_task)
+    monkeypatch.setattr(llm_hedge, 'LLM_TURN_DEADLINE', 1.0)
+    return replies
+
+
+def test_valid_fused_reply_is_used(fused_llm):
+    fused_llm['text'] = json.dumps({'intent': 'housekeeping', 'summary': 'Guest needs two fresh towels.'})
+    result = llm_handler.llm_fused_turn("can I get two more towels please", HOTEL_INFO)
+    assert result == {'intent': 'housekeeping', 'summary': 'Guest needs two fresh towels.'}
+
+
+@pytest.mark.parametrize('reply', ['not json', '{"intent": "faq"}', '{"intent": "dance"}'])
+def test_malformed_fused_reply_falls_back_to_per_task_calls(fused_llm, reply):
+    fused_llm['text'] = reply
+    fused_llm[llm_handler.TASK_CLASSIFY] = 'faq'
+    fused_llm[llm_handler.TASK_FAQ] = 'Parking is free for guests, in the basement garage.'
+    result = llm_handler.llm_fused_turn("where do I leave the car", HOTEL_INFO)
+    assert result == {'intent': 'faq', 'answer': 'Parking is free for guests, in the basement garage.'}
+    assert fused_llm['calls'] == [llm_handler.TASK_FUSED, llm_handler.TASK_CLASSIFY, llm_handler.TASK_FAQ]
+
+
+def test_malformed_housekeeping_reply_keeps_the_llm_summary(fused_llm):
+    fused_llm['text'] = '{"intent": "housekeeping"'
+    fused_llm[llm_handler.TASK_CLASSIFY] = 'housekeeping'
+    fused_llm[llm_handler.TASK_SUMMARIZE] = 'Guest needs two fresh towels.'
+    result = llm_handler.llm_fused_turn("can I get two more towels please", HOTEL_INFO)
+    assert result == {'intent': 'housekeeping', 'summary': 'Guest needs two fresh towels.'}
+
+
+def test_malformed_reply_after_the_deadline_uses_keywords(fused_llm, monkeypatch):
+    fused_llm['text'] = 'not json'
+    deadline = time.monotonic() + 0.05
+    slow_fused = llm_handler.call_task
+
+    def call_task(task, prompt, priority=None, response_format=None):
+        time.sleep(max(0.0, deadline - time.monotonic()) + 0.01)
+        return slow_fused(task, prompt, priority, response_format)
+
+    monkeypatch.setattr(llm_handler, 'call_task', call_task)
+    result = llm_handler.llm_fused_turn("where is the parking", HOTEL_INFO, deadline=deadline)
+    assert result['intent'] == 'faq'
+    assert 'parking' in result['answer'].lower()
+    time.sleep(0.1)
+    assert fused_llm['calls'] == [llm_handler.TASK_FUSED]
+
+
+def test_empty_fused_reply_falls_back_to_keywords(fused_llm):
+    fused_llm['text'] = ''
+    result = llm_handler.llm_fused_turn("where is the parking", HOTEL_INFO)
+    assert result['intent'] == 'faq'
+    assert 'parking' in result['answer'].lower()
+    assert fused_llm['calls'] == [llm_handler.TASK_FUSED]
+
+
+def test_fused_mode_off_leaves_it_to_the_per_task_calls(monkeypatch):
+    monkeypatch.setattr(llm_handler, 'LLM_FUSED_MODE', False)
+    assert llm_handler.llm_fused_turn("where is the parking", HOTEL_INFO) is None
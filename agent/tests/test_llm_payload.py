@@ -0,0 +1,21 @@
+import json
+
+import pytest
+
+import llm_handler
+from llm_handler import build_generate_payload, parse_keep_alive
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('-1', -1), ('0', 0), ('300', 300), ('1.5', 1.5), ('30m', '30m'), ('-1m', '-1m'), (' 24h ', '24h'),
+])
+def test_keep_alive_numbers_are_sent_as_numbers(value, expected):
+    keep_alive = parse_keep_alive(value)
+    assert keep_alive == expected
+    assert type(keep_alive) is type(expected)
+
+
+def test_default_keep_alive_is_a_json_number():
+    payload = build_generate_payload("hello", "mistral", 10)
+    assert llm_handler.OLLAMA_KEEP_ALIVE == -1
+    assert '"keep_alive": -1' in json.dumps(payload)
@@ -0,0 +1,19 @@
+import llm_hedge
+import llm_scheduler
+from llm_routing import load_routes, TASK_FAQ
+
+
+def test_tasks_keep_part_of_their_budget_for_generation():
+    for route in load_routes().values():
+        assert 0 < route.max_wait < route.budget
+
+
+def test_defaults_let_every_task_use_its_own_budget():
+    routes = load_routes()
+    assert llm_hedge.LLM_TURN_DEADLINE >= routes[TASK_FAQ].budget
+    assert all(llm_scheduler.LLM_MAX_WAIT >= route.max_wait for route in routes.values())
+
+
+def test_queue_wait_can_be_set_per_task(monkeypatch):
+    monkeypatch.setenv('LLM_FAQ_MAX_WAIT', '0.5')
+    assert load_routes()[TASK_FAQ].max_wait == 0.5
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+from llm_scheduler import LLMScheduler, PRIORITY_CHECK_IN, PRIORITY_FAQ
+
+
+def test_queued_coroutines_wait_on_the_loop_and_are_served_by_priority():
+    scheduler = LLMScheduler(max_concurrent=1, max_queue=8, max_wait=5)
+    served = []
+
+    async def caller(name, priority):
+        assert await scheduler.acquire_async(priority)
+        served.append(name)
+        scheduler.release()
+
+    async def main():
+        assert await scheduler.acquire_async()
+        threads = threading.active_count()
+        callers = [asyncio.create_task(caller('faq', PRIORITY_FAQ)),
+                   asyncio.create_task(caller('check_in', PRIORITY_CHECK_IN))]
+        await asyncio.sleep(0.05)
+        assert scheduler.stats()['queue_depth'] == 2
+        assert threading.active_count() == threads
+        # A slot released by a worker thread wakes the coroutine on its loop
+        await asyncio.to_thread(scheduler.release)
+        await asyncio.gather(*callers)
+
+    asyncio.run(main())
+    assert served == ['check_in', 'faq']
+    assert scheduler.stats()['active'] == 0
+
+
+def test_async_waiter_times_out_and_leaves_the_queue():
+    scheduler = LLMScheduler(max_concurrent=1, max_queue=8, max_wait=5)
+
+    async def main():
+        assert await scheduler.acquire_async()
+        assert not await scheduler.acquire_async(PRIORITY_FAQ, max_wait=0.05)
+        scheduler.release()
+
+    asyncio.run(main())
+    stats = scheduler.stats()
+    assert stats['timed_out'] == 1
+    assert stats['queue_depth'] == 0 and stats['active'] == 0
+
+
+def test_cancelled_async_waiter_does_not_keep_a_slot():
+    scheduler = LLMScheduler(max_concurrent=1, max_queue=8, max_wait=5)
+
+    async def main():
+        assert await scheduler.acquire_async()
+        waiter = asyncio.create_task(scheduler.acquire_async(PRIORITY_FAQ))
+        await asyncio.sleep(0.02)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        scheduler.release()
+
+    asyncio.run(main())
+    stats = scheduler.stats()
+    assert stats['active'] == 0 and stats['queue_depth'] == 0
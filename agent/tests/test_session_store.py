@@ -0,0 +1,49 @@
+import time
+
+from session_store import MemorySessionStore
+
+
+def test_sessions_expire_after_ttl_unless_touched():
+    store = MemorySessionStore(ttl=0.3, max_entries=10, sweep_interval=60)
+    store.set('idle', {'state': 'INIT'})
+    store.set('active', {'state': 'AWAITING_PHONE'})
+    for _ in range(4):
+        time.sleep(0.1)
+        store.touch('active')
+
+    assert store.get('idle') is None
+    assert store.get('active') == {'state': 'AWAITING_PHONE'}
+    assert store.stats()['expired'] == 1
+
+
+def test_sweep_drops_expired_sessions_in_access_order():
+    store = MemorySessionStore(ttl=0.05, max_entries=10, sweep_interval=60)
+    store.set('a', {})
+    store.set('b', {})
+    time.sleep(0.08)
+    store.set('c', {})
+
+    assert store.sweep() == 2
+    assert store.stats()['sessions'] == 1
+    assert store.get('c') == {}
+
+
+def test_least_recently_used_session_is_evicted_when_full():
+    store = MemorySessionStore(ttl=60, max_entries=2, sweep_interval=60)
+    store.set('a', {'n': 1})
+    store.set('b', {'n': 2})
+    store.touch('a')
+    store.set('c', {'n': 3})
+
+    assert store.get('b') is None
+    assert store.get('a') == {'n': 1} and store.get('c') == {'n': 3}
+    assert store.stats()['evicted'] == 1
+
+
+def test_stored_session_is_a_copy():
+    store = MemorySessionStore(ttl=60, max_entries=10, sweep_interval=60)
+    data = {'tickets': ['HK-1']}
+    store.set('a', data)
+    data['tickets'].append('HK-2')
+    store.get('a')['tickets'].append('HK-3')
+    assert store.get('a') == {'tickets': ['HK-1']}
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+import agent_app
+import local_access
+
+REMOTE = {'REMOTE_ADDR': '203.0.113.7'}
+LOCAL = {'REMOTE_ADDR': '127.0.0.1'}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Workers count as started, so a request does not spawn them
+    monkeypatch.setattr(agent_app, '_workers_pid', os.getpid())
+    return agent_app.app.test_client()
+
+
+def get_queue(client, environ, headers=None):
+    return client.get('/housekeeping/queue', environ_base=environ, headers=headers or {}).status_code
+
+
+def test_without_a_staff_token_only_this_host_gets_in(client, monkeypatch):
+    monkeypatch.setattr(agent_app, 'HOUSEKEEPING_STAFF_TOKEN', None)
+    assert get_queue(client, LOCAL) == 200
+    assert get_queue(client, REMOTE) == 401
+    # Relayed by a proxy on this host
+    assert get_queue(client, LOCAL, {'X-Forwarded-For': '203.0.113.7'}) == 401
+
+
+def test_without_a_staff_token_a_trusted_proxy_closes_the_board(client, monkeypatch):
+    monkeypatch.setattr(agent_app, 'HOUSEKEEPING_STAFF_TOKEN', None)
+    monkeypatch.setattr(local_access, 'TRUSTED_PROXY_HOPS', 1)
+    assert get_queue(client, LOCAL) == 401
+
+
+def test_staff_token_is_required_when_set(client, monkeypatch):
+    monkeypatch.setattr(agent_app, 'HOUSEKEEPING_STAFF_TOKEN', 's3cret')
+    assert get_queue(client, LOCAL) == 401
+    assert get_queue(client, REMOTE, {'X-Staff-Token': 'wrong'}) == 401
+    assert get_queue(client, REMOTE, {'X-Staff-Token': 's3cret'}) == 200
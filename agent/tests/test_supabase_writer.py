@@ -0,0 +1,167 @@
+import time
+
+import pytest
+
+import supabase_writer
+from supabase_writer import (
+    SupabaseWriteBehind, new_local_id,
+    INSERT_INTERACTION, UPDATE_INTERACTION, INSERT_SERVICE_REQUEST
+)
+
+
+class FakeSupabase:
+    """Records writes per table; raises while `down` is set"""
+
+    def __init__(self):
+        self.down = False
+        self.next_id = 100
+        self.interactions = {}
+        self.service_requests = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+class FakeQuery:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.action = None
+
+    def insert(self, rows):
+        self.action = ('insert', rows)
+        return self
+
+    def update(self, values):
+        self.action = ('update', values)
+        return self
+
+    def in_(self, column, ids):
+        self.ids = ids
+        return self
+
+    def execute(self):
+        if self.db.down:
+            raise ConnectionError("Supabase unreachable")
+        kind, payload = self.action
+        data = []
+        if kind == 'insert' and self.name == 'Interactions':
+            for row in payload:
+                self.db.next_id += 1
+                self.db.interactions[self.db.next_id] = dict(row)
+                data.append({**row, 'interaction_id': self.db.next_id})
+        elif kind == 'insert' and self.name == 'ServiceRequests':
+            self.db.service_requests.extend(payload)
+        elif kind == 'update' and self.name == 'Interactions':
+            for remote_id in self.ids:
+                self.db.interactions[remote_id].update(payload)
+        return type('Result', (), {'data': data})()
+
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    monkeypatch.setattr(supabase_writer, 'WRITER_RETRY_DELAY', 0)
+    return {'spill_path': str(tmp_path / 'spill.jsonl'), 'id_map_path': str(tmp_path / 'ids.db')}
+
+
+def make_writer(db, paths):
+    return SupabaseWriteBehind(lambda: db, flush_interval=0.02, **paths)
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return
+        time.sleep(0.02)
+    raise AssertionError("condition not reached")
+
+
+def insert(local_id):
+    return {'op': INSERT_INTERACTION, 'local_id': local_id,
+            'row': {'guest_id': 1, 'intent_type': 'housekeeping', 'status': 'initiated'}}
+
+
+def resolve(local_id):
+    return {'op': UPDATE_INTERACTION, 'local_id': local_id, 'values': {'status': 'resolved'}}
+
+
+def service_request(local_id):
+    return {'op': INSERT_SERVICE_REQUEST, 'local_id': local_id, 'row': {'service_type': 'housekeeping'}}
+
+
+def test_spilled_insert_lands_before_newer_updates(paths):
+    db = FakeSupabase()
+    db.down = True
+    writer = make_writer(db, paths)
+    local_id = new_local_id()
+    writer.submit(insert(local_id))
+    wait_until(lambda: writer.errors >= 1)
+
+    db.down = False
+    writer.submit(resolve(local_id))
+    writer.submit(service_request(local_id))
+    wait_until(lambda: len(db.service_requests) == 1)
+    writer.stop()
+
+    assert [row['status'] for row in db.interactions.values()] == ['resolved']
+    assert db.service_requests[0]['interaction_id'] in db.interactions
+    assert writer.dropped == 0
+    assert writer.replayed == 1
+
+
+def test_writes_queued_during_outage_keep_their_order(paths):
+    db = FakeSupabase()
+    db.down = True
+    writer = make_writer(db, paths)
+    first, second = new_local_id(), new_local_id()
+    writer.submit(insert(first))
+    wait_until(lambda: writer.errors >= 1)
+    writer.submit(insert(second))
+    writer.submit(resolve(first))
+    wait_until(lambda: writer.spilled >= 3)
+
+    db.down = False
+    writer.submit(resolve(second))
+    wait_until(lambda: sum(row['status'] == 'resolved' for row in db.interactions.values()) == 2)
+    writer.stop()
+
+    assert len(db.interactions) == 2
+    assert writer.dropped == 0
+
+
+def test_update_after_restart_finds_the_interaction(paths):
+    db = FakeSupabase()
+    local_id = new_local_id()
+    before = make_writer(db, paths)
+    before.submit(insert(local_id))
+    wait_until(lambda: len(db.interactions) == 1)
+    before.stop()
+
+    after = make_writer(db, paths)
+    after.submit(service_request(local_id))
+    wait_until(lambda: len(db.service_requests) == 1)
+    after.stop()
+
+    assert db.service_requests[0]['interaction_id'] == next(iter(db.interactions))
+    assert after.dropped == 0
+
+
+def test_spill_left_by_previous_process_is_replayed_first(paths):
+    db = FakeSupabase()
+    db.down = True
+    local_id = new_local_id()
+    before = make_writer(db, paths)
+    before.submit(insert(local_id))
+    wait_until(lambda: before.errors >= 1)
+    before.stop()
+
+    db.down = False
+    after = make_writer(db, paths)
+    after.submit(resolve(local_id))
+    wait_until(lambda: list(db.interactions.values()) and
+               next(iter(db.interactions.values()))['status'] == 'resolved')
+    after.stop()
+
+    assert after.dropped == 0
+    assert not after.stats()['spill_file_exists']
@@ -0,0 +1,71 @@
+import os
+import threading
+import time
+
+import agent_app
+from llm_hedge import llm_hedge
+from tracing import start_trace, finish_trace, span, current_trace_id, trace_recorder
+
+
+def span_names(trace):
+    return [s['name'] for s in trace.as_dict()['spans']]
+
+
+def test_nested_spans_name_their_parent_and_feed_server_timing():
+    trace = start_trace('chat')
+    with span('classify'):
+        with span('llm.classify', model='tiny'):
+            pass
+    finish_trace(trace)
+
+    spans = {s['name']: s for s in trace.as_dict()['spans']}
+    assert spans['llm.classify']['parent'] == 'classify'
+    assert spans['llm.classify']['attrs'] == {'model': 'tiny'}
+    assert trace.server_timing().split(', ')[-1].startswith('total;dur=')
+    assert current_trace_id() is None
+
+
+def test_hedged_llm_call_reports_into_the_callers_trace():
+    trace = start_trace('chat')
+
+    def llm_call():
+        with span('llm.faq'):
+            return current_trace_id()
+
+    seen = llm_hedge.run('faq', llm_call, lambda: None, lambda raw: raw, time.monotonic() + 5)
+    finish_trace(trace)
+
+    assert seen == trace.trace_id
+    assert span_names(trace) == ['llm.faq']
+
+
+def test_span_finishing_after_its_turn_is_dropped():
+    trace = start_trace('chat')
+    released = threading.Event()
+    finished = threading.Event()
+
+    def llm_call():
+        try:
+            with span('llm.faq'):
+                released.wait(5)
+        finally:
+            finished.set()
+
+    answer = llm_hedge.run('faq', llm_call, lambda: 'fallback', lambda raw: raw, time.monotonic() + 0.05)
+    finish_trace(trace)
+    released.set()
+    finished.wait(5)
+
+    assert answer == 'fallback'
+    assert span_names(trace) == []
+
+
+def test_chat_turn_trace_is_returned_and_recorded(monkeypatch):
+    # Workers count as started, so a request does not spawn them
+    monkeypatch.setattr(agent_app, '_workers_pid', os.getpid())
+    response = agent_app.app.test_client().post('/chat', json={'message': 'what time is breakfast'})
+
+    trace_id = response.headers['X-Trace-Id']
+    assert 'total;dur=' in response.headers['Server-Timing']
+    [trace] = trace_recorder.get(trace_id)
+    assert trace['name'] == 'chat' and trace['attrs'] == {'status': 200}
@@ -0,0 +1,260 @@
+import os
+import time
+import uuid
+import random
+import inspect
+import logging
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Tracing configuration
+TRACE_ENABLED = os.environ.get('TRACE_ENABLED', '1') == '1'
+TRACE_BUFFER_SIZE = int(os.environ.get('TRACE_BUFFER_SIZE', 500))
+# Fraction of traces written to the log; traces slower than TRACE_SLOW_MS always are
+TRACE_LOG_SAMPLE = float(os.environ.get('TRACE_LOG_SAMPLE', 0.01))
+TRACE_SLOW_MS = float(os.environ.get('TRACE_SLOW_MS', 2000))
+
+# Not event_log.get_logger: event_log imports this module for trace ids
+log = logging.getLogger('agent.trace')
+
+_current_trace = ContextVar('current_trace', default=None)
+_current_span = ContextVar('current_span', default=None)
+
+
+class Span:
+    """One timed stage of a trace"""
+    __slots__ = ('name', 'parent', 'attrs', 'start_ms', 'duration_ms', '_t0')
+
+    def __init__(self, name, trace, parent=None, attrs=None):
+        self.name = name
+        self.parent = parent.name if parent is not None else None
+        self.attrs = attrs or {}
+        self._t0 = time.perf_counter()
+        self.start_ms = (self._t0 - trace._t0) * 1000
+        self.duration_ms = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def as_dict(self):
+        entry = {'name': self.name, 'start_ms': round(self.start_ms, 2), 'duration_ms': round(self.duration_ms, 2)}
+        if self.parent:
+            entry['parent'] = self.parent
+        if self.attrs:
+            entry['attrs'] = self.attrs
+        return entry
+
+
+class Trace:
+    """
+    Stage timings of one unit of work (a chat turn, a housekeeping job, an
+    email batch). Spans recorded after the trace finished, such as an LLM
+    call that missed its turn's deadline, are not kept.
+    """
+
+    def __init__(self, name, parent_id=None):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.parent_id = parent_id
+        self.started_at = time.time()
+        self.attrs = {}
+        self.duration_ms = None
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._spans = []
+
+    def add(self, span):
+        with self._lock:
+            if self.duration_ms is None:
+                self._spans.append(span)
+
+    def finish(self, **attrs):
+        with self._lock:
+            self.attrs.update(attrs)
+            self.duration_ms = (time.perf_counter() - self._t0) * 1000
+
+    def stage_totals(self):
+        """Total milliseconds per span name, in order of first appearance"""
+        with self._lock:
+            spans = list(self._spans)
+        totals = {}
+        for s in sorted(spans, key=lambda s: s.start_ms):
+            totals[s.name] = totals.get(s.name, 0.0) + s.duration_ms
+        return totals
+
+    def server_timing(self):
+        """Value for the Server-Timing response header"""
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.stage_totals().items()]
+        if self.duration_ms is not None:
+            parts.append(f"total;dur={self.duration_ms:.1f}")
+        return ', '.join(parts)
+
+    def as_dict(self):
+        with self._lock:
+            spans = sorted(self._spans, key=lambda s: s.start_ms)
+        entry = {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'started_at': self.started_at,
+            'duration_ms': round(self.duration_ms, 2) if self.duration_ms is not None else None,
+            'spans': [s.as_dict() for s in spans]
+        }
+        if self.parent_id:
+            entry['parent_id'] = self.parent_id
+        if self.attrs:
+            entry['attrs'] = self.attrs
+        return entry
+
+
+def start_trace(name, parent_id=None):
+    """Start a trace and make it current in this context (None when tracing is off)"""
+    if not TRACE_ENABLED:
+        return None
+    trace = Trace(name, parent_id)
+    _current_trace.set(trace)
+    _current_span.set(None)
+    return trace
+
+
+def finish_trace(trace, **attrs):
+    """Finish a trace, hand it to the recorder and clear it from this context"""
+    if trace is None:
+        return
+    trace.finish(**attrs)
+    if _current_trace.get() is trace:
+        _current_trace.set(None)
+        _current_span.set(None)
+    trace_recorder.record(trace)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def current_trace_id():
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time a stage of the current trace. Without a current trace this costs a
+    context variable lookup and yields None.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    current = Span(name, trace, _current_span.get(), attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        current.duration_ms = (time.perf_counter() - current._t0) * 1000
+        _current_span.reset(token)
+        trace.add(current)
+
+
+def traced(name):
+    """Decorator: run each call of a function (sync or async) in a span"""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def annotate(**attrs):
+    """Add attributes to the innermost open span, if any"""
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attrs)
+
+
+class TraceRecorder:
+    """
+    Keeps the last TRACE_BUFFER_SIZE finished traces in memory and writes a
+    sample of them (plus every slow one) to the log as JSON.
+    """
+
+    def __init__(self, size=TRACE_BUFFER_SIZE, sample=TRACE_LOG_SAMPLE, slow_ms=TRACE_SLOW_MS):
+        self.sample = sample
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._traces = deque(maxlen=size)
+        self.recorded = 0
+        self.logged = 0
+
+    def record(self, trace):
+        entry = trace.as_dict()
+        with self._lock:
+            self._traces.append(entry)
+            self.recorded += 1
+        if entry['duration_ms'] >= self.slow_ms or random.random() < self.sample:
+            with self._lock:
+                self.logged += 1
+            log.info("%s trace %s took %.1f ms", entry['name'], entry['trace_id'], entry['duration_ms'], extra={'trace': entry})
+
+    def recent(self, limit=50, name=None, min_ms=0.0):
+        """Most recent traces first, optionally only one kind or only slow ones"""
+        with self._lock:
+            traces = list(self._traces)
+        matched = [t for t in reversed(traces)
+                   if (name is None or t['name'] == name) and t['duration_ms'] >= min_ms]
+        return matched[:limit]
+
+    def get(self, trace_id):
+        """A trace and the traces it started (e.g. a turn's housekeeping job)"""
+        with self._lock:
+            traces = list(self._traces)
+        return [t for t in traces if t['trace_id'] == trace_id or t.get('parent_id') == trace_id]
+
+    def hot_stages(self, name=None):
+        """Per-stage count, p50, p95 and share of traced time over the buffer, hottest first"""
+        with self._lock:
+            traces = [t for t in self._traces if name is None or t['name'] == name]
+        durations = {}
+        for t in traces:
+            for s in t['spans']:
+                durations.setdefault(s['name'], []).append(s['duration_ms'])
+        traced_ms = sum(t['duration_ms'] for t in traces) or 1.0
+        stages = []
+        for stage, values in durations.items():
+            values.sort()
+            stages.append({
+                'stage': stage,
+                'count': len(values),
+                'p50_ms': round(values[len(values) // 2], 1),
+                'p95_ms': round(values[int(len(values) * 0.95)], 1),
+                'share': round(sum(values) / traced_ms, 3)
+            })
+        stages.sort(key=lambda s: s['share'], reverse=True)
+        return stages
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': TRACE_ENABLED,
+                'buffered': len(self._traces),
+                'recorded': self.recorded,
+                'logged': self.logged,
+                'log_sample': self.sample,
+                'slow_ms': self.slow_ms
+            }
+
+
+# Process-wide recorder for all traces
+trace_recorder = TraceRecorder()
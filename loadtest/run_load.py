@@ -0,0 +1,331 @@
+"""
+End-to-end load test for the guest chat agent, fully offline.
+
+Starts the Ollama, PMS and Supabase stand-ins plus agent_app (or
+async_agent_app) on free local ports, replays scripted multi-turn
+conversations (check-in, FAQ, housekeeping) from many concurrent guest
+sessions, and reports per-turn p50/p99 latency and throughput.
+
+    python loadtest/run_load.py --sessions 200 --concurrency 40
+    python loadtest/run_load.py --ollama-latency 1.5 --ollama-parallel 2 --metrics
+    python loadtest/run_load.py --agent-url http://127.0.0.1:5001   # an agent already running
+
+Agent settings (LLM_TURN_DEADLINE, LLM_MAX_CONCURRENT, ADMISSION_*, ...)
+are passed through from the environment; LLM_MAX_CONCURRENT defaults to
+--ollama-parallel. Each session gets its own
+X-Forwarded-For address, so per-IP admission control treats them as
+different guests.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from stub_pms import guest_identity
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOADTEST_DIR = os.path.join(ROOT, 'loadtest')
+
+CHECK_IN_TURNS = [
+    ('check_in.start', "I want to check in"),
+    ('check_in.name', "{name}"),
+    ('check_in.phone', "{phone}"),
+]
+
+# Scripted conversations: (turn label, message) pairs, sent in order
+SCENARIOS = {
+    'check_in_faq': CHECK_IN_TURNS + [
+        ('faq', "What time is check-out?"),
+        ('faq', "Is there free wifi?"),
+    ],
+    'housekeeping': CHECK_IN_TURNS + [
+        ('housekeeping', "Can I get some extra towels please"),
+        ('housekeeping', "There is a coffee spill on the carpet"),
+        ('housekeeping.repeat', "Still waiting for the towels"),
+    ],
+    'faq': [
+        ('faq', "Where is the hotel located?"),
+        ('faq', "Is parking available?"),
+        ('other', "thanks"),
+    ],
+}
+DEFAULT_MIX = 'check_in_faq=2,housekeeping=2,faq=1'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url, process=None, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"{url}: process exited with code {process.returncode}")
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+class Stack:
+    """The agent and its stand-ins as child processes"""
+
+    def __init__(self, args):
+        self.args = args
+        self.processes = []
+        self.workdir = tempfile.mkdtemp(prefix='nexrova-load-')
+        self.log = open(os.path.join(self.workdir, 'processes.log'), 'w')
+
+    def _spawn(self, argv, cwd, env=None):
+        process = subprocess.Popen(argv, cwd=cwd, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+        self.processes.append(process)
+        return process
+
+    def start(self):
+        args = self.args
+        ollama_port, pms_port, supabase_port, agent_port = (free_port() for _ in range(4))
+
+        ollama = self._spawn([
+            sys.executable, os.path.join(LOADTEST_DIR, 'stub_ollama.py'), '--port', str(ollama_port),
+            '--latency', str(args.ollama_latency), '--tokens-per-second', str(args.ollama_tps),
+            '--parallel', str(args.ollama_parallel),
+            '--models', os.environ.get('OLLAMA_MODEL', 'mistral')
+        ], LOADTEST_DIR)
+        supabase = self._spawn([
+            sys.executable, os.path.join(LOADTEST_DIR, 'stub_supabase.py'), '--port', str(supabase_port),
+            '--latency', str(args.supabase_latency)
+        ], LOADTEST_DIR)
+        if args.real_pms:
+            pms = self._spawn([
+                sys.executable, '-c',
+                f"import pms_app; pms_app.app.run(host='127.0.0.1', port={pms_port}, threaded=True)"
+            ], os.path.join(ROOT, 'pms'))
+        else:
+            pms = self._spawn([
+                sys.executable, os.path.join(LOADTEST_DIR, 'stub_pms.py'), '--port', str(pms_port),
+                '--guests', str(args.sessions)
+            ], LOADTEST_DIR)
+
+        self.ollama_url = f"http://127.0.0.1:{ollama_port}"
+        self.pms_url = f"http://127.0.0.1:{pms_port}/api"
+        self.supabase_url = f"http://127.0.0.1:{supabase_port}"
+        wait_until_up(f"{self.ollama_url}/api/tags", ollama)
+        wait_until_up(f"{self.supabase_url}/stats", supabase)
+        wait_until_up(f"{self.pms_url}/rooms", pms)
+        if args.real_pms:
+            seed_real_pms(self.pms_url, args.sessions)
+
+        env = dict(os.environ)
+        # One scheduler slot per generation the stand-in serves, unless set explicitly
+        env.setdefault('LLM_MAX_CONCURRENT', str(args.ollama_parallel))
+        env.update({
+            'OLLAMA_API_URL': self.ollama_url,
+            'PMS_API_URL': self.pms_url,
+            'SUPABASE_URL': self.supabase_url,
+            'SUPABASE_KEY': env.get('SUPABASE_KEY', 'load-test'),
+            'ADMISSION_TRUST_PROXY': '1',
+            'HOUSEKEEPING_LOG': os.path.join(self.workdir, 'housekeeping_requests.jsonl'),
+            'EMAIL_OUTBOX_DB': os.path.join(self.workdir, 'email_outbox.db'),
+            'SUPABASE_SPILL_FILE': os.path.join(self.workdir, 'supabase_spill.jsonl'),
+        })
+        module = 'async_agent_app' if args.app == 'async' else 'agent_app'
+        run = "app.run(host='127.0.0.1', port={port})" if args.app == 'async' \
+            else "app.run(host='127.0.0.1', port={port}, threaded=True)"
+        agent = self._spawn([
+            sys.executable, '-c', f"import {module} as m; m." + run.format(port=agent_port)
+        ], os.path.join(ROOT, 'agent'), env)
+        self.agent_url = f"http://127.0.0.1:{agent_port}"
+        wait_until_up(self.agent_url, agent)
+        return self.agent_url
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.log.close()
+
+
+def seed_real_pms(pms_url, sessions):
+    """Book today's arrivals on pms_app; it only has eight rooms, so later guests are not found"""
+    today = time.strftime('%Y-%m-%d')
+    tomorrow = time.strftime('%Y-%m-%d', time.localtime(time.time() + 86400))
+    for i in range(min(sessions, 8)):
+        name, phone = guest_identity(i)
+        requests.post(f"{pms_url}/bookings", json={
+            'room_id': i + 1, 'guest_name': name, 'guest_email': f"guest{i}@example.com",
+            'guest_phone': phone, 'check_in': today, 'check_out': tomorrow
+        }, timeout=5).raise_for_status()
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+class Results:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = {}
+        self.statuses = {}
+        self.check_ins_ok = 0
+        self.failed_sessions = 0
+
+    def record(self, label, seconds, status):
+        with self._lock:
+            self.turns.setdefault(label, []).append(seconds)
+            key = (label, status)
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def count_check_in(self):
+        with self._lock:
+            self.check_ins_ok += 1
+
+    def count_failed_session(self):
+        with self._lock:
+            self.failed_sessions += 1
+
+
+def run_session(agent_url, index, scenario, think_time, results):
+    """Replay one scripted conversation as a new guest"""
+    name, phone = guest_identity(index)
+    client = requests.Session()
+    client.headers['X-Forwarded-For'] = f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}"
+    try:
+        client.get(agent_url, timeout=30)
+        for label, message in SCENARIOS[scenario]:
+            started = time.perf_counter()
+            response = client.post(f"{agent_url}/chat", json={'message': message.format(name=name, phone=phone)},
+                                   timeout=60)
+            results.record(label, time.perf_counter() - started, response.status_code)
+            if response.status_code == 200:
+                action = response.json().get('action') or {}
+                if action.get('type') == 'unlock':
+                    results.count_check_in()
+            if think_time:
+                time.sleep(random.uniform(0, 2 * think_time))
+    except requests.exceptions.RequestException as e:
+        print(f"session {index}: {e}")
+        results.count_failed_session()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(results, wall_seconds):
+    rows = {}
+    all_latencies = []
+    for label, latencies in sorted(results.turns.items()):
+        latencies = sorted(latencies)
+        all_latencies.extend(latencies)
+        statuses = {status: n for (l, status), n in results.statuses.items() if l == label}
+        rows[label] = {
+            'turns': len(latencies),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+            'max_ms': round(latencies[-1] * 1000, 1),
+            'statuses': statuses
+        }
+    all_latencies.sort()
+    return {
+        'turns': rows,
+        'total_turns': len(all_latencies),
+        'p50_ms': round(percentile(all_latencies, 0.50) * 1000, 1) if all_latencies else None,
+        'p99_ms': round(percentile(all_latencies, 0.99) * 1000, 1) if all_latencies else None,
+        'wall_seconds': round(wall_seconds, 2),
+        'turns_per_second': round(len(all_latencies) / wall_seconds, 1) if wall_seconds else None,
+        'check_ins_ok': results.check_ins_ok,
+        'failed_sessions': results.failed_sessions
+    }
+
+
+def print_report(summary):
+    print(f"\n{'turn':<22}{'count':>7}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}  statuses")
+    for label, row in summary['turns'].items():
+        statuses = ' '.join(f"{status}:{n}" for status, n in sorted(row['statuses'].items()))
+        print(f"{label:<22}{row['turns']:>7}{row['p50_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}  {statuses}")
+    print(f"\n{summary['total_turns']} turns in {summary['wall_seconds']}s "
+          f"({summary['turns_per_second']} turns/s), overall p50 {summary['p50_ms']} ms, p99 {summary['p99_ms']} ms")
+    print(f"check-ins completed: {summary['check_ins_ok']}, failed sessions: {summary['failed_sessions']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=100, help='guest conversations to replay')
+    parser.add_argument('--concurrency', type=int, default=20, help='conversations in flight at once')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument('--think-time', type=float, default=1.0, help='mean pause between turns, seconds')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--app', choices=['flask', 'async'], default='flask')
+    parser.add_argument('--agent-url', help='test an agent that is already running instead of starting one')
+    parser.add_argument('--real-pms', action='store_true', help='use pms/pms_app.py instead of the PMS stub')
+    parser.add_argument('--ollama-latency', type=float, default=0.3)
+    parser.add_argument('--ollama-tps', type=float, default=40.0)
+    parser.add_argument('--ollama-parallel', type=int, default=4, help='like OLLAMA_NUM_PARALLEL')
+    parser.add_argument('--supabase-latency', type=float, default=0.05)
+    parser.add_argument('--metrics', action='store_true', help="print the agent's /metrics after the run")
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    weights = parse_mix(args.mix)
+    plan = random.choices(list(weights), weights=list(weights.values()), k=args.sessions)
+
+    stack = None
+    agent_url = args.agent_url
+    if not agent_url:
+        stack = Stack(args)
+        print(f"Starting stand-ins and agent (logs in {stack.workdir}) ...")
+        try:
+            agent_url = stack.start()
+        except Exception:
+            stack.stop()
+            raise
+
+    results = Results()
+    try:
+        print(f"Replaying {args.sessions} conversations, {args.concurrency} at a time against {agent_url}")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for index, scenario in enumerate(plan):
+                pool.submit(run_session, agent_url, index, scenario, args.think_time, results)
+        summary = summarize(results, time.perf_counter() - started)
+        metrics = requests.get(f"{agent_url}/metrics", timeout=10).json() if args.metrics else None
+    finally:
+        if stack:
+            stack.stop()
+
+    if args.json:
+        print(json.dumps({'summary': summary, 'metrics': metrics}, indent=2))
+    else:
+        print_report(summary)
+        if metrics:
+            print(json.dumps(metrics, indent=2))
+
+
+if __name__ == '__main__':
+    main()
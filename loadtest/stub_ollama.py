@@ -0,0 +1,124 @@
+"""
+Ollama stand-in for load tests: answers /api/generate with canned text
+after a configurable delay, so agent latency can be measured without a GPU.
+
+Each generation takes --latency seconds (prompt evaluation) plus one
+--tokens-per-second step per generated token; at most --parallel run at
+once and the rest wait, like Ollama with OLLAMA_NUM_PARALLEL.
+
+    python loadtest/stub_ollama.py --port 11434 --latency 0.3 --tokens-per-second 40
+"""
+import re
+import json
+import time
+import argparse
+import threading
+
+from flask import Flask, request, jsonify
+
+app = Flask(__name__)
+
+CONFIG = {'latency': 0.3, 'tokens_per_second': 40.0, 'models': ['mistral']}
+_slots = threading.BoundedSemaphore(1)
+
+HOUSEKEEPING_WORDS = ('towel', 'clean', 'spill', 'leak', 'soap', 'shampoo', 'broken', 'fix', 'toilet', 'mess', 'stain')
+FAQ_WORDS = ('wifi', 'parking', 'breakfast', 'where', 'what', 'when', 'how', 'check-out', 'checkout', '?')
+
+FAQ_ANSWER = ("Our reception is open 24/7. Wi-Fi is free throughout the property and parking "
+              "is available on site; please ask the front desk if you need anything else.")
+
+
+def guest_message(prompt):
+    """The guest's text from the end of an agent prompt"""
+    match = re.search(r'(?:User message|Guest message|Guest request): "(.*)"', prompt, re.S)
+    if match:
+        return match.group(1)
+    match = re.search(r'Guest Question: (.*)', prompt)
+    return match.group(1) if match else ''
+
+
+def guess_intent(message):
+    text = message.lower()
+    if 'check in' in text or 'check me in' in text:
+        return 'check_in'
+    if any(word in text for word in HOUSEKEEPING_WORDS):
+        return 'housekeeping'
+    if any(word in text for word in FAQ_WORDS):
+        return 'faq'
+    return 'other'
+
+
+def canned_response(prompt, response_format):
+    """Plausible output for each of the agent's prompts"""
+    message = guest_message(prompt)
+    if response_format == 'json':
+        intent = guess_intent(message)
+        result = {'intent': intent}
+        if intent == 'housekeeping':
+            result['summary'] = f"Guest requests: {message.strip()}."
+        elif intent == 'faq':
+            result['answer'] = FAQ_ANSWER
+        return json.dumps(result)
+    if "Classify the user's intent" in prompt:
+        return guess_intent(message)
+    if 'Summarize this hotel guest' in prompt:
+        return f"Guest requests housekeeping: {message.strip()}."
+    if "Answer the guest's question" in prompt:
+        return FAQ_ANSWER
+    return ''
+
+
+@app.route('/api/generate', methods=['POST'])
+def generate():
+    payload = request.get_json()
+    prompt = payload.get('prompt', '')
+    text = canned_response(prompt, payload.get('format'))
+    max_tokens = payload.get('options', {}).get('num_predict', 500)
+    words = text.split()
+    tokens = min(len(words), max_tokens)
+    if not payload.get('format'):
+        text = ' '.join(words[:tokens])
+
+    started = time.perf_counter()
+    with _slots:
+        queued = time.perf_counter() - started
+        prompt_seconds = CONFIG['latency'] if prompt else 0.0
+        eval_seconds = tokens / CONFIG['tokens_per_second']
+        time.sleep(prompt_seconds + eval_seconds)
+
+    return jsonify({
+        'model': payload.get('model'),
+        'response': text,
+        'done': True,
+        'total_duration': int((queued + prompt_seconds + eval_seconds) * 1e9),
+        'load_duration': 0,
+        'prompt_eval_count': len(prompt.split()),
+        'prompt_eval_duration': int(prompt_seconds * 1e9),
+        'eval_count': tokens,
+        'eval_duration': int(eval_seconds * 1e9)
+    })
+
+
+@app.route('/api/tags', methods=['GET'])
+def tags():
+    return jsonify({'models': [{'name': f"{name}:latest"} for name in CONFIG['models']]})
+
+
+def main():
+    global _slots
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--latency', type=float, default=0.3, help='prompt evaluation time per request, seconds')
+    parser.add_argument('--tokens-per-second', type=float, default=40.0)
+    parser.add_argument('--parallel', type=int, default=1, help='generations served at once')
+    parser.add_argument('--models', default='mistral', help='comma-separated models reported by /api/tags')
+    args = parser.parse_args()
+
+    CONFIG.update(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                  models=args.models.split(','))
+    _slots = threading.BoundedSemaphore(args.parallel)
+    app.run(host='127.0.0.1', port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+PMS stand-in for load tests: the booking endpoints the agent uses, with as
+many rooms as needed and one confirmed arrival for today per load-test
+guest (the real pms_app only has eight rooms).
+
+Guest i is named "Load Guest i" with phone 9000000000 + i, matching
+run_load.py's guest_identity().
+
+    python loadtest/stub_pms.py --port 5000 --guests 500
+"""
+import uuid
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+from flask import Flask, request, jsonify
+
+app = Flask(__name__)
+
+ROOMS_PER_FLOOR = 20
+
+_lock = threading.Lock()
+_rooms = []
+_bookings = {}
+_boot_id = uuid.uuid4().hex[:8]
+_version = 0
+
+
+def guest_identity(index):
+    return f"Load Guest {index}", str(9000000000 + index)
+
+
+def seed(guests):
+    global _version
+    today = datetime.now().strftime('%Y-%m-%d')
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+    for i in range(guests):
+        floor = i // ROOMS_PER_FLOOR + 1
+        room_number = f"{floor}{i % ROOMS_PER_FLOOR + 1:02d}"
+        _rooms.append({'room_id': i + 1, 'room_number': room_number, 'room_type': 'Deluxe',
+                       'floor': floor, 'status': 'available'})
+        name, phone = guest_identity(i)
+        _bookings[i + 1] = {
+            'booking_id': i + 1, 'room_id': i + 1, 'guest_id': i + 1,
+            'check_in': today, 'check_out': tomorrow, 'status': 'confirmed',
+            'room_number': room_number, 'room_type': 'Deluxe',
+            'guest_name': name, 'guest_phone': phone, 'guest_email': f"guest{i}@example.com"
+        }
+    _version += 1
+
+
+@app.route('/api/bookings', methods=['GET'])
+def bookings():
+    with _lock:
+        return jsonify({'success': True, 'data': [dict(b) for b in _bookings.values()]})
+
+
+@app.route('/api/bookings/<int:booking_id>', methods=['PUT'])
+def update_booking(booking_id):
+    global _version
+    data = request.get_json()
+    with _lock:
+        booking = _bookings.get(booking_id)
+        if booking is None:
+            return jsonify({'success': False, 'error': 'Booking not found'}), 404
+        if 'expected_status' in data and booking['status'] != data['expected_status']:
+            return jsonify({'success': False, 'error': f"Booking is {booking['status']}"}), 409
+        booking['status'] = data.get('status', booking['status'])
+        _version += 1
+        return jsonify({'success': True, 'data': dict(booking)})
+
+
+@app.route('/api/arrivals', methods=['GET'])
+def arrivals():
+    date = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
+    with _lock:
+        version = f"{_boot_id}-{_version}"
+        if request.args.get('since') == version:
+            return jsonify({'success': True, 'date': date, 'version': version, 'changed': False})
+        data = [dict(b) for b in _bookings.values() if b['check_in'] == date and b['status'] == 'confirmed']
+    return jsonify({'success': True, 'date': date, 'version': version, 'changed': True, 'data': data})
+
+
+@app.route('/api/rooms', methods=['GET'])
+def rooms():
+    return jsonify({'success': True, 'data': _rooms})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--guests', type=int, default=500, help='arrivals to seed for today')
+    args = parser.parse_args()
+    seed(args.guests)
+    app.run(host='127.0.0.1', port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
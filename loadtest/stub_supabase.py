@@ -0,0 +1,110 @@
+"""
+Supabase stand-in for load tests: an in-memory PostgREST subset under
+/rest/v1 that is enough for the agent's supabase client (select with eq/in
+filters, insert returning the rows, update with filters).
+
+    python loadtest/stub_supabase.py --port 54321
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_KEY=stub python agent/agent_app.py
+
+An optional --latency adds a delay to every request, to model the round
+trip to a hosted project.
+"""
+import time
+import argparse
+import threading
+
+from flask import Flask, request, jsonify
+
+app = Flask(__name__)
+
+CONFIG = {'latency': 0.0}
+# Generated primary key per table
+PRIMARY_KEYS = {'Guest': 'guest_id', 'Interactions': 'interaction_id', 'ServiceRequests': 'request_id'}
+
+_lock = threading.Lock()
+_tables = {}
+_counters = {}
+_requests = {'select': 0, 'insert': 0, 'update': 0}
+
+
+def _matches(row, filters):
+    for column, condition in filters:
+        operator, _, value = condition.partition('.')
+        actual = str(row.get(column))
+        if operator == 'eq' and actual != value:
+            return False
+        if operator == 'in' and actual not in value.strip('()').split(','):
+            return False
+    return True
+
+
+def _filters():
+    ignored = {'select', 'order', 'limit', 'offset', 'columns', 'on_conflict'}
+    return [(k, v) for k, v in request.args.items(multi=True) if k not in ignored]
+
+
+@app.before_request
+def simulate_latency():
+    if CONFIG['latency']:
+        time.sleep(CONFIG['latency'])
+
+
+@app.route('/rest/v1/<table>', methods=['GET'])
+def select(table):
+    filters = _filters()
+    with _lock:
+        _requests['select'] += 1
+        rows = [dict(r) for r in _tables.get(table, []) if _matches(r, filters)]
+    return jsonify(rows)
+
+
+@app.route('/rest/v1/<table>', methods=['POST'])
+def insert(table):
+    body = request.get_json()
+    rows = body if isinstance(body, list) else [body]
+    key = PRIMARY_KEYS.get(table, 'id')
+    created = []
+    with _lock:
+        _requests['insert'] += 1
+        for row in rows:
+            _counters[table] = _counters.get(table, 0) + 1
+            stored = {key: _counters[table], **row}
+            _tables.setdefault(table, []).append(stored)
+            created.append(dict(stored))
+    return jsonify(created), 201
+
+
+@app.route('/rest/v1/<table>', methods=['PATCH'])
+def update(table):
+    values = request.get_json()
+    filters = _filters()
+    updated = []
+    with _lock:
+        _requests['update'] += 1
+        for row in _tables.get(table, []):
+            if _matches(row, filters):
+                row.update(values)
+                updated.append(dict(row))
+    return jsonify(updated)
+
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    with _lock:
+        return jsonify({
+            'requests': dict(_requests),
+            'rows': {table: len(rows) for table, rows in _tables.items()}
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=54321)
+    parser.add_argument('--latency', type=float, default=0.0, help='delay per request, seconds')
+    args = parser.parse_args()
+    CONFIG['latency'] = args.latency
+    app.run(host='127.0.0.1', port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,15 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for
 from datetime import datetime, timedelta
+import os
+import sys
 import json
+import uuid
+
+# Helpers shared by the agent and the PMS (e.g. the profiler) live in ../shared
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'shared'))
+
+from profiler import profiler, ProfilerBusy
+from local_access import is_local_request
 
 app = Flask(__name__)
 
@@ -12,6 +21,16 @@ class Database:
         self.guests = []
         self.booking_id_counter = 1
         self.guest_id_counter = 1
+        # Version token for booking changes; the boot id makes tokens from
+        # before a restart (when the in-memory data is lost) never match
+        self.boot_id = uuid.uuid4().hex[:8]
+        self.version = 0
+
+    def bump_version(self):
+        self.version += 1
+
+    def version_token(self):
+        return f"{self.boot_id}-{self.version}"
 
     def _initialize_rooms(self):
         room_types = [
@@ -168,6 +187,7 @@ class Database:
         }
         self.bookings.append(booking)
         self.booking_id_counter += 1
+        self.bump_version()
 
         # FIXED: Do NOT mark room as occupied during booking creation
         # Room should only be occupied when guest checks in
@@ -181,6 +201,7 @@ class Database:
 
         old_status = booking['status']
         booking['status'] = new_status
+        self.bump_version()
 
         # FIXED: Proper state transitions with room status updates
         if new_status == 'checked_in' and old_status != 'checked_in':
@@ -245,6 +266,23 @@ class Database:
         self.guest_id_counter += 1
         return guest
 
+    def get_arrivals(self, date):
+        """Confirmed bookings checking in on a date, with guest and room details"""
+        arrivals = []
+        for booking in self.bookings:
+            if booking['check_in'] != date or booking['status'] != 'confirmed':
+                continue
+            room = self.get_room(booking['room_id'])
+            guest = self.get_guest(booking['guest_id'])
+            arrivals.append({
+                **booking,
+                'room_number': room['room_number'] if room else 'N/A',
+                'room_type': room['room_type'] if room else 'N/A',
+                'guest_name': guest['name'] if guest else 'N/A',
+                'guest_phone': guest['phone'] if guest else 'N/A'
+            })
+        return arrivals
+
     def get_checked_in_guests(self):
         """Get all currently checked-in guests with room details"""
         checked_in = []
@@ -653,6 +691,13 @@ def api_booking_detail(booking_id):
                     'error': 'Invalid status'
                 }), 400
 
+            # Optional compare-and-set: only change a booking still in the expected status
+            if 'expected_status' in data and booking['status'] != data['expected_status']:
+                return jsonify({
+                    'success': False,
+                    'error': f"Booking is {booking['status']}, not {data['expected_status']}"
+                }), 409
+
             updated_booking = db.update_booking_status(booking_id, data['status'])
 
             # FIXED: Return enriched booking with room details
@@ -684,6 +729,31 @@ def api_booking_detail(booking_id):
             'message': 'Booking cancelled'
         })
 
+@app.route('/api/arrivals', methods=['GET'])
+def api_arrivals():
+    """
+    Confirmed arrivals for a date (default today) plus a version token.
+    Pass the token back as ?since= to poll cheaply: if no booking changed,
+    only the token is returned.
+    """
+    date = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
+    version = db.version_token()
+    if request.args.get('since') == version:
+        return jsonify({
+            'success': True,
+            'date': date,
+            'version': version,
+            'changed': False
+        })
+
+    return jsonify({
+        'success': True,
+        'date': date,
+        'version': version,
+        'changed': True,
+        'data': db.get_arrivals(date)
+    })
+
 @app.route('/api/guests', methods=['GET'])
 def api_guests():
     """Get all guests with their booking details"""
@@ -747,5 +817,43 @@ def api_occupancy():
         }
     })
 
+# ============== DEBUG ROUTES ==============
+
+DEBUG_TOKEN = os.environ.get('DEBUG_TOKEN')
+
+def debug_authorized():
+    """Debug endpoints need X-Debug-Token; without DEBUG_TOKEN set they only answer this host"""
+    if not DEBUG_TOKEN:
+        return is_local_request(request.remote_addr, request.headers.get('X-Forwarded-For'))
+    token = request.headers.get('X-Debug-Token') or request.args.get('token')
+    return token == DEBUG_TOKEN
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """
+    Sample every thread for ?seconds=N (default 10) and return collapsed
+    stacks for flamegraph.pl/speedscope, or ?format=json for the top
+    functions. ?mode=alloc returns the tracemalloc allocation growth over
+    the window instead.
+    """
+    if not debug_authorized():
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    seconds = request.args.get('seconds', 10.0, type=float)
+    limit = request.args.get('limit', 30, type=int)
+    try:
+        if request.args.get('mode', 'cpu') == 'alloc':
+            group_by = 'traceback' if request.args.get('group_by') == 'traceback' else 'lineno'
+            return jsonify({'success': True, 'data': profiler.allocations(seconds, limit, group_by)})
+        interval_ms = request.args.get('interval_ms', type=float)
+        interval = interval_ms / 1000 if interval_ms else None
+        output = 'json' if request.args.get('format') == 'json' else 'collapsed'
+        idle = request.args.get('idle') == '1'
+        result = profiler.profile(seconds, interval, output, idle, limit)
+    except ProfilerBusy as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    if output == 'json':
+        return jsonify({'success': True, 'data': result})
+    return result, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
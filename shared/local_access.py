@@ -0,0 +1,18 @@
+import os
+
+# Reverse proxies in front of the app, as for the agent's admission control.
+# Behind one, every request arrives from the proxy's own address, so a
+# loopback peer no longer means the request was made on this host.
+TRUSTED_PROXY_HOPS = int(os.environ.get('ADMISSION_TRUST_PROXY', 0))
+
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+
+
+def is_local_request(remote_addr, forwarded_for=None, hops=None):
+    """
+    True only for a request made on this host: a loopback peer, no trusted
+    proxy configured, and no X-Forwarded-For header (which a proxy on this
+    host adds, and which could not be trusted anyway).
+    """
+    hops = TRUSTED_PROXY_HOPS if hops is None else hops
+    return hops <= 0 and not forwarded_for and remote_addr in LOOPBACK_ADDRESSES
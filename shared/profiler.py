@@ -0,0 +1,177 @@
+import os
+import sys
+import time
+import threading
+import tracemalloc
+from collections import Counter
+
+# Profiler configuration
+PROFILE_MAX_SECONDS = float(os.environ.get('PROFILE_MAX_SECONDS', 30))
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', 0.005))
+# Frames kept per allocation traceback while an allocation snapshot runs
+ALLOC_TRACE_FRAMES = int(os.environ.get('ALLOC_TRACE_FRAMES', 10))
+
+# Innermost frames of threads with nothing to do: an empty thread pool
+# worker, or a server or event loop waiting for the next connection
+IDLE_FRAMES = ('thread:_worker', 'selectors:select', 'socketserver:serve_forever')
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is running"""
+    pass
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for every thread of the process. A sampler
+    thread reads sys._current_frames() every `interval` seconds and counts
+    each thread's stack, so the profiled code runs untouched; threads that
+    are waiting (on a lock, a socket, Ollama) show up where they wait.
+
+    Only one profile or allocation snapshot runs at a time.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL, max_seconds=PROFILE_MAX_SECONDS):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self.profiles = 0
+        self.snapshots = 0
+
+    def _acquire(self):
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+
+    def _duration(self, seconds):
+        return max(0.0, min(float(seconds), self.max_seconds))
+
+    def sample(self, seconds, interval=None, idle=False):
+        """
+        Sample all threads for `seconds`. Returns a Counter of collapsed
+        stacks ("thread;module:function:line;..." root first) to sample
+        counts, plus the number of sampling rounds. Threads parked in
+        IDLE_FRAMES are skipped unless idle is True.
+        """
+        self._acquire()
+        try:
+            interval = max(interval or self.interval, 0.001)
+            deadline = time.monotonic() + self._duration(seconds)
+            me = threading.get_ident()
+            stacks = Counter()
+            rounds = 0
+            while time.monotonic() < deadline:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    labels = []
+                    while frame is not None:
+                        labels.append(_frame_label(frame))
+                        frame = frame.f_back
+                    if not idle and labels and labels[0].rsplit(':', 1)[0] in IDLE_FRAMES:
+                        continue
+                    labels.append(names.get(ident, f"thread-{ident}"))
+                    stacks[';'.join(reversed(labels))] += 1
+                rounds += 1
+                time.sleep(interval)
+            self.profiles += 1
+            return stacks, rounds
+        finally:
+            self._lock.release()
+
+    def profile(self, seconds, interval=None, output='collapsed', idle=False, limit=30):
+        """
+        Run sample() and format it: 'collapsed' is one "stack count" line per
+        stack, the input format of flamegraph.pl and speedscope; 'json' is the
+        top functions by self and total samples.
+        """
+        stacks, rounds = self.sample(seconds, interval, idle)
+        if output == 'collapsed':
+            return '\n'.join(f"{stack} {count}" for stack, count in stacks.most_common()) + '\n'
+
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(';')[1:]
+            if not frames:
+                continue
+            self_counts[frames[-1]] += count
+            for label in set(frames):
+                total_counts[label] += count
+        samples = sum(stacks.values()) or 1
+        return {
+            'seconds': self._duration(seconds),
+            'rounds': rounds,
+            'samples': sum(stacks.values()),
+            'self': [{'frame': label, 'samples': n, 'share': round(n / samples, 3)}
+                     for label, n in self_counts.most_common(limit)],
+            'total': [{'frame': label, 'samples': n, 'share': round(n / samples, 3)}
+                      for label, n in total_counts.most_common(limit)]
+        }
+
+    def allocations(self, seconds, limit=30, group_by='lineno'):
+        """
+        Memory allocated and still live after `seconds`, by source line (or
+        'traceback'), biggest growth first. With seconds=0 it lists what is
+        currently traced instead. tracemalloc is started for the window and
+        stopped again unless it was already running (PYTHONTRACEMALLOC).
+        """
+        self._acquire()
+        try:
+            started_here = not tracemalloc.is_tracing()
+            if started_here:
+                tracemalloc.start(ALLOC_TRACE_FRAMES)
+            try:
+                before = tracemalloc.take_snapshot()
+                seconds = self._duration(seconds)
+                if seconds:
+                    time.sleep(seconds)
+                    after = tracemalloc.take_snapshot()
+                    stats = after.compare_to(before, group_by)
+                else:
+                    after = before
+                    stats = before.statistics(group_by)
+                current, peak = tracemalloc.get_traced_memory()
+            finally:
+                if started_here:
+                    tracemalloc.stop()
+            self.snapshots += 1
+
+            top = []
+            for stat in stats[:limit]:
+                entry = {
+                    'where': [f"{f.filename}:{f.lineno}" for f in stat.traceback],
+                    'size_kb': round(stat.size / 1024, 1),
+                    'count': stat.count
+                }
+                if seconds:
+                    entry['size_diff_kb'] = round(stat.size_diff / 1024, 1)
+                    entry['count_diff'] = stat.count_diff
+                top.append(entry)
+            return {
+                'seconds': seconds,
+                'traced_kb': round(current / 1024, 1),
+                'peak_kb': round(peak / 1024, 1),
+                'top': top
+            }
+        finally:
+            self._lock.release()
+
+    def stats(self):
+        return {
+            'running': self._lock.locked(),
+            'profiles': self.profiles,
+            'snapshots': self.snapshots,
+            'interval': self.interval,
+            'max_seconds': self.max_seconds
+        }
+
+
+# Process-wide profiler for the /debug/profile endpoint
+profiler = SamplingProfiler()